@@ -1,64 +1,38 @@
-from flask import Flask, render_template_string, request, send_file
-import sqlite3, os, csv, random
-from werkzeug.utils import secure_filename
+from flask import Flask, Blueprint, current_app, request, jsonify, url_for
+from db import get_db, pooled, close_db
+from export import export_query, csv_response
+from columnar import parquet_response, snapshot_response
+from pagination import page_args, keyset_page
+from indicators import engine as indicators
+from bulk_import import detect_format, import_upload
+from photos import PhotoRequest, save_photo, saved_photo, photo_name, original_key, thumb_key, thumb_response
+from storage import STORAGE, open_storage
+from locations import LOCATIONS_SQL, get_locations, locations_response, seed_locations
+from geo import get_geo_index, locate_response
+from rendering import compile_templates, render, RenderCache
+from search import search_response
+from migrations import migrate
+from sync import push_records, pull_response
+from metrics import init_metrics, timed, PHOTO_SECONDS
+from write_queue import init_write_queue, register, registration_response, registration_status
+from asgi import ASGIApp
+from i18n import CATALOG_DIR, load_catalogs
+from dedup import find_duplicates
+from archive import close_history, season_source, season_stats
 
-app = Flask(__name__)
-
-@app.route('/')
-def home():
-    # gwajin ko server yana aiki
-    return render_template_string("<h1>Server is live and running ✅</h1>")
-
-if __name__ == '__main__':
-    app.run(debug=True)
-UPLOAD_FOLDER = 'static/photos'
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 DB = 'farmers.db'
+bp = Blueprint("farmers", __name__)
 
 # === Initialize database ===
-def init_db():
-    conn = sqlite3.connect(DB)
-    c = conn.cursor()
-    # Farmers table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS farmers(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            state TEXT,
-            lga TEXT,
-            crop TEXT,
-            phone TEXT,
-            photo_path TEXT
-        )
-    ''')
-    # LGA coordinates
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS lga_coords(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            state TEXT,
-            lga TEXT
-        )
-    ''')
-    # Populate LGAs if empty
-    c.execute("SELECT COUNT(*) FROM lga_coords")
-    if c.fetchone()[0] == 0:
-        print("Babu sakamakon da aka samu")
-# Multi-language
-lang_dict = {
-    "en": {"welcome":"Smart Farmers Data Portal","name":"Full Name","phone":"Phone Number","state":"State","lga":"LGA",
-           "crop":"Type of Crop","submit":"Submit","dashboard":"Dashboard","select_state":"Select State","select_lga":"Select LGA",
-           "data_saved":"Data saved successfully!","weather":"Weather Indicator","recommended":"Recommended Crop"},
-    "ha": {"welcome":"Smart Farmers Data Portal","name":"Cikakken Suna","phone":"Lambar Waya","state":"Jihar","lga":"Karamar Hukuma",
-           "crop":"Irin Amfanin Gona","submit":"Tura","dashboard":"Dashboard","select_state":"Zaɓi Jihar","select_lga":"Zaɓi LGA",
-           "data_saved":"An adana bayananka cikin nasara!","weather":"Yanayin Yanayi","recommended":"Amfanin Gona da ya dace"},
-    "yo": {"welcome":"Smart Farmers Data Portal","name":"Orúkọ Kíkún","phone":"Nọ́mbà Fóònù","state":"Ìpínlẹ̀","lga":"LGA",
-           "crop":"Iru Ọgbin","submit":"Firanṣẹ","dashboard":"Dashboard","select_state":"Yan Ìpínlẹ̀","select_lga":"Yan LGA",
-           "data_saved":"Fipamọ data ni aṣeyọri!","weather":"Ọjọ́ Òjò","recommended":"Ọgbin to dara"},
-    "ig": {"welcome":"Smart Farmers Data Portal","name":"Aha zuru ezu","phone":"Nọmba ekwentị","state":"Steeti","lga":"LGA",
-           "crop":"Uru ugbo","submit":"Zipu","dashboard":"Dashboard","select_state":"Họrọ Steeti","select_lga":"Họrọ LGA",
-           "data_saved":"Echekwara data nke ọma!","weather":"Ọnọdụ Ọnwụ̀","recommended":"Uru Ugbo kwesiri"}
-}
+def init_db(path=DB):
+    with pooled(path) as conn:
+        # farmers table, indexes, rollups and search index (see migrations.py)
+        migrate(conn)
+        # State/LGA reference data (no-op unless the dataset changed)
+        seed_locations(conn)
+
+# UI strings: translations/<lang>.json, compiled per app at startup (see i18n.py)
+DEFAULT_LANG = "ha"
 
 # === Templates ===
 form_template = """
@@ -89,20 +63,38 @@ img{max-width:100px;margin:5px;border-radius:5px;}
 <select name="lga" id="lga" required><option value="">{{strings['select_lga']}}</option></select>
 <label>{{strings['crop']}}</label><input type="text" name="crop" required>
 <label>{{strings['phone']}}</label><input type="text" name="phone" required>
-<label>Photo</label><input type="file" name="photo" accept="image/*" required>
+<label>{{strings['photo']}}</label><input type="file" name="photo" accept="image/*" required>
 <button type="submit">{{strings['submit']}}</button>
 </form>
-{% if success %}<p style="color:green;">{{strings['data_saved']}}</p>{% endif %}
+{% if registration %}<p style="color:green;">{% if registration.queued %}{{strings['data_queued']}} <a href="{{registration.status_url}}">{{registration.id}}</a>{% else %}{{strings['data_saved']}}{% endif %}</p>{% endif %}
+{% if duplicates %}<div style="border:1px solid #b35900;border-radius:5px;padding:10px;margin-top:10px;">
+<p style="color:#b35900;">{{strings['duplicate']}}</p>
+<ul>{% for d in duplicates %}<li>{{d.name}}, {{d.lga}} ({{d.state}}){% if d.phone %} {{d.phone}}{% endif %}</li>{% endfor %}</ul>
+<form method="POST" enctype="multipart/form-data">
+{% for k in ['name','state','lga','crop','phone'] %}<input type="hidden" name="{{k}}" value="{{values[k]}}">{% endfor %}
+<input type="hidden" name="allow_duplicate" value="1">
+<input type="hidden" name="photo_name" value="{{photo_name}}">
+<button type="submit">{{strings['register_anyway']}}</button>
+</form></div>{% endif %}
 <p><a href="/dashboard?lang={{lang}}">{{strings['dashboard']}}</a></p>
-<p>Language: <a href="/?lang=en">EN</a> | <a href="/?lang=ha">HA</a> | <a href="/?lang=yo">YO</a> | <a href="/?lang=ig">IG</a></p>
+<p>{{strings['language']}}: {% for code in languages %}{% if not loop.first %} | {% endif %}<a href="/?lang={{code}}" title="{{language_names[code]}}">{{code|upper}}</a>{% endfor %}</p>
 <script>
-const lga_data={{ lga_json|safe }};
+let lga_data={};
+fetch('/api/locations?v={{locations_version}}').then(r=>r.json()).then(d=>{lga_data=d.lgas;populateLGAs();{% if can_locate %}locate();{% endif %}});
 function populateLGAs(){
 let st=document.getElementById('state').value;
 let sel=document.getElementById('lga');
 sel.innerHTML='<option value="">{{strings["select_lga"]}}</option>';
 if(st in lga_data){lga_data[st].forEach(l=>{let o=document.createElement('option');o.value=l;o.innerHTML=l; sel.appendChild(o);});}
 }
+{% if can_locate %}function locate(){
+if(!navigator.geolocation) return;
+navigator.geolocation.getCurrentPosition(p=>{
+fetch('/api/locate?lat='+p.coords.latitude+'&lon='+p.coords.longitude).then(r=>r.ok?r.json():null).then(d=>{
+if(!d||document.getElementById('state').value) return;
+document.getElementById('state').value=d.state;populateLGAs();document.getElementById('lga').value=d.lga;});
+},()=>{},{maximumAge:600000,timeout:10000});
+}{% endif %}
 </script>
 </div></body></html>
 """
@@ -122,17 +114,18 @@ img{max-width:80px;border-radius:5px;}
 <body>
 <h2>{{strings['dashboard']}}</h2>
 <form method="GET">
+<input type="hidden" name="lang" value="{{lang}}">
 <label>{{strings['state']}}</label>
 <select name="filter_state" onchange="this.form.submit()">
-<option value="">All States</option>{% for s in states %}<option value="{{s}}" {% if s==selected_state %}selected{% endif %}>{{s}}</option>{% endfor %}
+<option value="">{{strings['all_states']}}</option>{{ state_options|safe }}
 </select>
 <label>{{strings['lga']}}</label>
 <select name="filter_lga" onchange="this.form.submit()">
-<option value="">All LGAs</option>{% for l in lgas %}<option value="{{l}}" {% if l==selected_lga %}selected{% endif %}>{{l}}</option>{% endfor %}
+<option value="">{{strings['all_lgas']}}</option>{{ lga_options|safe }}
 </select>
 </form>
 <table>
-<tr><th>{{strings['name']}}</th><th>{{strings['state']}}</th><th>{{strings['lga']}}</th><th>{{strings['crop']}}</th><th>{{strings['phone']}}</th><th>{{strings['weather']}}</th><th>{{strings['recommended']}}</th><th>Photo</th></tr>
+<tr><th>{{strings['name']}}</th><th>{{strings['state']}}</th><th>{{strings['lga']}}</th><th>{{strings['crop']}}</th><th>{{strings['phone']}}</th><th>{{strings['weather']}}</th><th>{{strings['recommended']}}</th><th>{{strings['photo']}}</th></tr>
 {% for f in farmers %}
 <tr>
 <td>{{f['name']}}</td>
@@ -142,177 +135,222 @@ img{max-width:80px;border-radius:5px;}
 <td>{{f['phone']}}</td>
 <td>{{f['weather']}}</td>
 <td>{{f['recommended']}}</td>
-<td>{% if f['photo'] %}<img src="{{f['photo']}}">{% endif %}</td>
+<td>{% if f['photo'][0] %}<img src="{{f['photo'][0]}}" loading="lazy"{% if f['photo'][1] %} onerror="this.onerror=null;this.src='{{f['photo'][1]}}'"{% endif %}>{% endif %}</td>
 </tr>
 {% endfor %}
 </table>
-<p><a href="/?lang={{lang}}">Back</a> | <a href="/download">Download CSV</a></p>
+{% if next_before %}<p><a href="/dashboard?lang={{lang}}&filter_state={{selected_state|urlencode}}&filter_lga={{selected_lga|urlencode}}&before={{next_before}}">{{strings['next_page']}} &raquo;</a></p>{% endif %}
+<p><a href="/?lang={{lang}}">{{strings['back']}}</a> | <a href="/download">{{strings['download_csv']}}</a></p>
 </body>
 </html>
 """
 
+options_template = """{% for v in values %}<option value="{{v}}" {% if v==selected %}selected{% endif %}>{{v}}</option>{% endfor %}"""
+
+# === Application factory ===
+def create_app(config=None):
+    app = Flask(__name__)
+    # photo uploads are hashed, size-checked and spooled as they are parsed (see photos.py)
+    app.request_class = PhotoRequest
+    app.config.update(DATABASE=DB, PHOTO_STORAGE=STORAGE, TRANSLATIONS=CATALOG_DIR)
+    app.config.update(config or {})
+    app.teardown_appcontext(close_db)
+    app.teardown_appcontext(close_history)
+    init_metrics(app)
+    init_db(app.config['DATABASE'])
+    init_write_queue(app)
+    catalogs = load_catalogs(app.config['TRANSLATIONS'])
+    # compiled once per app; pages/fragments that only depend on language and location data are cached,
+    # with room for every language's pages, so adding a language never evicts another's
+    app.extensions["farmers"] = {
+        "templates": compile_templates(app, form=form_template, dashboard=dashboard_template, options=options_template),
+        "catalogs": catalogs,
+        "page_cache": RenderCache(maxsize=256 + 4 * len(catalogs)),
+        # a local directory or an S3-compatible store (see storage.py)
+        "photos": open_storage(app.config['PHOTO_STORAGE']),
+    }
+    app.register_blueprint(bp)
+    return app
+
+def db():
+    return get_db(current_app.config['DATABASE'])
+
+def locations():
+    return get_locations(current_app.config['DATABASE'])
+
+def geo():
+    return get_geo_index(current_app.config['DATABASE'])
+
+def templates():
+    return current_app.extensions["farmers"]["templates"]
+
+def catalogs():
+    return current_app.extensions["farmers"]["catalogs"]
+
+def storage():
+    return current_app.extensions["farmers"]["photos"]
+
+def language():
+    # ?lang= (or its base language), else Hausa; the strings are a precompiled table
+    lang = catalogs().resolve(request.args.get("lang"), DEFAULT_LANG)
+    return lang, catalogs().tables[lang]
+
+def page_cache():
+    return current_app.extensions["farmers"]["page_cache"]
+
+def cached_options(key, values, selected):
+    return page_cache().get(("options",) + key + (selected,),
+                            lambda: templates()["options"].render(values=values, selected=selected))
+
 # === Routes ===
-@app.route("/", methods=["GET","POST"])
+@bp.route("/", methods=["GET","POST"])
 def home():
-    lang = request.args.get("lang","ha")
-    strings = lang_dict.get(lang, lang_dict["ha"])
-    success = False
-    conn = sqlite3.connect(DB)
-    c = conn.cursor()
-    c.execute("SELECT DISTINCT state FROM lga_coords ORDER BY state")
-    states = [r[0] for r in c.fetchall()]
+    lang, strings = language()
+    index = locations()
+    # no centroids loaded, no point asking for the device's location
+    can_locate = bool(geo())
     if request.method=="POST":
         name = request.form["name"]
         state = request.form["state"]
         lga = request.form["lga"]
         crop = request.form["crop"]
         phone = request.form["phone"]
-        photo = request.files["photo"]
-        filename = secure_filename(photo.filename)
-        photo_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        photo.save(photo_path)
-        c.execute("INSERT INTO farmers(name,state,lga,crop,phone,photo_path) VALUES(?,?,?,?,?,?)",
-                  (name,state,lga,crop,phone,photo_path))
-        conn.commit()
-        success=True
-    c.execute("SELECT state,lga FROM lga_coords")
-    lga_json={}
-    for s,l in c.fetchall(): lga_json.setdefault(s,[]).append(l)
-    conn.close()
-    return render_template_string(form_template, lang=lang, strings=strings, states=states, lga_json=lga_json, success=success)
-
-@app.route("/dashboard")
+        values = {"name":name,"state":state,"lga":lga,"crop":crop,"phone":phone}
+        # stored before the duplicate check, so "register anyway" sends back its name, not the file
+        upload = request.files.get("photo")
+        if upload and upload.filename:
+            with timed(PHOTO_SECONDS, key="photo"):
+                photo_path = save_photo(upload, storage())
+        else:
+            photo_path = saved_photo(request.form.get("photo_name"), storage())
+        # same phone, or a close name in the same LGA (see dedup.py); the officer can still confirm
+        duplicates = [] if request.form.get("allow_duplicate") else find_duplicates(db(), values)
+        if duplicates:
+            return render(templates()["form"], lang=lang, strings=strings, states=index.states,
+                          locations_version=index.version, duplicates=duplicates, values=values,
+                          photo_name=photo_name(photo_path), can_locate=can_locate,
+                          languages=catalogs().languages, language_names=catalogs().names)
+        # appended to this worker's queue log; one writer commits in batches (see write_queue.py)
+        registration_id, farmer_id = register(current_app.config['DATABASE'], dict(values, photo_path=photo_path),
+                                              current_app.config['WRITE_QUEUE'])
+        # only "saved" once the row is in farmers; a queued one can still fail, so link its status
+        registration = {"id": registration_id, "queued": farmer_id is None,
+                        "status_url": url_for(".api_registration", registration_id=registration_id)}
+        return render(templates()["form"], lang=lang, strings=strings, states=index.states,
+                      locations_version=index.version, registration=registration, can_locate=can_locate,
+                      languages=catalogs().languages, language_names=catalogs().names)
+    return page_cache().get(("form", lang, index.version, can_locate),
+                            lambda: render(templates()["form"], lang=lang, strings=strings, states=index.states,
+                                           locations_version=index.version, can_locate=can_locate,
+                                           languages=catalogs().languages, language_names=catalogs().names))
+
+@bp.route("/api/locations")
+def api_locations():
+    return locations_response(locations())
+
+# device GPS fix -> nearest state/LGA, used to pre-fill the form (see geo.py)
+@bp.route("/api/locate")
+def api_locate():
+    return jsonify(locate_response(geo(), request.args))
+
+def photo_urls(photo_path):
+    # (thumbnail, original if the thumbnail may not exist yet): straight from an object store
+    # when it signs URLs, else through this app
+    name = photo_name(photo_path)
+    if not name:
+        return photo_path, None
+    thumb = storage().url(thumb_key(name))
+    if thumb is None:
+        return url_for(".photo_thumb", name=name), None
+    return thumb, storage().url(original_key(name))
+
+@bp.route("/photos/<name>/thumb")
+def photo_thumb(name):
+    return thumb_response(name, storage())
+
+@bp.route("/dashboard")
 def dashboard():
-    lang = request.args.get("lang","ha")
-    strings = lang_dict.get(lang, lang_dict["ha"])
+    lang, strings = language()
     selected_state = request.args.get("filter_state","")
     selected_lga = request.args.get("filter_lga","")
-    conn = sqlite3.connect(DB)
-    c = conn.cursor()
-    query = "SELECT name,state,lga,crop,phone,photo_path FROM farmers WHERE 1=1"
-    params=[]
-    if selected_state: query+=" AND state=?"; params.append(selected_state)
-    if selected_lga: query+=" AND lga=?"; params.append(selected_lga)
-    c.execute(query, params)
-    rows=c.fetchall()
-    farmers=[]
-    for r in rows:
-        farmers.append({"name":r[0],"state":r[1],"lga":r[2],"crop":r[3],"phone":r[4],
-                        "photo":r[5],"weather":random.choice(["Dry","Normal","Flood risk"]),
-                        "recommended":random.choice(["Maize","Rice","Yam","Vegetables"])})
-    c.execute("SELECT DISTINCT state FROM lga_coords ORDER BY state")
-    states=[r[0] for r in c.fetchall()]
-    lgas=[]
-    if selected_state:
-        c.execute("SELECT lga FROM lga_coords WHERE state=?",(selected_state,))
-        lgas=[r[0] for r in c.fetchall()]
-    conn.close()
-    return render_template_string(dashboard_template, lang=lang, strings=strings, farmers=farmers,
-                                  states=states, lgas=lgas, selected_state=selected_state, selected_lga=selected_lga)
-
-@app.route("/download")
+    before, limit = page_args(request.args)
+    rows, next_before = keyset_page(db(), "farmers", ["name","state","lga","crop","phone","photo_path"],
+                                    {"state":selected_state, "lga":selected_lga}, before, limit)
+    farmers=[{"name":r[1],"state":r[2],"lga":r[3],"crop":r[4],"phone":r[5],"photo":photo_urls(r[6])} for r in rows]
+    indicators.annotate(farmers)
+    index = locations()
+    return render(templates()["dashboard"], lang=lang, strings=strings, farmers=farmers,
+                  state_options=cached_options((index.version,), index.states, selected_state),
+                  lga_options=cached_options((index.version, selected_state), index.lgas_for(selected_state),
+                                             selected_lga),
+                  selected_state=selected_state, selected_lga=selected_lga, next_before=next_before)
+
+@bp.route("/api/farmers")
+def api_farmers():
+    before, limit = page_args(request.args)
+    columns = ["name","state","lga","crop","phone","photo_path","created_at"]
+    rows, next_before = keyset_page(db(), "farmers", columns,
+                                    {"state":request.args.get("state"), "lga":request.args.get("lga")}, before, limit)
+    farmers = indicators.annotate([dict(zip(["id"]+columns, r)) for r in rows])
+    return jsonify({"farmers":farmers, "next_before":next_before})
+
+@bp.route("/api/search")
+def api_search():
+    return jsonify(search_response(db(), request.args, ["name","state","lga","crop","phone","photo_path"]))
+
+@bp.route("/api/import", methods=["POST"])
+def api_import():
+    # multipart "file" field, or the raw CSV/JSONL body
+    upload = request.files.get("file")
+    if upload:
+        stream, fmt = upload.stream, detect_format(upload.filename, upload.mimetype)
+    else:
+        stream, fmt = request.stream, detect_format(mimetype=request.mimetype)
+    report = import_upload(db(), stream, request.args.get("format", fmt), locations(), geo=geo())
+    return jsonify(report)
+
+# offline tablets: one gzip'd JSONL batch up, compact deltas down (see sync.py)
+@bp.route("/api/sync/push", methods=["POST"])
+def api_sync_push():
+    return jsonify(push_records(db(), locations()))
+
+@bp.route("/api/sync/pull")
+def api_sync_pull():
+    return pull_response(db(), ["name","state","lga","crop","phone","photo_path","created_at"])
+
+@bp.route("/api/registrations", methods=["POST"])
+def api_register():
+    return registration_response(db(), current_app.config['DATABASE'], locations(), current_app.config['WRITE_QUEUE'])
+
+@bp.route("/api/registrations/<registration_id>")
+def api_registration(registration_id):
+    return jsonify(registration_status(db(), current_app.config['DATABASE'], registration_id))
+
+# ?season=2024 or all adds archived seasons (see archive.py); without it only the hot table is read
+@bp.route("/api/stats")
+def api_stats():
+    return jsonify(season_stats(db(), current_app.config['DATABASE'], request.args))
+
+@bp.route("/download")
 def download_csv():
-    conn = sqlite3.connect(DB)
-    c = conn.cursor()
-    c.execute("SELECT name,state,lga,crop,phone,photo_path FROM farmers")
-    rows=c.fetchall()
-    conn.close()
-    path="farmers_data.csv"
-    with open(path,"w",newline="",encoding="utf-8") as f:
-        writer=csv.writer(f)
-        writer.writerow(["Name","State","LGA","Crop","Phone","Photo"])
-        writer.writerows(rows)
-    return send_file(path, as_attachment=True)
+    columns = ["id","name","state","lga","crop","phone","photo_path","created_at"]
+    # ?season= reads that season, archives included (see archive.py); otherwise the hot table.
+    # Rows come in short keyset pages, so a slow download never pins a connection (see export.py)
+    table, rows, created = season_source(current_app.config['DATABASE'], request.args)
+    sql, params = export_query(table, columns, request.args, created)
+    if request.args.get("format") == "parquet":
+        return parquet_response(rows, sql, params, columns, "farmers_data.parquet")
+    return csv_response(rows, sql, params, ["ID","Name","State","LGA","Crop","Phone","Photo","Registered"],
+                        "farmers_data.csv", gzip=request.args.get("gzip") == "1")
+
+# whole table for the data office, rebuilt part by part as rows change (see columnar.py)
+@bp.route("/download/snapshot")
+def download_snapshot():
+    return snapshot_response(db(), current_app.config['DATABASE'], "farmers.parquet")
+
+# gunicorn app:app, or the async mode for slow clients: uvicorn app:asgi_app (see asgi.py)
+app = create_app()
+asgi_app = ASGIApp(app)
 
 if __name__=="__main__":
     app.run(host="0.0.0.0", port=5000)
-    all_locations = {
-    "Abia": ["Aba North","Aba South","Umuahia North","Umuahia South","Isiala Ngwa North","Isiala Ngwa South",
-             "Isuikwuato","Obi Ngwa","Ohafia","Arochukwu","Bende","Ugwunagbo","Ukwa East","Ukwa West"],
-    "Adamawa": ["Demsa","Fufore","Ganye","Girei","Gombi","Guyuk","Hong","Jada","Lamurde","Madagali",
-                "Maiha","Mayo Belwa","Michika","Mubi North","Mubi South","Numan","Shelleng","Song","Toungo","Yola North","Yola South"],
-    "Akwa Ibom": ["Abak","Eastern Obolo","Eket","Esit Eket","Essien Udim","Etim Ekpo","Etinan","Ibeno",
-                  "Ibesikpo Asutan","Ibiono-Ibom","Ikono","Ikot Abasi","Ikot Ekpene","Ini","Itu","Mbo",
-                  "Mkpat-Enin","Nsit-Atai","Nsit-Ibom","Nsit-Ubium","Obot Akara","Okobo","Onna","Oron",
-                  "Oruk Anam","Udung-Uko","Ukanafun","Uruan","Urue-Offong/Oruko","Uyo"],
-    "Anambra": ["Aguata","Anambra East","Anambra West","Anaocha","Awka North","Awka South","Ayamelum",
-                "Dunukofia","Ekwusigo","Idemili North","Idemili South","Ihiala","Njikoka","Nnewi North",
-                "Nnewi South","Ogbaru","Onitsha North","Onitsha South","Orumba North","Orumba South","Oyi"],
-    "Bauchi": ["Alkaleri","Bauchi","Bogoro","Damban","Darazo","Dass","Gamawa","Ganjuwa","Giade",
-               "Itas/Gadau","Jamaare","Katagum","Kirfi","Misau","Ningi","Shira","Tafawa Balewa","Toro","Warji","Zaki"],
-    "Bayelsa": ["Brass","Ekeremor","Kolokuma/Opokuma","Nembe","Ogbia","Sagbama","Southern Ijaw","Yenagoa"],
-    "Benue": ["Ado","Agatu","Apa","Buruku","Gboko","Guma","Gwer East","Gwer West","Katsina-Ala",
-              "Konshisha","Kwande","Logo","Makurdi","Obi","Ogbadibo","Ohimini","Oju","Okpokwu","Otukpo","Tarka","Ukum","Vandeikya"],
-    "Borno": ["Abadam","Askira/Uba","Bama","Bayo","Biu","Chibok","Damboa","Dikwa","Gubio","Guzamala",
-              "Gwoza","Hawul","Jere","Kaga","Kala/Balge","Konduga","Kukawa","Kwaya Kusar","Mafa","Magumeri",
-              "Maiduguri","Marte","Mobbar","Monguno","Ngala","Nganzai","Shani"],
-    "Cross River": ["Abi","Akamkpa","Akpabuyo","Bakassi","Bekwarra","Biase","Boki","Calabar Municipal","Calabar South",
-                     "Etung","Ikom","Obanliku","Obubra","Obudu","Odukpani","Ogoja","Yakuur","Bekwarra"],
-    "Delta": ["Aniocha North","Aniocha South","Bomadi","Burutu","Ethiope East","Ethiope West","Ika North East",
-              "Ika South","Isoko North","Isoko South","Ndokwa East","Ndokwa West","Okpe","Oshimili North","Oshimili South",
-              "Patani","Sapele","Udu","Ughelli North","Ughelli South","Ukwuani","Uvwie","Warri North","Warri South","Warri South West"],
-    "Ebonyi": ["Abakaliki","Afikpo North","Afikpo South","Ebonyi","Ezza North","Ezza South","Ikwo","Ishielu",
-               "Ivo","Izzi","Ohaozara","Ohaukwu","Onicha"],
-    "Edo": ["Akoko-Edo","Egor","Esan Central","Esan North-East","Esan South-East","Esan West","Etsako Central",
-            "Etsako East","Etsako West","Igueben","Ikpoba-Okha","Oredo","Orhionmwon","Ovia North-East","Ovia South-West","Owan East","Owan West","Uhunmwonde"],
-    "Ekiti": ["Ado-Ekiti","Efon","Ekiti East","Ekiti South-West","Ekiti West","Emure","Gbonyin","Ido-Osi",
-              "Ijero","Ikere","Ikole","Ilejemeje","Irepodun/Ifelodun","Ise/Orun","Moba","Oye"],
-    "Enugu": ["Awgu","Enugu East","Enugu North","Enugu South","Ezeagu","Igbo Etiti","Igbo Eze North",
-              "Igbo Eze South","Isi Uzo","Nkanu East","Nkanu West","Nsukka","Oji River","Udenu","Udi","Uzo-Uwani"],
-    "Gombe": ["Akko","Balanga","Billiri","Dukku","Funakaye","Gombe","Kaltungo","Kwami","Nafada/Bajoga","Shongom","Yamaltu/Deba"],
-    "Imo": ["Aboh Mbaise","Ahiazu Mbaise","Ehime Mbano","Ezinihitte","Ideato North","Ideato South","Ihitte/Uboma",
-            "Ikeduru","Isiala Mbano","Isu","Mbaitoli","Ngor Okpala","Njaba","Nkwerre","Nwangele","Obowo","Oguta","Ohaji/Egbema","Okigwe","Onuimo","Orlu","Orsu","Oru East","Oru West","Owerri Municipal","Owerri North","Owerri West"],
-    "Jigawa": ["Auyo","Babura","Biriniwa","Birnin Kudu","Buji","Dutse","Gagarawa","Garki","Gumel","Guri",
-               "Gwaram","Gwiwa","Hadejia","Jahun","Kafin Hausa","Kaugama","Kazaure","Kiri Kasama","Kiyawa","Maigatari",
-               "Malam Madori","Miga","Ringim","Roni","Sule Tankarkar","Taura","Yankwashi"],
-    "Kaduna": ["Birnin Gwari","Chikun","Giwa","Igabi","Ikara","Jaba","Jema'a","Kachia","Kaduna North","Kaduna South",
-               "Kagarko","Kajuru","Kaura","Kauru","Kubau","Kudan","Lere","Makarfi","Sabon Gari","Sanga","Soba","Zangon Kataf","Zaria"],
-    "Kano": ["Ajingi","Albasu","Bagwai","Bebeji","Bichi","Bunkure","Dala","Dambatta","Dawakin Kudu","Dawakin Tofa",
-             "Doguwa","Fagge","Gabasawa","Garko","Garun Mallam","Gaya","Gezawa","Gwale","Gwarzo","Kabo",
-             "Kano Municipal","Karaye","Kibiya","Kiru","Kumbotso","Kunchi","Kura","Madobi","Makoda","Minjibir",
-             "Nasarawa","Rano","Rimin Gado","Rogo","Shanono","Sumaila","Takai","Tarauni","Tofa","Tsanyawa","Tudun Wada","Ungogo","Warawa","Wudil"],
-    "Katsina": ["Bakori","Batagarawa","Batsari","Baure","Bindawa","Charanchi","Dandume","Danja","Daura",
-                "Dutsi","Dutsin Ma","Faskari","Funtua","Ingawa","Jibia","Kafur","Kaita","Kankara","Kankia","Katsina",
-                "Kurfi","Kusada","Mai Adua","Malumfashi","Mani","Mashi","Matazu","Musawa","Rimi","Sabuwa","Safana","Sandamu","Zango"],
-    "Kebbi": ["Aleiro","Arewa Dandi","Argungu","Augie","Bagudo","Birnin Kebbi","Bunza","Dandi","Fakai","Gwandu",
-              "Jega","Kalgo","Koko/Besse","Maiyama","Ngaski","Sakaba","Shanga","Suru","Wasagu/Danko","Yauri","Zuru"],
-    "Kogi": ["Adavi","Ajaokuta","Ankpa","Bassa","Dekina","Ibaji","Idah","Igalamela-Odolu","Ijumu","Kabba/Bunu",
-             "Kogi","Lokoja","Mopa-Muro","Ofu","Ogori/Magongo","Okehi","Okene","Olamaboro","Omala","Yagba East","Yagba West"],
-    "Kwara": ["Asa","Baruten","Edu","Ekiti","Ifelodun","Ilorin East","Ilorin South","Ilorin West","Irepodun",
-              "Isin","Kaiama","Moro","Offa","Oke Ero","Oyun","Pategi"],
-    "Lagos": ["Agege","Ajeromi-Ifelodun","Alimosho","Amuwo-Odofin","Apapa","Badagry","Epe","Eti Osa","Ibeju-Lekki",
-              "Ifako-Ijaiye","Ikeja","Ikorodu","Kosofe","Lagos Island","Lagos Mainland","Mushin","Ojo","Oshodi-Isolo",
-              "Shomolu","Surulere"],
-    "Nasarawa": ["Akwanga","Awe","Doma","Karu","Keana","Keffi","Kokona","Lafia","Nasarawa","Nasarawa Egon",
-                 "Obi","Toto","Wamba"],
-    "Niger": ["Agaie","Agwara","Bida","Borgu","Bosso","Chanchaga","Edati","Gbako","Gurara","Katcha","Kontagora",
-              "Lapai","Lavun","Magama","Mariga","Mashegu","Mokwa","Muya","Paikoro","Rafi","Rijau","Shiroro","Suleja","Tafa","Wushishi"],
-    "Ogun": ["Abeokuta North","Abeokuta South","Ado-Odo/Ota","Egbado North","Egbado South","Ewekoro","Ifo","Ijebu East",
-             "Ijebu North","Ijebu North East","Ijebu Ode","Ikenne","Imeko Afon","Ipokia","Obafemi-Owode","Odeda",
-             "Odogbolu","Ogun Waterside","Remo North","Shagamu"],
-    "Ondo": ["Akoko North-East","Akoko North-West","Akoko South-East","Akoko South-West","Akure North","Akure South",
-             "Ese Odo","Idanre","Ifedore","Ilaje","Ile Oluji/Okeigbo","Irele","Odigbo","Okitipupa","Ondo East",
-             "Ondo West","Ose","Owo"],
-    "Osun": ["Aiyedade","Aiyedire","Atakunmosa East","Atakunmosa West","Boluwaduro","Boripe","Ede North","Ede South",
-             "Egbedore","Ejigbo","Ife Central","Ife East","Ife North","Ife South","Ifedayo","Ifelodun","Ila","Ilesa East",
-             "Ilesa West","Irepodun","Irewole","Isokan","Iwo","Obokun","Odo Otin","Ola Oluwa","Olorunda","Oriade",
-             "Orolu","Osogbo"],
-    "Oyo": ["Afijio","Akinyele","Atiba","Atisbo","Egbeda","Ibadan North","Ibadan North-East","Ibadan North-West",
-            "Ibadan South-East","Ibadan South-West","Ibarapa Central","Ibarapa East","Ibarapa North","Ido","Irepo",
-            "Iseyin","Itesiwaju","Iwajowa","Kajola","Lagelu","Ogbomosho North","Ogbomosho South","Ogo Oluwa",
-            "Olorunsogo","Oluyole","Ona Ara","Orelope","Orire","Oru","Oyo East","Oyo West","Saki East","Saki West","Surulere"],
-    "Plateau": ["Barkin Ladi","Bassa","Bokkos","Jos East","Jos North","Jos South","Kanam","Kanke","Langtang North",
-                "Langtang South","Mangu","Mikang","Pankshin","Qua'an Pan","Riyom","Shendam","Wase"],
-    "Rivers": ["Abua/Odual","Ahoada East","Ahoada West","Akuku-Toru","Andoni","Asari-Toru","Bonny","Degema","Eleme",
-               "Emohua","Etche","Gokana","Ikwerre","Khana","Obio/Akpor","Ogba/Egbema/Ndoni","Ogu/Bolo","Okrika",
-               "Omuma","Opobo/Nkoro","Oyigbo","Port Harcourt","Tai"],
-    "Sokoto": ["Binji","Bodinga","Dange Shuni","Gada","Goronyo","Gudu","Gwadabawa","Illela","Kebbe","Kware",
-               "Rabah","Sabon Birni","Shagari","Sokoto North","Sokoto South","Tambuwal","Tangaza","Tureta","Wamako","Wurno","Yabo"],
-    "Taraba": ["Ardo Kola","Bali","Donga","Gashaka","Gassol","Ibi","Jalingo","Karim Lamido","Kumi","Lau","Sardauna",
-               "Takum","Ussa","Wukari","Yorro","Zing"],
-    "Yobe": ["Bade","Bursari","Damaturu","Fika","Fune","Geidam","Gujba","Gulani","Jakusko","Karasuwa","Machina",
-             "Nangere","Nguru","Potiskum","Tarmuwa","Yunusari","Yusufari"],
-    "Zamfara": ["Anka","Bakura","Birnin Magaji/Kiyaw","Bukkuyum","Bungudu","Gummi","Gusau","Kaura Namoda","Maradun",
-                "Maru","Shinkafi","Talata Mafara","Tsafe","Zurmi"],
-    "FCT": ["Abaji","Bwari","Gwagwalada","Kuje","Kwali","AMAC"]
-}
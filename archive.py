@@ -0,0 +1,432 @@
+"""Season partitioning: finished seasons move out of farmers into read-only archive files.
+
+A season starts on SEASON_START (MM-DD, default 03-01, when the
+registration drives begin) and is named by the year it starts in. The hot
+database keeps the current season, and everything that does not ask for
+history -- registration, dashboards, search, sync, /download, /api/stats --
+reads only the hot table, so its tables and indexes stay about a season big.
+
+    python archive.py status farmers.db
+    python archive.py archive farmers.db 2023 2024 [--compress]
+    python archive.py compress farmers.db [season ...]
+
+archive_season() moves one finished season into <database>.archive/farmers-<season>.db:
+
+1. the season's rows are copied into a new file with the farmers schema,
+   indexes and rollups, reading the hot table without holding its write lock;
+2. the file is registered in `archives` as 'moving' and the rows leave the
+   hot table in short batches; each batch first brings the archive's copy
+   of its rows up to date (edits and deletes since step 1, by change_seq);
+3. the file is vacuumed, made read-only (mode 0444) and marked 'done';
+   with compress it is replaced by an xz file.
+
+The deletes go through the usual triggers, so the hot rollups, search index
+and parquet snapshot shrink with it, and tablets drop archived rows on their
+next pull. A row that arrives late for an archived season (an offline
+tablet) stays hot; archiving that season again moves it into another part,
+farmers-<season>-2.db. An interrupted archive resumes where it stopped.
+
+Archives are opened only when a request asks for history with ?season=:
+
+    /download?season=2024     that season: its archives plus its rows still hot
+    /download?season=all      every farmer ever registered
+    /api/stats?season=2024    the archives' own rollups plus the season's hot rows
+
+open_history() attaches the archives read-only to a connection of its own
+and creates farmers_history, the hot table UNION ALL the archives. SQLite
+merges the arms by id, so an export's keyset pages stay index range reads.
+A compressed archive is decompressed once, into <database>.archive/cache.
+Duplicate checks and search only look at the hot table.
+"""
+import datetime, json, lzma, os, shutil, sqlite3, sys, threading, time, urllib.parse
+from contextlib import contextmanager
+from flask import abort, g
+from db import connect, pooled, run_batches
+from export import paged
+from migrations import ALL_FARMER_INDEXES, farmers_schema, _stored_columns
+from dedup import DEDUP_INDEXES
+from stats import all_stats, count_rollup, install_rollups, read_rollup, rollups_for
+
+SEASON_START = os.environ.get("SEASON_START", "03-01")
+BATCH_SIZE = 1000      # ids deleted per transaction; each holds the hot write lock
+COMPRESS_PRESET = 6
+COPY_BLOCK = 1024 * 1024
+
+
+def season_of(created_at):
+    """The season a created_at ("YYYY-MM-DD ...") falls in."""
+    year = int(created_at[:4])
+    return year if created_at[5:10] >= SEASON_START else year - 1
+
+
+def season_bounds(season):
+    """[start, end) of a season, comparable with created_at."""
+    return f"{season:04d}-{SEASON_START}", f"{season + 1:04d}-{SEASON_START}"
+
+
+def current_season(today=None):
+    return season_of((today or datetime.date.today()).isoformat())
+
+
+def archive_dir(path):
+    return path + ".archive"
+
+
+def _file_path(path, file):
+    return os.path.join(archive_dir(path), file)
+
+
+def _archives(conn, season=None):
+    """Registered archives as (file, season, state, compressed), oldest season first."""
+    sql = "SELECT file, season, state, compressed FROM archives"
+    if season is None or season == "all":
+        return conn.execute(sql + " ORDER BY season, file").fetchall()
+    return conn.execute(sql + " WHERE season = ? ORDER BY file", (season,)).fetchall()
+
+
+def _transaction(conn, *statements):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for sql, params in statements:
+            conn.execute(sql, params)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+# === Moving a season out ===
+def archive_season(path, season, compress=False, batch_size=BATCH_SIZE, progress=None, today=None):
+    """Move the farmers registered in `season` into a new archive file; returns
+    the file name, or None if the hot table holds none of that season's rows."""
+    if season >= current_season(today):
+        raise ValueError(f"season {season} is not over yet")
+    with pooled(path) as conn:
+        moving = conn.execute("SELECT file FROM archives WHERE season = ? AND state = 'moving'",
+                              (season,)).fetchone()
+        file = moving[0] if moving else _copy_season(conn, path, season)
+        if file is None:
+            return None
+        _move(conn, path, file, season, batch_size, progress)
+        _seal(conn, path, file)
+    if compress:
+        compress_archive(path, file)
+    return file
+
+
+def _copy_season(conn, path, season):
+    """Step 1: a new archive file holding the season's hot rows, registered as 'moving'."""
+    lo, hi = season_bounds(season)
+    os.makedirs(archive_dir(path), exist_ok=True)
+    taken = {r[0] for r in conn.execute("SELECT file FROM archives")}
+    file, part = f"farmers-{season}.db", 1
+    while file in taken:
+        part += 1
+        file = f"farmers-{season}-{part}.db"
+    target = _file_path(path, file)
+    building = target + ".building"
+    for leftover in (target, building, building + "-journal"):  # from an interrupted copy
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+    dst = sqlite3.connect(building)
+    dst.execute(farmers_schema())
+    install_rollups(dst)  # its triggers count the rows as they arrive
+    dst.close()
+    columns = ", ".join(_stored_columns(conn, "farmers"))
+    conn.execute("ATTACH DATABASE ? AS season_copy", (building,))
+    try:
+        # a read of main and a write to the new file only: hot writers carry on
+        try:
+            copied = conn.execute(f"INSERT INTO season_copy.farmers({columns}) SELECT {columns} FROM main.farmers "
+                                  "WHERE created_at >= ? AND created_at < ? ORDER BY id", (lo, hi)).rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        conn.execute("DETACH DATABASE season_copy")
+    if not copied:
+        os.remove(building)
+        return None
+
+    dst = sqlite3.connect(building)
+    for sql in ALL_FARMER_INDEXES + DEDUP_INDEXES:
+        dst.execute(sql)
+    dst.commit()
+    dst.close()
+    os.replace(building, target)
+    _transaction(conn, ("INSERT INTO archives(file, season, rows) VALUES(?, ?, ?)", (file, season, copied)))
+    return file
+
+
+def _move(conn, path, file, season, batch_size, progress):
+    """Step 2: delete the archived rows from the hot table, batch_size ids per transaction.
+
+    archives.moved is the highest id already gone from the hot table; the
+    history view reads the archive only up to it while the move runs.
+    """
+    lo, hi = season_bounds(season)
+    columns = _stored_columns(conn, "farmers")
+    cols = ", ".join(columns)
+    changed = ", ".join(f"{c} = excluded.{c}" for c in columns if c != "id")
+    in_season = "id > ? AND id <= ? AND created_at >= ? AND created_at < ?"
+    conn.execute("ATTACH DATABASE ? AS season_copy", (_file_path(path, file),))
+    try:
+        moved, = conn.execute("SELECT moved FROM archives WHERE file = ?", (file,)).fetchone()
+        last, = conn.execute("SELECT COALESCE(MAX(id), 0) FROM season_copy.farmers").fetchone()
+
+        def move_batch(conn):
+            nonlocal moved
+            if moved >= last:
+                return None
+            high = conn.execute("SELECT MAX(id) FROM (SELECT id FROM season_copy.farmers WHERE id > ? "
+                                "ORDER BY id LIMIT ?)", (moved, batch_size)).fetchone()[0]
+            bounds = (moved, high, lo, hi)
+            # rows edited since the copy, then rows deleted (or moved to another season) since
+            conn.execute(f"INSERT INTO season_copy.farmers({cols}) SELECT {cols} FROM main.farmers WHERE {in_season} "
+                         f"ON CONFLICT(id) DO UPDATE SET {changed} WHERE change_seq IS NOT excluded.change_seq", bounds)
+            conn.execute(f"DELETE FROM season_copy.farmers WHERE id > ? AND id <= ? AND id NOT IN "
+                         f"(SELECT id FROM main.farmers WHERE {in_season})", (moved, high) + bounds)
+            conn.execute(f"DELETE FROM main.farmers WHERE {in_season}", bounds)
+            conn.execute("UPDATE archives SET moved = ? WHERE file = ?", (high, file))
+            moved = high
+            return moved, last
+
+        run_batches(conn, move_batch, progress)
+        rows, = conn.execute("SELECT COUNT(*) FROM season_copy.farmers").fetchone()
+    finally:
+        conn.execute("DETACH DATABASE season_copy")
+    _transaction(conn, ("UPDATE archives SET rows = ? WHERE file = ?", (rows, file)))
+
+
+def _seal(conn, path, file):
+    """Step 3: compact the file, make it read-only and mark it done."""
+    target = _file_path(path, file)
+    if os.stat(target).st_mode & 0o222:  # not sealed yet
+        dst = sqlite3.connect(target)
+        dst.execute("ANALYZE")
+        dst.execute("VACUUM")
+        dst.close()
+        os.chmod(target, 0o444)
+    _transaction(conn, ("UPDATE archives SET state = 'done' WHERE file = ?", (file,)))
+
+
+def compress_archive(path, file):
+    """Replace a done archive by <file>.xz; history requests decompress it into the cache once."""
+    target = _file_path(path, file)
+    with pooled(path) as conn:
+        row = conn.execute("SELECT state, compressed FROM archives WHERE file = ?", (file,)).fetchone()
+        if row is None or row[0] != "done":
+            raise ValueError(f"{file} is not a finished archive")
+        if row[1]:
+            return False
+        packed = target + ".xz"
+        with open(target, "rb") as src, lzma.open(packed + ".tmp", "wb", preset=COMPRESS_PRESET) as out:
+            shutil.copyfileobj(src, out, COPY_BLOCK)
+        os.chmod(packed + ".tmp", 0o444)
+        os.replace(packed + ".tmp", packed)
+        _transaction(conn, ("UPDATE archives SET compressed = 1 WHERE file = ?", (file,)))
+    os.remove(target)  # a history connection that has it attached keeps reading it
+    return True
+
+
+# === Reading history ===
+def _cached(path, file):
+    """A compressed archive's decompressed copy, made on first use."""
+    cached = os.path.join(archive_dir(path), "cache", file)
+    if not os.path.exists(cached):
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        # several workers may get here at once; each writes its own file and the last rename wins
+        tmp = f"{cached}.{os.getpid()}.{threading.get_ident()}"
+        with lzma.open(_file_path(path, file) + ".xz") as src, open(tmp, "wb") as out:
+            shutil.copyfileobj(src, out, COPY_BLOCK)
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, cached)
+    return cached
+
+
+def _archive_uri(path, file, state, compressed):
+    location = os.path.abspath(_cached(path, file) if compressed else _file_path(path, file))
+    # a sealed file never changes, so SQLite can skip locking it
+    return f"file:{urllib.parse.quote(location)}?mode=ro" + ("&immutable=1" if state == "done" else "")
+
+
+def _columns(conn, schema):
+    # generated columns too (table_xinfo hidden 2/3), not hidden virtual-table ones (1)
+    return [r[1] for r in conn.execute(f"PRAGMA {schema}.table_xinfo(farmers)") if r[6] != 1]
+
+
+def open_history(path, season=None):
+    """A new read-only connection with farmers_history: the farmers of `season` (every
+    season for None or "all"), hot and archived. The caller closes it."""
+    conn = connect(path, uri=True)
+    try:
+        archives = _archives(conn, season)
+        limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        if len(archives) > limit:
+            raise ValueError(f"{len(archives)} archives, but SQLite attaches at most {limit}; "
+                             "ask for fewer seasons")
+        schemas = [f"archive{n}" for n in range(len(archives))]
+        for schema, (file, _, state, compressed) in zip(schemas, archives):
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (_archive_uri(path, file, state, compressed),))
+        columns = _columns(conn, "main")
+        for schema in schemas:
+            present = set(_columns(conn, schema))
+            columns = [c for c in columns if c in present]
+        cols = ", ".join(columns)
+        # an archive only holds its season; the hot table is narrowed to it by id, so that
+        # every arm is read in id order (a created_at range on the view would sort instead)
+        hot = "" if season in (None, "all") else (
+            " WHERE id IN (SELECT id FROM main.farmers WHERE created_at >= '{}' AND created_at < '{}')"
+            .format(*season_bounds(season)))
+        arms = [f"SELECT {cols} FROM main.farmers{hot}"]
+        for schema, (file, _, state, _) in zip(schemas, archives):
+            # while a season is moving its newer rows are still hot; read them there
+            arms.append(f"SELECT {cols} FROM {schema}.farmers" + ("" if state == "done" else
+                        f" WHERE id <= (SELECT moved FROM main.archives WHERE file = '{file}')"))
+        conn.execute("CREATE TEMP VIEW farmers_history AS " + " UNION ALL ".join(arms))
+        conn.execute("PRAGMA query_only = 1")
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+def history_schemas(conn):
+    return [r[1] for r in conn.execute("PRAGMA database_list") if r[1].startswith("archive")]
+
+
+def get_history(path, season=None):
+    """Like db.get_db: one history connection for the rest of the request; close_history closes it."""
+    conns = g.setdefault("_history_conns", {})
+    conn = conns.get((path, season))
+    if conn is None:
+        try:
+            conn = conns[(path, season)] = open_history(path, season)
+        except ValueError as e:
+            abort(400, str(e))
+    return conn
+
+
+def close_history(exception=None):
+    for conn in g.pop("_history_conns", {}).values():
+        conn.close()
+
+
+def season_arg(args):
+    """?season= as a season, "all", or None (hot data only)."""
+    season = args.get("season")
+    if not season:
+        return None
+    if season == "all":
+        return season
+    try:
+        return int(season)
+    except ValueError:
+        abort(400, "season must be the year it starts in, or all")
+
+
+def _history_borrow(season):
+    @contextmanager
+    def borrow(path):
+        yield get_history(path, season)
+    return borrow
+
+
+def season_source(path, args):
+    """(table, rows, created bounds) for an export: pass `rows` instead of a connection
+    to csv_response()/parquet_response(). Only a ?season= with archives opens them."""
+    season = season_arg(args)
+    if season is None:
+        return "farmers", paged(path), None
+    with pooled(path) as conn:
+        archived = _archives(conn, season)
+    if not archived:
+        return "farmers", paged(path), None if season == "all" else season_bounds(season)
+    return "farmers_history", paged(path, _history_borrow(season)), None  # already just that season
+
+
+def _hot_counts(conn, name, season):
+    if season == "all":
+        return read_rollup(conn, name)
+    lo, hi = season_bounds(season)
+    inside, = conn.execute("SELECT COUNT(*) FROM farmers WHERE created_at >= ? AND created_at < ?",
+                           (lo, hi)).fetchone()
+    if not inside:
+        return []
+    total = sum(r[-1] for r in read_rollup(conn, "state"))
+    if inside < total - inside:
+        return count_rollup(conn, name, "created_at >= ? AND created_at < ?", (lo, hi))
+    # mostly this season (the usual hot table): the rollup, less the few other rows
+    counts = {r[:-1]: r[-1] for r in read_rollup(conn, name)}
+    for row in count_rollup(conn, name, "created_at < ? OR created_at >= ? OR created_at IS NULL", (lo, hi)):
+        counts[row[:-1]] -= row[-1]
+    return [key + (n,) for key, n in counts.items()]
+
+
+def season_stats(conn, path, args):
+    """all_stats() for ?season=: the hot rollups alone without it, else one season's
+    (or every season's) counts from the archives' rollups plus the hot rows."""
+    season = season_arg(args)
+    if season is None:
+        return all_stats(conn)
+    history = get_history(path, season) if _archives(conn, season) else None
+    stats = {}
+    for name, keys in rollups_for(conn).items():
+        totals = {}
+        parts = [_hot_counts(conn, name, season)]
+        if history is not None:
+            parts += [read_rollup(history, name, schema) for schema in history_schemas(history)]
+        for rows in parts:
+            for row in rows:
+                totals[row[:-1]] = totals.get(row[:-1], 0) + row[-1]
+        stats[name] = [dict(zip(keys + ("count",), key + (n,))) for key, n in sorted(totals.items()) if n > 0]
+    return stats
+
+
+# === CLI ===
+def status(path, today=None):
+    with pooled(path) as conn:
+        first, last = conn.execute("SELECT (SELECT MIN(created_at) FROM farmers), "
+                                   "(SELECT MAX(created_at) FROM farmers)").fetchone()
+        hot = {}
+        if first is not None:
+            for season in range(season_of(first), season_of(last) + 1):
+                n, = conn.execute("SELECT COUNT(*) FROM farmers WHERE created_at >= ? AND created_at < ?",
+                                  season_bounds(season)).fetchone()
+                if n:
+                    hot[season] = n
+        archives = [dict(zip(("file", "season", "rows", "state", "compressed", "moved", "archived_at"), r))
+                    for r in conn.execute("SELECT file, season, rows, state, compressed, moved, archived_at "
+                                          "FROM archives ORDER BY season, file")]
+    for a in archives:
+        packed = _file_path(path, a["file"]) + (".xz" if a["compressed"] else "")
+        a["bytes"] = os.path.getsize(packed) if os.path.exists(packed) else None
+    return {"current_season": current_season(today), "hot": hot, "archives": archives}
+
+
+def _progress(done, total):
+    print(f"\r  {done}/{total}", end="", file=sys.stderr, flush=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("status", "archive", "compress"):
+        sys.exit(__doc__)
+    command, database = sys.argv[1:3]
+    seasons = [int(a) for a in sys.argv[3:] if a != "--compress"]
+    if command == "status":
+        print(json.dumps(status(database), indent=1))
+    elif command == "archive":
+        for season in seasons:
+            t0 = time.perf_counter()
+            file = archive_season(database, season, compress="--compress" in sys.argv, progress=_progress)
+            print(file=sys.stderr)
+            print(f"season {season}: " + (f"{file} ({time.perf_counter() - t0:.1f}s)" if file else "no hot rows"))
+    else:
+        with pooled(database) as conn:
+            files = [r[0] for r in _archives(conn) if r[2] == "done" and not r[3]
+                     and (not seasons or r[1] in seasons)]
+        for file in files:
+            compress_archive(database, file)
+            print(f"{file}.xz")
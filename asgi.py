@@ -0,0 +1,238 @@
+"""Async serving mode: one event loop owns every client socket.
+
+    uvicorn app:asgi_app --host 0.0.0.0 --port 5000          # farmers
+    uvicorn "new app:asgi_app" --host 0.0.0.0 --port 5000    # agrosmart
+
+Under gunicorn sync workers a phone uploading a photo over a weak link, or
+reading a long CSV export slowly, holds a whole worker until it is done.
+Here the waiting happens on the loop and a thread is only busy while there
+is work to do:
+
+- a request body is received on the loop (spooled to disk past
+  BODY_MEMORY) before the route runs, so uploads, imports, sync pushes and
+  registrations reach their thread complete;
+- the Flask app runs on AsyncDB's thread pool, and a streamed response
+  (the exports, the snapshot) is pulled from it one chunk per step, with
+  the loop writing each chunk as fast as the client takes it. Exports read
+  keyset pages (export.KeysetCursor), so a slow reader holds no connection;
+- the LGA endpoints only read per-worker in-memory indexes (warmed at
+  startup) and run on the loop itself.
+
+Every route is the Flask app's own; gunicorn app:app keeps working
+unchanged. ASGI_THREADS (default DB_POOL_SIZE) bounds the threads, and so
+the SQLite connections, per process.
+"""
+import asyncio, contextvars, os, sys, tempfile, threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.exceptions import HTTPException
+from werkzeug.wsgi import FileWrapper
+from db import POOL_SIZE
+from geo import get_geo_index
+from locations import get_locations
+
+ASGI_THREADS = int(os.environ.get("ASGI_THREADS", str(POOL_SIZE)))
+BODY_MEMORY = 1024 * 1024
+MAX_BODY = int(os.environ.get("ASGI_MAX_BODY", str(64 * 1024 * 1024)))
+FIRST_CHUNK = 64 * 1024      # a response this short goes out in one piece
+FILE_BLOCK = 256 * 1024      # send_file() reads per step
+INLINE_ENDPOINTS = ("api_locations", "api_lgas", "api_locate")
+
+
+class AsyncDB:
+    """Blocking work for one database -- SQLite and the views that use it -- on a
+    bounded thread pool, awaited from the loop. Sized like the connection pool,
+    so a thread never waits for a connection."""
+
+    def __init__(self, path, threads=ASGI_THREADS):
+        self.path = path
+        self.threads = threads
+        self.pid = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        # like db.get_pool: a forked worker starts its own threads
+        if self.pid != os.getpid():
+            with self._lock:
+                if self.pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix="asgi-db")
+                    self.pid = os.getpid()
+        return self._executor
+
+    async def run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor(), fn, *args)
+
+    async def stream(self, iterator, context):
+        """Async-iterate a blocking iterator, one item per pool step, each step in `context`
+        (Flask's streamed responses keep their request context in context variables)."""
+        done = object()
+        while True:
+            item = await self.run(context.run, next, iterator, done)
+            if item is done:
+                return
+            yield item
+
+    def shutdown(self):
+        if self._executor is not None and self.pid == os.getpid():
+            self._executor.shutdown(wait=False)
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+async def read_body(receive, limit=MAX_BODY):
+    """(rewound file, size) holding the whole request body; (None, 0) if the client went away."""
+    body = tempfile.SpooledTemporaryFile(BODY_MEMORY)
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            body.close()
+            return None, 0
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > limit:
+            body.close()
+            raise BodyTooLarge()
+        body.write(chunk)
+        if not message.get("more_body"):
+            body.seek(0)
+            return body, size
+
+
+def wsgi_environ(scope, body, size):
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": "HTTP/" + scope["http_version"],
+        "CONTENT_LENGTH": str(size),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+        "wsgi.file_wrapper": _file_wrapper,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"], environ["REMOTE_PORT"] = scope["client"][0], str(scope["client"][1])
+    for name, value in scope["headers"]:
+        name, value = name.decode("latin-1"), value.decode("latin-1")
+        if name == "content-length":
+            continue  # the body is already read; CONTENT_LENGTH is what arrived
+        key = "CONTENT_TYPE" if name == "content-type" else "HTTP_" + name.upper().replace("-", "_")
+        environ[key] = environ[key] + "," + value if key in environ else value
+    return environ
+
+
+def _file_wrapper(f, block=FILE_BLOCK):
+    return FileWrapper(f, max(block, FILE_BLOCK))
+
+
+def _begin(app, environ):
+    """Run the view; returns (status, headers, first chunks, rest or None, iterable)."""
+    started = []
+
+    def start_response(status, headers, exc_info=None):
+        started[:] = [int(status.split(" ", 1)[0]), headers]
+
+    iterable = app(environ, start_response)
+    iterator = iter(iterable)
+    chunks, size = [], 0
+    for chunk in iterator:
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= FIRST_CHUNK:
+            return started[0], started[1], chunks, iterator, iterable
+    return started[0], started[1], chunks, None, iterable
+
+
+async def _wait_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+class ASGIApp:
+    """The Flask app behind an ASGI interface (see the module docstring)."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.database = flask_app.config["DATABASE"]
+        self.db = AsyncDB(self.database)
+        self.inline = {f"{bp}.{name}" for bp in flask_app.blueprints for name in INLINE_ENDPOINTS}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+        try:
+            body, size = await read_body(receive)
+        except BodyTooLarge:
+            return await _plain(send, 413, b"request body too large")
+        if body is None:
+            return
+        with body:
+            environ = wsgi_environ(scope, body, size)
+            # every step of one response runs in the same context, whichever thread takes it
+            context = contextvars.copy_context()
+            if self._endpoint(environ) in self.inline:
+                response = context.run(_begin, self.flask_app.wsgi_app, environ)
+            else:
+                response = await self.db.run(context.run, _begin, self.flask_app.wsgi_app, environ)
+            await self._send(response, context, receive, send)
+
+    def _endpoint(self, environ):
+        try:
+            return self.flask_app.url_map.bind_to_environ(environ).match()[0]
+        except HTTPException:
+            return None
+
+    async def _send(self, response, context, receive, send):
+        status, headers, chunks, rest, iterable = response
+        try:
+            await send({"type": "http.response.start", "status": status,
+                        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]})
+            await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": rest is not None})
+            if rest is not None:
+                # the client can hang up mid-download; stop producing chunks when it does
+                gone = asyncio.ensure_future(_wait_disconnect(receive))
+                try:
+                    async for chunk in self.db.stream(rest, context):
+                        if gone.done():
+                            return
+                        if chunk:
+                            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+                finally:
+                    gone.cancel()
+        finally:
+            if hasattr(iterable, "close"):  # Flask's teardown: pooled connections go back
+                await self.db.run(context.run, iterable.close)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # the inline endpoints must never touch the database on the loop
+                await self.db.run(get_locations, self.database)
+                await self.db.run(get_geo_index, self.database)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.db.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+async def _plain(send, status, text):
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"text/plain; charset=utf-8"),
+                            (b"content-length", str(len(text)).encode())]})
+    await send({"type": "http.response.body", "body": text})
@@ -0,0 +1,126 @@
+"""Season archives: hot-table queries before and after moving finished seasons out.
+
+    python -m benchmarks.archive --rows 1000000
+
+The synthetic dataset spans the 2023, 2024 and 2025 seasons. The same
+current-season queries run on the full table, then again after 2023 and
+2024 are archived (2023 compressed). Registrations keep coming from a
+second connection while the archive runs; their worst wait for the write
+lock is reported. Then the history reads: a season's export from a
+compressed archive (first request decompresses it, the next reuses the
+cache), everything, and the all-seasons stats.
+"""
+import argparse, json, os, shutil, sys, tempfile, threading, time
+
+SEASONS = (2023, 2024)
+CURRENT = 2025
+
+
+def timed(fn, repeat=1):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def current_season_queries(client, conn, lo, hi):
+    """Seconds for the things that only need this season (or the live table)."""
+    report = {}
+    export, rows = timed(lambda: client.get(f"/download?season={CURRENT}").data.count(b"\n") - 1)
+    report["season_export_s"], report["season_export_rows"] = round(export, 2), rows
+    report["season_stats_ms"] = round(timed(lambda: client.get(f"/api/stats?season={CURRENT}").json, 5)[0] * 1000, 1)
+    report["stats_ms"] = round(timed(lambda: client.get("/api/stats").json, 5)[0] * 1000, 2)
+    report["full_export_s"] = round(timed(lambda: client.get("/download").data)[0], 2)
+    report["group_by_lga_ms"] = round(timed(lambda: conn.execute(
+        "SELECT state, lga, crop, COUNT(*) FROM farmers GROUP BY state, lga, crop").fetchall(), 3)[0] * 1000, 1)
+    report["season_group_by_ms"] = round(timed(lambda: conn.execute(
+        "SELECT crop, COUNT(*) FROM farmers WHERE created_at >= ? AND created_at < ? GROUP BY crop",
+        (lo, hi)).fetchall(), 3)[0] * 1000, 1)
+    pages, freelist = conn.execute("SELECT (SELECT page_count FROM pragma_page_count), "
+                                   "(SELECT freelist_count FROM pragma_freelist_count)").fetchone()
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    report["hot_rows"] = conn.execute("SELECT COUNT(*) FROM farmers").fetchone()[0]
+    report["hot_mb_in_use"] = round((pages - freelist) * page_size / 1e6, 1)
+    return report
+
+
+def registrations(database, stop, waits):
+    """One registration every 20 ms from its own connection; records each commit's wait."""
+    from db import connect
+    conn = connect(database)
+    n = 0
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        with conn:
+            conn.execute("INSERT INTO farmers(name, state, lga, crop) VALUES(?, 'Kano', 'Dala', 'Maize')",
+                         (f"Walk-in {n}",))
+        waits.append(time.perf_counter() - t0)
+        n += 1
+        time.sleep(0.02)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    root = os.getcwd()
+    sys.path.insert(0, root)
+    os.chdir(tempfile.mkdtemp())
+    from benchmarks.synthetic import dataset, _progress
+    from benchmarks.load import load_app
+    from db import connect
+    import archive
+
+    database = os.path.abspath("farmers.db")
+    shutil.copy(dataset(args.rows, progress=_progress), database)
+    app = load_app(root, "farmers", database)
+    client = app.test_client()
+    conn = connect(database)
+    lo, hi = archive.season_bounds(CURRENT)
+    report = {"rows": args.rows, "before": current_season_queries(client, conn, lo, hi)}
+    print(f"before: {report['before']}", file=sys.stderr)
+
+    stop, waits = threading.Event(), []
+    writer = threading.Thread(target=registrations, args=(database, stop, waits))
+    writer.start()
+    for season in SEASONS:
+        seconds, file = timed(lambda: archive.archive_season(database, season))
+        path = os.path.join(archive.archive_dir(database), file)
+        report[f"archive_{season}_s"] = round(seconds, 1)
+        report[f"archive_{season}_mb"] = round(os.path.getsize(path) / 1e6, 1)
+    stop.set()
+    writer.join()
+    waits.sort()
+    report["registrations_during_archive"] = len(waits)
+    report["registration_p99_ms"] = round(waits[int(len(waits) * .99)] * 1000, 1)
+    report["registration_max_ms"] = round(waits[-1] * 1000, 1)
+    seconds, _ = timed(lambda: archive.compress_archive(database, f"farmers-{SEASONS[0]}.db"))
+    report[f"compress_{SEASONS[0]}_s"] = round(seconds, 1)
+    report[f"archive_{SEASONS[0]}_xz_mb"] = round(os.path.getsize(
+        os.path.join(archive.archive_dir(database), f"farmers-{SEASONS[0]}.db.xz")) / 1e6, 1)
+
+    report["after"] = current_season_queries(client, conn, lo, hi)
+    print(f"after: {report['after']}", file=sys.stderr)
+
+    history = {}
+    for label, query in (("season_compressed_first", f"season={SEASONS[0]}"),
+                         ("season_compressed_cached", f"season={SEASONS[0]}"),
+                         ("season", f"season={SEASONS[1]}"),
+                         ("all", "season=all")):
+        seconds, rows = timed(lambda: client.get(f"/download?{query}").data.count(b"\n") - 1)
+        history[f"export_{label}_s"], history[f"export_{label}_rows"] = round(seconds, 2), rows
+    seconds, stats = timed(lambda: client.get("/api/stats?season=all").json, 5)
+    history["stats_all_ms"] = round(seconds * 1000, 1)
+    history["stats_all_farmers"] = sum(r["count"] for r in stats["state"])
+    report["history"] = history
+    conn.close()
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Slow mobile clients: gunicorn sync workers vs the async mode (uvicorn, one process).
+
+    python -m benchmarks.asgi --slow 200 --workers 4 --seconds 20
+
+--slow clients each keep a connection busy for the whole run: half push a
+sync batch at --rate bytes/s, half read the full CSV export at --rate bytes/s
+(with a small receive buffer, like a phone on a weak link). Meanwhile one
+probe client requests /dashboard and /api/locations back to back; its
+latency and failures show whether anybody else still gets served.
+"""
+import argparse, http.client, json, multiprocessing, os, random, shutil, socket, sys, tempfile, threading, time
+import uuid
+
+PROBE_TIMEOUT = 5
+RECV_BUFFER = 16 * 1024
+STEP = 0.25
+
+
+def push_body(n, size, pairs, rng):
+    lines, total = [], 0
+    while total < size:
+        state, lga = rng.choice(pairs)
+        line = json.dumps({"client_uuid": str(uuid.UUID(int=rng.getrandbits(128))), "name": f"Slow {n}",
+                           "state": state, "lga": lga, "crop": "Maize"}) + "\n"
+        lines.append(line)
+        total += len(line)
+    return "".join(lines).encode("utf-8")
+
+
+def slow_upload(port, body, rate, results):
+    try:
+        sock = socket.create_connection(("127.0.0.1", port), timeout=60)
+        sock.sendall(b"POST /api/sync/push HTTP/1.1\r\nHost: bench\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Content-Length: %d\r\nConnection: close\r\n\r\n" % len(body))
+        step = max(1, int(rate * STEP))
+        for i in range(0, len(body), step):
+            sock.sendall(body[i:i + step])
+            time.sleep(STEP)
+        reply = sock.recv(64)
+        sock.close()
+        results.append(reply.startswith(b"HTTP/1.1 200"))
+    except OSError:
+        results.append(False)
+
+
+def slow_download(port, rate, deadline, results):
+    received = 0
+    try:
+        sock = socket.socket()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER)
+        sock.settimeout(60)
+        sock.connect(("127.0.0.1", port))
+        sock.sendall(b"GET /download HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n\r\n")
+        step = max(1, int(rate * STEP))
+        while time.monotonic() < deadline:
+            got = 0
+            while got < step:
+                data = sock.recv(step - got)
+                if not data:
+                    break
+                got += len(data)
+            received += got
+            if not got:
+                break
+            time.sleep(STEP)
+        sock.close()
+    except OSError:
+        pass
+    results.append(received)
+
+
+def probe(port, deadline):
+    latencies, failed = [], 0
+    paths = ["/dashboard", "/api/locations"]
+    i = 0
+    while time.monotonic() < deadline:
+        t0 = time.perf_counter()
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=PROBE_TIMEOUT)
+            conn.request("GET", paths[i % len(paths)])
+            resp = conn.getresponse()
+            resp.read()
+            conn.close()
+            ok = resp.status == 200
+        except (OSError, http.client.HTTPException):
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - t0)
+        else:
+            failed += 1
+        i += 1
+    latencies.sort()
+    pct = lambda p: round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1) if latencies else None
+    return {"probe_ok": len(latencies), "probe_failed": failed,
+            "probe_p50_ms": pct(0.5), "probe_p99_ms": pct(0.99), "probe_max_ms": pct(1.0)}
+
+
+def run(server, args, root, source, pairs, ctx):
+    from benchmarks.load import serve, _free_port, _wait_for, memory
+    database = os.path.abspath(f"{server}.db")
+    shutil.copy(source, database)
+    port = _free_port()
+    proc = ctx.Process(target=serve, args=(root, "farmers", database, port, server, args.workers, 1))
+    proc.start()
+    try:
+        _wait_for(port, proc)
+        rng = random.Random(args.seed)
+        deadline = time.monotonic() + args.seconds
+        uploads, downloads = [], []
+        threads = []
+        for n in range(args.slow):
+            if n % 2:
+                # batches of different sizes, so they do not all arrive in the same instant
+                body = push_body(n, int(args.rate * args.seconds * rng.uniform(0.2, 0.9)), pairs, rng)
+                t = threading.Thread(target=slow_upload, args=(port, body, args.rate, uploads))
+            else:
+                t = threading.Thread(target=slow_download, args=(port, args.rate, deadline, downloads))
+            t.start()
+            threads.append(t)
+        time.sleep(1)  # let the slow clients take their connections first
+        result = probe(port, deadline)
+        for t in threads:
+            t.join()
+        result |= {"uploads_ok": sum(uploads), "uploads_failed": len(uploads) - sum(uploads),
+                   "download_mb": round(sum(downloads) / 1e6, 1)}
+        result |= memory(proc.pid)
+    finally:
+        proc.terminate()
+        proc.join(30)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--slow", type=int, default=200, help="slow clients")
+    parser.add_argument("--rate", type=int, default=2048, help="bytes/s per slow client (a weak 2G link)")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn sync workers")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=2025)
+    args = parser.parse_args()
+
+    root = os.getcwd()
+    sys.path.insert(0, root)
+    os.chdir(tempfile.mkdtemp())
+    from benchmarks.synthetic import dataset, _progress
+    from locations import canonical_rows
+    source = dataset(args.rows, progress=_progress)
+    pairs = canonical_rows()[0]
+    ctx = multiprocessing.get_context("spawn")
+    report = {"slow_clients": args.slow, "rate_bytes_per_s": args.rate, "seconds": args.seconds}
+    for server in ("gunicorn-sync", "uvicorn"):
+        report[server] = run(server, args, root, source, pairs, ctx)
+        print(f"{server}: {report[server]}", file=sys.stderr)
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
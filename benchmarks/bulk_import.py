@@ -0,0 +1,62 @@
+"""Bulk import throughput vs one INSERT + commit per farmer (what the form does).
+
+    python -m benchmarks.bulk_import --rows 100000
+"""
+import argparse, io, json, os, random, sys, tempfile, time
+
+STATES = {"Kano": ["Dala", "Fagge", "Gwale"], "Oyo": ["Ibadan North", "Iseyin"],
+          "Benue": ["Makurdi", "Gboko"], "Borno": ["Maiduguri", "Biu"]}
+CROPS = ["Maize", "Rice", "Yam", "Cassava", "Sorghum"]
+
+
+def synthetic_csv(rows, rng, bad_every=50):
+    pairs = [(s, l) for s, ls in STATES.items() for l in ls]
+    out = io.StringIO()
+    out.write("name,state,lga,crop,phone\n")
+    for i in range(rows):
+        state, lga = rng.choice(pairs)
+        if bad_every and i % bad_every == 0:
+            lga = "Not An LGA"
+        out.write(f"Farmer {i},{state},{lga},{rng.choice(CROPS)},080{i:08d}\n")
+    return out.getvalue().encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--form-rows", type=int, default=2000, help="rows for the per-row baseline")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.getcwd())
+    os.chdir(tempfile.mkdtemp())
+    import app as farmers_app
+    from db import pooled
+    from bulk_import import import_upload
+    from locations import LocationIndex
+
+    locations = LocationIndex((s, l) for s, ls in STATES.items() for l in ls)
+    data = synthetic_csv(args.rows, random.Random(7))
+    with pooled(farmers_app.DB) as conn:
+        t0 = time.perf_counter()
+        report = import_upload(conn, io.BytesIO(data), "csv", locations)
+        bulk = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for i in range(args.form_rows):
+            conn.execute("INSERT INTO farmers(name,state,lga,crop,phone,photo_path,created_at) "
+                         "VALUES(?,?,?,?,?,?,datetime('now'))", (f"Form {i}", "Kano", "Dala", "Maize", "080", ""))
+            conn.commit()
+        per_row = time.perf_counter() - t0
+
+    print(json.dumps({
+        "rows": args.rows,
+        "accepted": report["accepted"],
+        "rejected": report["rejected"],
+        "bulk_seconds": round(bulk, 2),
+        "bulk_rows_per_sec": round(report["accepted"] / bulk),
+        "form_style_rows_per_sec": round(args.form_rows / per_row),
+    }))
+
+
+if __name__ == "__main__":
+    main()
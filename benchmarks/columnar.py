@@ -0,0 +1,62 @@
+"""CSV vs Parquet export (size, export time, load time) and snapshot full vs incremental rebuild.
+
+    python -m benchmarks.columnar --rows 1000000
+"""
+import argparse, csv, io, json, os, shutil, sys, tempfile, time
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    value = fn()
+    return value, round(time.perf_counter() - t0, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--new-rows", type=int, default=5000, help="registrations between snapshot builds")
+    args = parser.parse_args()
+
+    root = os.getcwd()
+    sys.path.insert(0, root)
+    os.chdir(tempfile.mkdtemp())
+    import pyarrow.csv, pyarrow.parquet
+    from benchmarks.synthetic import dataset, farmer_rows, COLUMNS, _progress
+    from benchmarks.load import load_app
+    from columnar import build_snapshot, snapshot_columns
+    from db import connect
+
+    shutil.copy(dataset(args.rows, progress=_progress), "farmers.db")
+    client = load_app(root, "farmers", os.path.abspath("farmers.db")).test_client()
+    csv_body, csv_s = timed(lambda: client.get("/download").get_data())
+    gzip_body, gzip_s = timed(lambda: client.get("/download?gzip=1").get_data())
+    parquet_body, parquet_s = timed(lambda: client.get("/download?format=parquet").get_data())
+    _, csv_load_s = timed(lambda: sum(1 for _ in csv.reader(io.StringIO(csv_body.decode("utf-8")))))
+    _, arrow_csv_load_s = timed(lambda: pyarrow.csv.read_csv(io.BytesIO(csv_body)))
+    _, parquet_load_s = timed(lambda: pyarrow.parquet.read_table(io.BytesIO(parquet_body)))
+
+    conn = connect("farmers.db")
+    columns = snapshot_columns(conn)
+    manifest, full_s = timed(lambda: build_snapshot("farmers.db", columns))
+    sql = f"INSERT INTO farmers({', '.join(COLUMNS)}) VALUES({', '.join('?' * len(COLUMNS))})"
+    conn.executemany(sql, list(farmer_rows(args.new_rows, seed=7)))
+    conn.commit()
+    _, incremental_s = timed(lambda: build_snapshot("farmers.db", columns))
+    conn.close()
+
+    print(json.dumps({
+        "rows": args.rows,
+        "csv_mb": round(len(csv_body) / 1e6, 1), "csv_export_seconds": csv_s,
+        "csv_gzip_mb": round(len(gzip_body) / 1e6, 1), "csv_gzip_export_seconds": gzip_s,
+        "parquet_mb": round(len(parquet_body) / 1e6, 1), "parquet_export_seconds": parquet_s,
+        "load_csv_python_seconds": csv_load_s, "load_csv_arrow_seconds": arrow_csv_load_s,
+        "load_parquet_seconds": parquet_load_s,
+        "snapshot_mb": round(os.path.getsize(os.path.join("farmers.db.snapshot", manifest["file"])) / 1e6, 1),
+        "snapshot_full_build_seconds": full_s,
+        "snapshot_after_new_rows": args.new_rows,
+        "snapshot_incremental_seconds": incremental_s,
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""First-page latency of /dashboard as the farmers table grows (keyset pages vs. the old full fetch).
+
+    python -m benchmarks.dashboard_pagination --sizes 10000 100000 1000000
+"""
+import argparse, json, os, random, sys, tempfile, time
+
+STATES = {"Kano": ["Dala", "Fagge", "Gwale", "Nasarawa"], "Oyo": ["Ibadan North", "Ogbomosho North"],
+          "Benue": ["Makurdi", "Gboko", "Otukpo"], "Borno": ["Maiduguri", "Jere", "Biu"],
+          "Lagos": ["Ikeja", "Epe"], "Kaduna": ["Zaria", "Chikun", "Kaduna North"]}
+CROPS = ["Maize", "Rice", "Yam", "Cassava", "Sorghum", "Millet"]
+LEGACY_SQL = "SELECT name,state,lga,crop,phone,photo_path FROM farmers WHERE 1=1 AND state=?"
+
+
+def fill(conn, start, stop, rng):
+    pairs = [(s, l) for s, ls in STATES.items() for l in ls]
+
+    def rows():
+        for i in range(start, stop):
+            state, lga = rng.choice(pairs)
+            yield (f"Farmer {i}", state, lga, rng.choice(CROPS), f"080{i:08d}", "", "2025-06-01 08:00:00")
+    conn.executemany("INSERT INTO farmers(name,state,lga,crop,phone,photo_path,created_at) "
+                     "VALUES(?,?,?,?,?,?,?)", rows())
+    conn.commit()
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return round(best * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.getcwd())
+    os.chdir(tempfile.mkdtemp())
+    import app as farmers_app
+    from db import pooled
+
+    client = farmers_app.app.test_client()
+    rng = random.Random(42)
+    have = 0
+    for size in sorted(args.sizes):
+        with pooled(farmers_app.DB) as conn:
+            fill(conn, have, size, rng)
+            have = size
+            legacy = timed(lambda: conn.execute(LEGACY_SQL, ("Kano",)).fetchall(), 1)
+        result = {
+            "rows": size,
+            "dashboard_ms": timed(lambda: client.get("/dashboard"), args.repeat),
+            "dashboard_state_ms": timed(lambda: client.get("/dashboard?filter_state=Kano"), args.repeat),
+            "dashboard_state_lga_ms": timed(lambda: client.get("/dashboard?filter_state=Kano&filter_lga=Dala"),
+                                            args.repeat),
+            "api_farmers_ms": timed(lambda: client.get("/api/farmers?state=Kano&limit=100"), args.repeat),
+            "legacy_full_fetch_state_ms": legacy,
+        }
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
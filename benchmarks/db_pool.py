@@ -0,0 +1,126 @@
+"""Concurrent registration inserts + dashboard reads, per-request connect vs pooled WAL.
+
+    python -m benchmarks.db_pool --workers 4 --threads 4 --seconds 10
+"""
+import argparse, json, multiprocessing, os, sqlite3, tempfile, threading, time
+
+import db
+
+SCHEMA = """CREATE TABLE IF NOT EXISTS farmers(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT, state TEXT, lga TEXT, crop TEXT, phone TEXT, photo_path TEXT)"""
+INSERT = "INSERT INTO farmers(name,state,lga,crop,phone,photo_path) VALUES(?,?,?,?,?,?)"
+DASHBOARD = "SELECT name,state,lga,crop,phone,photo_path FROM farmers WHERE state=? ORDER BY id DESC LIMIT 50"
+STATES = ["Kano", "Kaduna", "Oyo", "Lagos", "Benue", "Borno"]
+
+
+def naive_request(path, sql, params, write):
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(sql, params).fetchall()
+        if write:
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def pooled_request(path, sql, params, write):
+    with db.pooled(path) as conn:
+        conn.execute(sql, params).fetchall()
+        if write:
+            conn.commit()
+
+
+def worker(mode, path, threads, seconds, write_ratio, out):
+    request = pooled_request if mode == "pooled" else naive_request
+    stats = {"write": [], "read": [], "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def loop(tid):
+        i = 0
+        local = {"write": [], "read": [], "errors": 0}
+        while time.perf_counter() < deadline:
+            i += 1
+            write = (i % 100) < write_ratio * 100
+            state = STATES[i % len(STATES)]
+            if write:
+                sql, params = INSERT, (f"Farmer {os.getpid()}-{tid}-{i}", state, "LGA", "Maize", "0800", "")
+            else:
+                sql, params = DASHBOARD, (state,)
+            t0 = time.perf_counter()
+            try:
+                request(path, sql, params, write)
+            except sqlite3.OperationalError:
+                local["errors"] += 1
+                continue
+            local["write" if write else "read"].append(time.perf_counter() - t0)
+        with lock:
+            for k in ("write", "read"):
+                stats[k].extend(local[k])
+            stats["errors"] += local["errors"]
+
+    pool = [threading.Thread(target=loop, args=(t,)) for t in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    out.put(stats)
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run(mode, args):
+    path = os.path.join(tempfile.mkdtemp(), f"{mode}.db")
+    conn = sqlite3.connect(path)
+    if mode == "naive":
+        conn.execute("PRAGMA journal_mode=DELETE")
+    conn.execute(SCHEMA)
+    conn.executemany(INSERT, [(f"Seed {i}", STATES[i % len(STATES)], "LGA", "Rice", "0800", "")
+                              for i in range(args.seed_rows)])
+    conn.commit()
+    conn.close()
+
+    out = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=worker, args=(mode, path, args.threads, args.seconds,
+                                                            args.write_ratio, out))
+             for _ in range(args.workers)]
+    for p in procs:
+        p.start()
+    results = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    writes = [v for r in results for v in r["write"]]
+    reads = [v for r in results for v in r["read"]]
+    return {
+        "mode": mode,
+        "inserts_per_sec": round(len(writes) / args.seconds, 1),
+        "reads_per_sec": round(len(reads) / args.seconds, 1),
+        "locked_errors": sum(r["errors"] for r in results),
+        "insert_p50_ms": round(percentile(writes, 50) * 1000, 2),
+        "insert_p99_ms": round(percentile(writes, 99) * 1000, 2),
+        "read_p50_ms": round(percentile(reads, 50) * 1000, 2),
+        "read_p99_ms": round(percentile(reads, 99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4, help="processes, like gunicorn -w")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--seed-rows", type=int, default=20000)
+    args = parser.parse_args()
+    for mode in ("naive", "pooled"):
+        print(json.dumps(run(mode, args)))
+
+
+if __name__ == "__main__":
+    main()
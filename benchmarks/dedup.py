@@ -0,0 +1,105 @@
+"""Duplicate detection: registration-time lookup and batch clustering over a synthetic dataset.
+
+    python -m benchmarks.dedup --rows 1000000 --duplicates 10000
+
+A copy of the dataset gets --duplicates re-registrations of random farmers,
+each with the slips officers make: a typo in the name, the words swapped,
+the phone typed as +234..., or left out. Then:
+
+- find_duplicates() is timed against scanning the farmer's whole LGA, for
+  the re-registrations (recall) and for fresh synthetic farmers (false alarms);
+- cluster() rebuilds farmer_duplicates and is scored on the injected pairs.
+"""
+import argparse, json, os, random, shutil, sys, tempfile, time
+
+
+def typo(name, rng):
+    i = rng.randrange(len(name))
+    kind = rng.random()
+    if kind < .4:
+        return name[:i] + rng.choice("aeinorsu") + name[i + 1:]
+    if kind < .7:
+        return name[:i] + name[i + 1:]
+    return name[:i] + rng.choice("aeinorsu") + name[i:]
+
+
+def reregistration(row, rng):
+    farmer_id, name, state, lga, crop, phone = row
+    if rng.random() < .6:
+        name = typo(name, rng)
+    if rng.random() < .3:
+        name = " ".join(reversed(name.split()))
+    digits = "".join(c for c in phone if c.isdigit())
+    style = rng.random()
+    phone = ("" if style < .25 else "+234" + digits[-10:] if style < .5 else phone)
+    return farmer_id, {"name": name, "state": state, "lga": lga, "crop": crop, "phone": phone}
+
+
+def lga_scan(conn, record):
+    """The obvious version: compare against every farmer in the LGA."""
+    from dedup import _match, normalize_name
+    from search import normalize_phone
+    me = (None, normalize_name(record["name"]), normalize_phone(record["phone"]))
+    found = []
+    for farmer_id, name, phone_norm in conn.execute("SELECT id, name, phone_norm FROM farmers "
+                                                    "WHERE state = ? AND lga = ?", (record["state"], record["lga"])):
+        if _match(me, (farmer_id, normalize_name(name), phone_norm), me[2] and me[2] == phone_norm) is not None:
+            found.append(farmer_id)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--duplicates", type=int, default=10000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=2025)
+    args = parser.parse_args()
+
+    root = os.getcwd()
+    sys.path.insert(0, root)
+    os.chdir(tempfile.mkdtemp())
+    from benchmarks.synthetic import COLUMNS, dataset, farmer_rows, _progress
+    from db import connect
+    from dedup import BLOCK_LIMIT, cluster, find_duplicates
+
+    shutil.copy(dataset(args.rows, progress=_progress), "farmers.db")
+    conn = connect("farmers.db")
+    rng = random.Random(args.seed)
+    ids = rng.sample(range(1, args.rows + 1), args.duplicates)
+    originals = conn.execute(f"SELECT id, name, state, lga, crop, phone FROM farmers "
+                             f"WHERE id IN ({','.join(map(str, ids))})").fetchall()
+    injected = [reregistration(row, rng) for row in originals]
+    first_new = conn.execute("SELECT MAX(id) FROM farmers").fetchone()[0] + 1
+    with conn:
+        conn.executemany("INSERT INTO farmers(name, state, lga, crop, phone) VALUES(?, ?, ?, ?, ?)",
+                         [tuple(r.values()) for _, r in injected])
+    pairs = {(farmer_id, first_new + n) for n, (farmer_id, _) in enumerate(injected)}
+
+    # registration: a re-registration should find its original, a new farmer nothing
+    fresh = [dict(zip(COLUMNS, r)) for r in farmer_rows(args.lookups, seed=args.seed + 1)]
+    repeat = [r for _, r in injected[:args.lookups]]
+    report = {"rows": args.rows, "injected": len(injected)}
+    for label, fn in (("index", lambda r: [d["id"] for d in find_duplicates(conn, r, BLOCK_LIMIT)]),
+                      ("lga_scan", lambda r: lga_scan(conn, r))):
+        lookups = repeat if label == "index" else repeat[:200]
+        t0 = time.perf_counter()
+        hits = sum(1 for (farmer_id, _), r in zip(injected, lookups) if farmer_id in fn(r))
+        elapsed = time.perf_counter() - t0
+        report[f"{label}_lookup_us"] = round(elapsed / len(lookups) * 1e6, 1)
+        report[f"{label}_recall"] = round(hits / len(lookups), 3)
+    report["index_false_alarm_rate"] = round(sum(1 for r in fresh if find_duplicates(conn, r)) / len(fresh), 3)
+
+    summary = cluster(conn)
+    clustered = dict(conn.execute("SELECT farmer_id, cluster_id FROM farmer_duplicates"))
+    found = sum(1 for a, b in pairs if a in clustered and clustered.get(a) == clustered.get(b))
+    lga_sizes = [n for (n,) in conn.execute("SELECT n FROM farmer_counts_lga")]
+    report |= {"cluster_" + k: v for k, v in summary.items()}
+    report["cluster_pair_recall"] = round(found / len(pairs), 3)
+    report["all_pairs_in_lga_comparisons"] = sum(n * (n - 1) // 2 for n in lga_sizes)
+    conn.close()
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
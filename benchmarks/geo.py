@@ -0,0 +1,72 @@
+"""Nearest-LGA lookups: grid index vs a linear scan, batch geo-tagging, /api/locate.
+
+    python -m benchmarks.geo --points 200000
+
+Centroids are the shipped lga_centroids.csv (or whatever LGA_CENTROIDS names);
+the query points are random inside Nigeria's bounding box.
+"""
+import argparse, json, os, random, shutil, sys, tempfile, time
+
+
+def per_call_us(fn, items):
+    t0 = time.perf_counter()
+    for item in items:
+        fn(*item)
+    return round((time.perf_counter() - t0) / len(items) * 1e6, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=2025)
+    args = parser.parse_args()
+
+    root = os.getcwd()
+    sys.path.insert(0, root)
+    os.chdir(tempfile.mkdtemp())
+    rng = random.Random(args.seed)
+    from benchmarks.synthetic import dataset
+    from benchmarks.load import load_app
+    from geo import GridIndex, distance_km, get_geo_index, geotag
+    from locations import CENTROIDS_SQL
+    from db import connect
+
+    shutil.copy(dataset(10000), "farmers.db")
+    client = load_app(root, "farmers", os.path.abspath("farmers.db")).test_client()
+    conn = connect("farmers.db")
+    centroids = conn.execute(CENTROIDS_SQL).fetchall()
+    conn.close()
+    t0 = time.perf_counter()
+    GridIndex(centroids)
+    build_ms = round((time.perf_counter() - t0) * 1000, 1)
+    grid = get_geo_index(os.path.abspath("farmers.db"))
+
+    points = [(rng.uniform(4.3, 13.9), rng.uniform(2.7, 14.7)) for _ in range(args.points)]
+    linear = lambda lat, lon: min(centroids, key=lambda c: distance_km(lat, lon, c[2], c[3]))
+    linear_us = per_call_us(linear, points[:2000])
+    grid_us = per_call_us(grid.nearest, points)
+    t0 = time.perf_counter()
+    grid.nearest_many(points)
+    many_us = round((time.perf_counter() - t0) / len(points) * 1e6, 2)
+
+    records = [(n, {"name": f"F{n}", "lat": str(lat), "lon": str(lon)}) for n, (lat, lon) in enumerate(points)]
+    t0 = time.perf_counter()
+    tagged = sum(1 for _, r in geotag(records, grid) if r.get("lga"))
+    geotag_s = round(time.perf_counter() - t0, 2)
+
+    urls = [f"/api/locate?lat={lat}&lon={lon}" for lat, lon in points[:2000]]
+    t0 = time.perf_counter()
+    for url in urls:
+        client.get(url)
+    locate_rps = round(len(urls) / (time.perf_counter() - t0), 1)
+
+    print(json.dumps({
+        "centroids": len(centroids), "grid_build_ms": build_ms,
+        "linear_scan_us": linear_us, "grid_nearest_us": grid_us, "grid_nearest_many_us": many_us,
+        "geotag_records": len(records), "geotag_tagged": tagged, "geotag_seconds": geotag_s,
+        "grid_cells_used": len(grid.cells), "api_locate_rps": locate_rps,
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Per-request cost of localized pages as the number of languages grows.
+
+    python -m benchmarks.i18n --languages 5 50 500 --requests 5000
+
+For each count, a translations directory holds the shipped catalogs plus
+synthetic languages (fully translated, every other one falling back to a
+shipped language). The farmers app is built on it and requests cycle over
+every language, so each language's cached pages have to stay cached: the
+form page (cached per language and location version), the dashboard
+(rendered per request) and the agrosmart home page.
+"""
+import argparse, json, os, random, shutil, sys, tempfile, time
+
+
+def catalog_dir(root, count, rng):
+    directory = tempfile.mkdtemp(prefix="translations-")
+    shipped = [f for f in sorted(os.listdir(os.path.join(root, "translations"))) if f.endswith(".json")]
+    for name in shipped:
+        shutil.copy(os.path.join(root, "translations", name), directory)
+    with open(os.path.join(root, "translations", "en.json"), encoding="utf-8") as f:
+        english = json.load(f)["strings"]
+    for n in range(count - len(shipped)):
+        data = {"language": f"Synthetic {n}", "strings": {k: f"{v} [{n}]" for k, v in english.items()}}
+        if n % 2:
+            data["fallback"] = [rng.choice(shipped)[:-len(".json")]]
+            data["strings"] = dict(rng.sample(sorted(data["strings"].items()), len(english) // 2))
+        with open(os.path.join(directory, f"x{n:04d}.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+    return directory
+
+
+def per_request_us(client, urls, requests):
+    for url in urls:  # one pass so every language's pages are cached
+        client.get(url)
+    t0 = time.perf_counter()
+    for i in range(requests):
+        client.get(urls[i % len(urls)])
+    return round((time.perf_counter() - t0) / requests * 1e6, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--languages", type=int, nargs="+", default=[5, 50, 500])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=2025)
+    args = parser.parse_args()
+
+    root = os.getcwd()
+    sys.path.insert(0, root)
+    os.chdir(tempfile.mkdtemp())
+    from benchmarks.load import load_app
+    from benchmarks.synthetic import dataset
+    from i18n import load_catalogs
+
+    rng = random.Random(args.seed)
+    shutil.copy(dataset(10000), "farmers.db")
+    report = {}
+    for count in args.languages:
+        directory = catalog_dir(root, count, rng)
+        t0 = time.perf_counter()
+        catalogs = load_catalogs(directory)
+        compile_ms = round((time.perf_counter() - t0) * 1000, 1)
+        farmers = load_app(root, "farmers", os.path.abspath("farmers.db"), TRANSLATIONS=directory).test_client()
+        agrosmart = load_app(root, "agrosmart", os.path.abspath("agrosmart.db"), TRANSLATIONS=directory).test_client()
+        codes = list(catalogs.languages)
+        rng.shuffle(codes)
+        report[count] = {
+            "compile_ms": compile_ms,
+            "form_us": per_request_us(farmers, [f"/?lang={c}" for c in codes], args.requests),
+            "dashboard_us": per_request_us(farmers, [f"/dashboard?lang={c}" for c in codes], args.requests // 10),
+            "agrosmart_home_us": per_request_us(agrosmart, [f"/?lang={c}" for c in codes], args.requests),
+        }
+        print(f"{count} languages: {report[count]}", file=sys.stderr)
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+"""Throughput, latency percentiles and peak RSS of the main routes, as JSON.
+
+    python -m benchmarks.load --rows 10000 1000000 --output before.json
+    python -m benchmarks.load --rows 10000 1000000 --compare before.json
+    python -m benchmarks.load --mode http --server gunicorn --workers 4 --concurrency 16
+
+Every size gets a synthetic dataset (benchmarks.synthetic, cached between
+runs) and both apps are driven against it in two ways:
+
+  client  one request at a time through the Flask test client, in a fresh
+          process: what each code path costs, without sockets
+  http    --concurrency keep-alive connections against a real server in its
+          own process (werkzeug threaded, gunicorn gthread or sync workers,
+          or uvicorn running asgi.py), so requests compete for the GIL and
+          the database
+
+Each scenario cycles through a fixed, seeded list of URLs (/, /dashboard with
+and without filters, /download for one LGA, /api/lgas or /api/locations) for
+--seconds after a short warm-up; a full /download is timed once per client
+run. Peak RSS is the client process's, or the sum over the server's
+processes (SQLite's mmap of the database counts, so RssAnon is given too). --compare prints the change against an earlier run on stderr and
+exits with 1 when some rps or p99 is more than --threshold worse.
+"""
+import argparse, http.client, importlib.util, json, multiprocessing, os, platform, random, resource
+import queue, socket, sqlite3, subprocess, sys, tempfile, threading, time
+from urllib.parse import urlencode
+
+APPS = {"farmers": "app.py", "agrosmart": "new app.py"}
+URLS_PER_SCENARIO = 64
+WARMUP_REQUESTS = 20
+
+
+# === what to request ===
+def scenarios(name, seed):
+    """{scenario: [url, ...]}, the same for every run with the same seed."""
+    from locations import canonical_rows
+    rng = random.Random(seed)
+    pairs = canonical_rows()[0]
+    picks = [rng.choice(pairs) for _ in range(URLS_PER_SCENARIO)]
+    if name == "farmers":
+        dashboard = [("/dashboard", {}), ("/dashboard", {"filter_state": None}),
+                     ("/dashboard", {"filter_state": None, "filter_lga": None}),
+                     ("/dashboard", {"lang": "en", "filter_state": None})]
+        return {
+            "/": [f"/?lang={lang}" for lang in ("ha", "en", "yo", "ig")],
+            "/dashboard": [_url(*dashboard[i % 4], state, lga) for i, (state, lga) in enumerate(picks)],
+            "/download": [_url("/download", {"state": None, "lga": None}, state, lga) for state, lga in picks],
+            "/api/locations": ["/api/locations"],
+        }
+    return {
+        "/": ["/", "/form"],
+        "/dashboard": ["/dashboard"],
+        "/download": [_url("/download", {"state": None, "lga": None}, state, lga) for state, lga in picks],
+        "/api/lgas": [_url("/api/lgas", {"state": None}, state, lga) for state, lga in picks],
+    }
+
+
+def _url(path, params, state, lga):
+    # None values are filled from the picked location
+    values = {k: v if v is not None else (lga if k.endswith("lga") else state) for k, v in params.items()}
+    return f"{path}?{urlencode(values)}" if values else path
+
+
+def summary(latencies, elapsed, errors, size):
+    latencies = sorted(latencies)
+
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2) if latencies else None
+    return {"requests": len(latencies), "errors": errors, "rps": round(len(latencies) / elapsed, 1),
+            "p50_ms": pct(.5), "p90_ms": pct(.9), "p99_ms": pct(.99),
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else None,
+            "mb_per_s": round(size / elapsed / 1e6, 2)}
+
+
+def memory(pid=None):
+    """Peak RSS (VmHWM) of `pid` and its descendants, or of this process.
+
+    Pages of the database that SQLite has mmap'd count towards RSS, so the
+    anonymous part (heap, caches) is reported separately where /proc exists.
+    """
+    proc = f"/proc/{pid or 'self'}"
+    if not os.path.exists(f"{proc}/status"):
+        if pid is not None:
+            return {"peak_rss_mb": None}
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"peak_rss_mb": round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)}
+    totals, todo = {"VmHWM:": 0, "RssAnon:": 0}, [pid or os.getpid()]
+    while todo:
+        p = todo.pop()
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    key = line.split(None, 1)[0]
+                    if key in totals:
+                        totals[key] += int(line.split()[1])
+            with open(f"/proc/{p}/task/{p}/children") as f:
+                todo.extend(int(c) for c in f.read().split())
+        except OSError:
+            pass
+    return {"peak_rss_mb": round(totals["VmHWM:"] / 1024, 1), "rss_anon_mb": round(totals["RssAnon:"] / 1024, 1)}
+
+
+def load_app(root, name, database, **config):
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    spec = importlib.util.spec_from_file_location(f"{name}_app", os.path.join(root, APPS[name]))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.create_app({"DATABASE": database, **config})
+
+
+# === in process ===
+def client_run(root, name, database, urls, seconds, out):
+    app = load_app(root, name, database)
+    client = app.test_client()
+
+    def get(url):
+        resp = client.get(url)
+        size, ok = len(resp.get_data()), resp.status_code < 400
+        resp.close()
+        return size, ok
+
+    result = {}
+    for scenario, paths in urls.items():
+        for i in range(WARMUP_REQUESTS):
+            get(paths[i % len(paths)])
+        latencies, errors, size, i = [], 0, 0, 0
+        start = time.perf_counter()
+        deadline = start + seconds
+        while True:
+            t0 = time.perf_counter()
+            if t0 >= deadline:
+                break
+            n, ok = get(paths[i % len(paths)])
+            latencies.append(time.perf_counter() - t0)
+            size += n
+            errors += not ok
+            i += 1
+        result[scenario] = summary(latencies, time.perf_counter() - start, errors, size)
+    t0 = time.perf_counter()
+    size, ok = get("/download")
+    elapsed = time.perf_counter() - t0
+    result["/download (all rows)"] = {"seconds": round(elapsed, 3), "mb": round(size / 1e6, 1),
+                                      "mb_per_s": round(size / elapsed / 1e6, 2), "errors": int(not ok)}
+    out.put({"scenarios": result} | memory())
+
+
+# === over HTTP ===
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(root, name, database, port, server, workers, threads):
+    if server in ("gunicorn", "gunicorn-sync"):
+        from gunicorn.app.base import BaseApplication
+
+        class Server(BaseApplication):
+            def load_config(self):
+                worker_class = "gthread" if server == "gunicorn" else "sync"
+                for key, value in {"bind": f"127.0.0.1:{port}", "workers": workers, "threads": threads,
+                                   "worker_class": worker_class, "loglevel": "warning"}.items():
+                    self.cfg.set(key, value)
+
+            def load(self):
+                return load_app(root, name, database)
+
+        Server().run()
+    elif server == "uvicorn":
+        import uvicorn
+        from asgi import ASGIApp
+        # one process: the async mode is meant to need no more
+        uvicorn.run(ASGIApp(load_app(root, name, database)), host="127.0.0.1", port=port, log_level="warning")
+    else:
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class KeepAlive(WSGIRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_request(self, *args):
+                pass
+
+        make_server("127.0.0.1", port, load_app(root, name, database), threaded=True,
+                    request_handler=KeepAlive).serve_forever()
+
+
+def _wait_for(port, proc, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not proc.is_alive():
+            raise RuntimeError("server exited during startup")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/metrics")
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def http_scenario(port, paths, seconds, concurrency):
+    latencies, errors, sizes = [], [0], [0]
+    lock = threading.Lock()
+    deadline = [None]
+    ready = threading.Barrier(concurrency + 1)
+
+    def worker(n):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        mine, failed, size, i = [], 0, 0, n
+
+        def get(path):
+            nonlocal conn
+            try:
+                conn.request("GET", path)
+                resp = conn.getresponse()
+                body = resp.read()
+                return len(body), resp.status < 400
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                return 0, False
+
+        for _ in range(max(1, WARMUP_REQUESTS // concurrency)):
+            get(paths[i % len(paths)])
+        ready.wait()
+        while True:
+            t0 = time.perf_counter()
+            if t0 >= deadline[0]:
+                break
+            n_bytes, ok = get(paths[i % len(paths)])
+            mine.append(time.perf_counter() - t0)
+            failed += not ok
+            size += n_bytes
+            i += concurrency
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+            sizes[0] += size
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    start = time.perf_counter()
+    deadline[0] = start + seconds  # read by the workers once the barrier lets them go
+    ready.wait()
+    for t in threads:
+        t.join()
+    return summary(latencies, time.perf_counter() - start, errors[0], sizes[0])
+
+
+def http_run(ctx, root, name, database, urls, args):
+    port = _free_port()
+    proc = ctx.Process(target=serve, args=(root, name, database, port, args.server, args.workers, args.threads))
+    proc.start()
+    try:
+        _wait_for(port, proc)
+        result = {scenario: http_scenario(port, paths, args.seconds, args.concurrency)
+                  for scenario, paths in urls.items()}
+        rss = memory(proc.pid)
+    finally:
+        proc.terminate()
+        proc.join(30)
+    return {"scenarios": result} | rss
+
+
+def _result(out, proc):
+    while True:
+        try:
+            return out.get(timeout=1)
+        except queue.Empty:
+            if not proc.is_alive():
+                raise RuntimeError(f"benchmark process exited with {proc.exitcode}")
+
+
+# === reporting ===
+def environment(root):
+    def git(*cmd):
+        try:
+            return subprocess.run(["git", *cmd], cwd=root, capture_output=True, text=True).stdout.strip() or None
+        except OSError:
+            return None
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--", "*.py")),
+            "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(), "cpus": os.cpu_count()}
+
+
+def compare(baseline, current, threshold):
+    """Print rps/p99 changes per (app, rows, mode, scenario); returns the regressions."""
+    before = {(r["app"], r["rows"], r["mode"], s): v
+              for r in baseline["results"] for s, v in r["scenarios"].items()}
+    regressions = []
+    changed = {k for k in ("seconds", "concurrency", "server", "workers", "threads", "seed")
+               if baseline.get("settings", {}).get(k) != current["settings"].get(k)}
+    if changed:
+        print(f"note: {', '.join(sorted(changed))} differ from the baseline run", file=sys.stderr)
+    print(f"{'app':10} {'rows':>9} {'mode':6} {'scenario':22} {'rps':>18} {'p99 ms':>20}", file=sys.stderr)
+    for r in current["results"]:
+        for s, now in r["scenarios"].items():
+            old = before.get((r["app"], r["rows"], r["mode"], s))
+            if not old or "rps" not in now:
+                continue
+            rps = now["rps"] / old["rps"] - 1 if old["rps"] else 0
+            p99 = now["p99_ms"] / old["p99_ms"] - 1 if old["p99_ms"] and now["p99_ms"] else 0
+            flag = ""
+            if rps < -threshold or p99 > threshold:
+                regressions.append((r["app"], r["rows"], r["mode"], s))
+                flag = "  REGRESSION"
+            print(f"{r['app']:10} {r['rows']:>9} {r['mode']:6} {s:22} "
+                  f"{old['rps']:>8} -> {now['rps']:<8} {old['p99_ms']:>8} -> {now['p99_ms']:<8} "
+                  f"({rps:+.0%} rps, {p99:+.0%} p99){flag}", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000])
+    parser.add_argument("--apps", nargs="+", choices=sorted(APPS), default=sorted(APPS))
+    parser.add_argument("--mode", choices=["client", "http", "both"], default="both")
+    parser.add_argument("--seconds", type=float, default=5, help="per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--server", choices=["werkzeug", "gunicorn", "gunicorn-sync", "uvicorn"], default="werkzeug")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--threads", type=int, default=4, help="threads per gunicorn worker")
+    parser.add_argument("--seed", type=int, default=None, help="dataset and URL seed")
+    parser.add_argument("--output", help="also write the JSON here")
+    parser.add_argument("--compare", help="earlier --output to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    root = os.getcwd()
+    sys.path.insert(0, root)
+    os.chdir(tempfile.mkdtemp())
+    from benchmarks.synthetic import DEFAULT_SEED, dataset, _progress
+    seed = DEFAULT_SEED if args.seed is None else args.seed
+    ctx = multiprocessing.get_context("spawn")
+    modes = ["client", "http"] if args.mode == "both" else [args.mode]
+
+    report = {"environment": environment(root),
+              "settings": {k: v for k, v in vars(args).items() if k not in ("output", "compare")} | {"seed": seed},
+              "results": []}
+    for rows in args.rows:
+        t0 = time.perf_counter()
+        database = dataset(rows, seed, progress=_progress)
+        print(f"{rows} farmers ready in {time.perf_counter() - t0:.1f}s: {database}", file=sys.stderr)
+        for name in args.apps:
+            urls = scenarios(name, seed)
+            for mode in modes:
+                if mode == "client":
+                    out = ctx.Queue()
+                    proc = ctx.Process(target=client_run, args=(root, name, database, urls, args.seconds, out))
+                    proc.start()
+                    result = _result(out, proc)
+                    proc.join()
+                else:
+                    result = http_run(ctx, root, name, database, urls, args)
+                report["results"].append({"app": name, "rows": rows, "mode": mode} | result)
+                print(f"{name} {rows} {mode}: " + ", ".join(f"{s} {v.get('rps', v.get('seconds'))}"
+                                                             for s, v in result["scenarios"].items()),
+                      file=sys.stderr)
+
+    text = json.dumps(report, indent=1)
+    if args.output:
+        with open(os.path.join(root, args.output), "w") as f:
+            f.write(text + "\n")
+    print(text)
+    if args.compare:
+        with open(os.path.join(root, args.compare)) as f:
+            if compare(json.load(f), report, args.threshold):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
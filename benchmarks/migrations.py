@@ -0,0 +1,109 @@
+"""Time to upgrade a legacy farmers table, and how long writers wait meanwhile.
+
+Builds an agrosmart.db-shaped farmers table (no indexes) and adds the
+unified columns and indexes twice while a writer inserts a farmer every few
+milliseconds: once with plain CREATE INDEX statements, once with
+migrations.migrate().
+
+    python -m benchmarks.migrations --rows 1000000
+"""
+import argparse, json, os, shutil, sqlite3, sys, tempfile, threading, time
+
+
+def build(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE farmers(id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, state TEXT, "
+                 "lga TEXT, crop TEXT, rainfall REAL DEFAULT 0, flood_risk TEXT DEFAULT 'Low')")
+    conn.executemany("INSERT INTO farmers(name, state, lga, crop, rainfall, flood_risk) VALUES(?,?,?,?,?,?)",
+                     ((f"Farmer {i}", f"State {i % 37}", f"LGA {i % 774}", ("Maize", "Rice", "Yam")[i % 3],
+                       i % 100, ("Low", "High")[i % 2]) for i in range(rows)))
+    conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+
+def with_writer(path, fn, interval=0.005):
+    """Run fn() while another connection keeps inserting; returns (seconds, writer stats)."""
+    from db import connect
+    stop, waits, failures = threading.Event(), [], [0]
+
+    def writer():
+        conn = connect(path)
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                conn.execute("INSERT INTO farmers(name, state, lga, crop) VALUES('Live', 'Kano', 'Dala', 'Maize')")
+                conn.commit()
+            except sqlite3.OperationalError:
+                failures[0] += 1
+            waits.append(time.perf_counter() - t0)
+            time.sleep(interval)
+        conn.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    t0 = time.perf_counter()
+    try:
+        fn()
+    finally:
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        thread.join()
+    waits.sort()
+    return elapsed, {"inserts": len(waits), "failed": failures[0],
+                     "p99_ms": round(waits[int(len(waits) * 0.99)] * 1000, 1),
+                     "max_ms": round(waits[-1] * 1000, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.getcwd())
+    os.chdir(tempfile.mkdtemp())
+    from db import connect, add_column
+    from migrations import migrate, FARMER_COLUMNS, ALL_FARMER_INDEXES
+
+    build("legacy.db", args.rows)
+    shutil.copy("legacy.db", "blocking.db")
+    shutil.copy("legacy.db", "online.db")
+
+    def blocking():
+        conn = connect("blocking.db")
+        for column, decl in FARMER_COLUMNS:
+            add_column(conn, "farmers", column, decl)
+        for sql in ALL_FARMER_INDEXES:
+            conn.execute(sql)
+        conn.commit()
+        conn.close()
+
+    def online(target=None):
+        conn = connect("online.db")
+        migrate(conn, target)
+        conn.close()
+
+    blocking_s, blocking_writer = with_writer("blocking.db", blocking)
+    online_s, online_writer = with_writer("online.db", lambda: online(3))
+    # then the rollup counts and the FTS index (batched backfills)
+    installers_s, installers_writer = with_writer("online.db", online)
+    conn = sqlite3.connect("online.db")
+    expected = args.rows + sum(w["inserts"] - w["failed"] for w in (online_writer, installers_writer))
+    result = {
+        "rows": args.rows,
+        "create_index_seconds": round(blocking_s, 2),
+        "create_index_writer": blocking_writer,
+        "migrate_columns_and_indexes_seconds": round(online_s, 2),
+        "migrate_seconds_per_million_rows": round(online_s / args.rows * 1e6, 2),
+        "migrate_writer": online_writer,
+        "backfill_rollups_and_search_seconds": round(installers_s, 2),
+        "backfill_writer": installers_writer,
+        "rows_after_migrate": conn.execute("SELECT COUNT(*) FROM farmers").fetchone()[0],
+        "rows_expected": expected,
+    }
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
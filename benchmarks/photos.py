@@ -0,0 +1,135 @@
+"""Photo uploads and photo serving: local directory vs an S3-compatible store (objectstore.py).
+
+    python -m benchmarks.photos --photos 20 --mb 3
+
+Each backend gets a copy of the 10k synthetic dataset and two app
+instances, as if on two nodes: "a" takes the registrations, "b" only
+reads. Reported per backend: the upload's p50/max and the most Python
+memory any one registration needed above the request body itself
+(tracemalloc), the time to refuse a photo over MAX_PHOTO_BYTES, the
+dashboard with a page of photos, the bytes the web worker sent for those
+thumbnails, and whether node "b" can show node "a"'s photos.
+"""
+import argparse, io, json, os, random, shutil, sys, tempfile, time, tracemalloc
+
+BOUNDARY = "----farmersbench"
+
+
+def jpeg(rng, mb):
+    """A noisy JPEG of about `mb` megabytes (noise does not compress)."""
+    from PIL import Image
+    side = int((mb * 1e6 / 1.2) ** 0.5)  # about 1.2 bytes a pixel at quality 95
+    img = Image.frombytes("RGB", (side, side), rng.randbytes(side * side * 3))
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=95)
+    return out.getvalue()
+
+
+def form_body(i, photo, pair):
+    fields = {"name": f"Photo {i}", "state": pair[0], "lga": pair[1], "crop": "Maize",
+              "phone": f"0803{i:07d}", "allow_duplicate": "1"}
+    parts = [f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'.encode("utf-8")
+             for k, v in fields.items()]
+    parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="photo"; filename="farm{i}.jpg"\r\n'
+                 "Content-Type: image/jpeg\r\n\r\n".encode("utf-8") + photo + b"\r\n")
+    parts.append(f"--{BOUNDARY}--\r\n".encode("utf-8"))
+    return b"".join(parts)
+
+
+def post(client, body):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    resp = client.post("/", data=body, content_type=f"multipart/form-data; boundary={BOUNDARY}")
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return resp.status_code, elapsed, peak
+
+
+def run(root, backend, spec, source, photos, pairs):
+    from benchmarks.load import load_app
+    from photos import MAX_PHOTO_BYTES, photo_name, thumb_key
+    database = os.path.abspath(f"{backend}.db")
+    shutil.copy(source, database)
+    apps = {n: load_app(root, "farmers", database, WRITE_QUEUE=False, PHOTO_STORAGE=spec.format(node=n))
+            for n in "ab"}
+    nodes = {n: app.test_client() for n, app in apps.items()}
+    a = nodes["a"]
+    report = {}
+
+    times, peaks = [], []
+    for i, photo in enumerate(photos):
+        body = form_body(i, photo, pairs[i % len(pairs)])
+        status, elapsed, peak = post(a, body)
+        assert status == 200, status
+        times.append(elapsed)
+        peaks.append(peak)
+    times.sort()
+    report["upload_p50_ms"] = round(times[len(times) // 2] * 1000, 1)
+    report["upload_max_ms"] = round(times[-1] * 1000, 1)
+    report["upload_peak_mb"] = round(max(peaks) / 1e6, 2)
+
+    oversize = form_body(len(photos), b"\xff" * (MAX_PHOTO_BYTES + 1), pairs[0])
+    status, elapsed, peak = post(a, oversize)
+    report["oversize_status"], report["oversize_ms"] = status, round(elapsed * 1000, 1)
+    report["oversize_peak_mb"] = round(peak / 1e6, 2)
+
+    from db import connect
+    conn = connect(database)
+    names = [photo_name(p) for (p,) in conn.execute(
+        "SELECT photo_path FROM farmers WHERE photo_path IS NOT NULL ORDER BY id DESC LIMIT ?", (len(photos),))]
+    conn.close()
+    storage = apps["a"].extensions["farmers"]["photos"]
+    while not all(storage.exists(thumb_key(name)) for name in names):
+        time.sleep(0.1)  # every thumbnail made, so both backends serve the same thing
+    limit = f"/dashboard?limit={len(photos)}"
+    a.get(limit)
+    t0 = time.perf_counter()
+    for _ in range(20):
+        page = a.get(limit).get_data(as_text=True)
+    report["dashboard_ms"] = round((time.perf_counter() - t0) / 20 * 1000, 2)
+
+    sent = served = 0
+    for node, client in nodes.items():
+        for name in names:
+            resp = client.get(f"/photos/{name}/thumb")
+            if node == "a":
+                sent += len(resp.get_data())
+            else:
+                served += resp.status_code in (200, 302)
+            resp.close()
+    report["thumbnail_bytes_from_worker"] = sent
+    report["dashboard_links_direct_to_store"] = page.count("X-Amz-Signature") // 2
+    report["other_node_can_show"] = f"{served}/{len(names)}"
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--photos", type=int, default=20)
+    parser.add_argument("--mb", type=float, default=3)
+    args = parser.parse_args()
+
+    root = os.getcwd()
+    sys.path.insert(0, root)
+    os.chdir(tempfile.mkdtemp())
+    from benchmarks.synthetic import dataset
+    from locations import canonical_rows
+    import objectstore
+    rng = random.Random(7)
+    photos = [jpeg(rng, args.mb) for _ in range(args.photos)]
+    store = objectstore.serve(os.path.abspath("objects"))
+    os.environ.update(S3_ENDPOINT=store.endpoint, S3_ACCESS_KEY=store.access_key, S3_SECRET_KEY=store.secret_key)
+    source, pairs = dataset(10000), canonical_rows()[0]
+
+    results = {"photos": len(photos), "photo_mb": round(sum(map(len, photos)) / len(photos) / 1e6, 2)}
+    # local: each node has its own disk; s3: both nodes share the bucket
+    for backend, spec in (("local", os.path.abspath("node-{node}/photos")), ("s3", "s3://photos/farmers")):
+        results[backend] = run(root, backend, spec, source, photos, pairs)
+        print(f"{backend}: {results[backend]}", file=sys.stderr)
+    store.shutdown()
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
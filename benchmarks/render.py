@@ -0,0 +1,54 @@
+"""Requests/sec for / and /dashboard, plus the template cost before/after precompiling.
+
+    python -m benchmarks.render --seconds 3
+"""
+import argparse, json, os, sys, tempfile, time
+
+
+def rate(fn, seconds):
+    n, deadline = 0, time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        fn()
+        n += 1
+    return round(n / seconds, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--farmers", type=int, default=200)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.getcwd())
+    os.chdir(tempfile.mkdtemp())
+    import app as farmers_app
+    from flask import render_template_string
+    from db import pooled
+    from locations import get_locations
+    from rendering import render
+
+    with pooled(farmers_app.DB) as conn:
+        conn.executemany("INSERT INTO farmers(name,state,lga,crop,phone,photo_path) VALUES(?,?,?,?,?,?)",
+                         [(f"Farmer {i}", "Kano", "Dala", "Maize", "080", "") for i in range(args.farmers)])
+        conn.commit()
+
+    app, client = farmers_app.app, farmers_app.app.test_client()
+    with app.test_request_context("/"):
+        locations = get_locations(farmers_app.DB)
+        catalogs = app.extensions["farmers"]["catalogs"]
+        form_ctx = dict(lang="ha", strings=catalogs.tables["ha"], states=locations.states,
+                        locations_version=locations.version,
+                        languages=catalogs.languages, language_names=catalogs.names)
+        result = {
+            "form_render_template_string_per_sec":
+                rate(lambda: render_template_string(farmers_app.form_template, **form_ctx), args.seconds),
+            "form_compiled_render_per_sec":
+                rate(lambda: render(app.extensions["farmers"]["templates"]["form"], **form_ctx), args.seconds),
+        }
+    result["GET /_rps"] = rate(lambda: client.get("/"), args.seconds)
+    result["GET /dashboard_rps"] = rate(lambda: client.get("/dashboard?filter_state=Kano"), args.seconds)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
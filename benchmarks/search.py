@@ -0,0 +1,56 @@
+"""/api/search latency (name prefix, multi-word, crop, phone exact/prefix) vs LIKE '%x%'.
+
+    python -m benchmarks.search --rows 1000000
+"""
+import argparse, json, os, random, sys, tempfile, time
+
+FIRST = ["Aminu", "Amina", "Bello", "Chinedu", "Ngozi", "Emeka", "Fatima", "Halima", "Ibrahim", "Musa",
+         "Tunde", "Funke", "Yakubu", "Zainab", "Usman", "Adaeze", "Segun", "Kemi", "Sani", "Hauwa"]
+LAST = ["Abubakar", "Okafor", "Adeyemi", "Danjuma", "Eze", "Lawal", "Ogunleye", "Suleiman", "Nwosu",
+        "Garba", "Balogun", "Okonkwo", "Yusuf", "Ibekwe", "Aliyu", "Olawale", "Mohammed", "Chukwu"]
+CROPS = ["Maize", "Rice", "Yam", "Cassava", "Sorghum", "Millet", "Groundnut", "Cowpea"]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return {"p50_ms": round(samples[len(samples) // 2] * 1000, 2), "max_ms": round(samples[-1] * 1000, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.getcwd())
+    os.chdir(tempfile.mkdtemp())
+    import app as farmers_app
+    from db import pooled
+
+    rng = random.Random(3)
+    with pooled(farmers_app.DB) as conn:
+        t0 = time.perf_counter()
+        conn.executemany("INSERT INTO farmers(name,state,lga,crop,phone) VALUES(?,?,?,?,?)",
+                         ((f"{rng.choice(FIRST)} {rng.choice(LAST)}", "Kano", "Dala", rng.choice(CROPS),
+                           f"+234 80{i % 10} {i:07d}") for i in range(args.rows)))
+        conn.commit()
+        load = time.perf_counter() - t0
+        like = timed(lambda: conn.execute("SELECT id, name FROM farmers WHERE name LIKE ? LIMIT 20",
+                                          ("%Ngozi Ibrahim%",)).fetchall(), 3)
+
+    client = farmers_app.app.test_client()
+    queries = {"name_prefix": "ngo", "two_words": "ngozi ibek", "crop": "groundnut",
+               "phone_exact": "08030000010", "phone_prefix": "0803000"}
+    result = {"rows": args.rows, "load_seconds": round(load, 1), "like_no_match": like}
+    for label, q in queries.items():
+        result[label] = timed(lambda: client.get("/api/search", query_string={"q": q}), args.repeat)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""One gzip'd /api/sync/push per reconnect vs one form post per farmer, and a full pull.
+
+    python -m benchmarks.sync --records 5000
+"""
+import argparse, gzip, importlib.util, json, os, random, sys, tempfile, time, uuid
+
+PAIRS = [("Kano", "Dala"), ("Kano", "Fagge"), ("Oyo", "Iseyin"), ("Benue", "Makurdi"), ("Borno", "Biu")]
+CROPS = ["Maize", "Rice", "Yam", "Cassava", "Sorghum"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=5000)
+    args = parser.parse_args()
+
+    root = os.getcwd()
+    sys.path.insert(0, root)
+    os.chdir(tempfile.mkdtemp())
+    spec = importlib.util.spec_from_file_location("agrosmart_app", os.path.join(root, "new app.py"))
+    agrosmart = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(agrosmart)
+    client = agrosmart.app.test_client()
+
+    rng = random.Random(5)
+    records = []
+    for i in range(args.records):
+        state, lga = rng.choice(PAIRS)
+        records.append({"uuid": str(uuid.UUID(int=rng.getrandbits(128))), "name": f"Offline {i}",
+                        "state": state, "lga": lga, "crop": rng.choice(CROPS)})
+    raw = "\n".join(json.dumps(r, separators=(",", ":")) for r in records).encode("utf-8")
+    body = gzip.compress(raw)
+
+    t0 = time.perf_counter()
+    for r in records:
+        client.post("/form", data={k: r[k] for k in ("name", "state", "lga", "crop")})
+    form_posts = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    report = client.post("/api/sync/push", data=body, headers={"Content-Encoding": "gzip"},
+                         content_type="application/x-ndjson").get_json()
+    push = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    retry = client.post("/api/sync/push", data=body, headers={"Content-Encoding": "gzip"},
+                        content_type="application/x-ndjson").get_json()
+    push_retry = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    since, requests, rows, wire = 0, 0, 0, 0
+    while True:
+        resp = client.get("/api/sync/pull", query_string={"since": since, "limit": 5000},
+                          headers={"Accept-Encoding": "gzip"})
+        wire += len(resp.data)
+        page = json.loads(gzip.decompress(resp.data) if resp.content_encoding == "gzip" else resp.data)
+        requests += 1
+        rows += len(page["rows"])
+        since = page["next"]
+        if not page["more"]:
+            break
+    pull = time.perf_counter() - t0
+
+    print(json.dumps({
+        "records": args.records,
+        "form_posts_seconds": round(form_posts, 2),
+        "push_seconds": round(push, 3),
+        "push_report": {k: report[k] for k in ("accepted", "duplicates", "rejected")},
+        "push_bytes_jsonl": len(raw),
+        "push_bytes_gzip": len(body),
+        "repeat_push_seconds": round(push_retry, 3),
+        "repeat_push_report": {k: retry[k] for k in ("accepted", "duplicates", "rejected")},
+        "pull_rows": rows,
+        "pull_requests": requests,
+        "pull_seconds": round(pull, 3),
+        "pull_bytes_gzip": wire,
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Reproducible synthetic farmers across every state/LGA in location_data.
+
+    python -m benchmarks.synthetic --rows 1000000 --out farmers.db
+
+Rows are a pure function of (rows, seed): same names, phones, LGAs and
+dates on every machine, so numbers from two commits are comparable. Names,
+crops, rainfall and flood risk follow the state's geopolitical zone; every
+LGA appears once, then LGAs get Zipf-skewed weights (a few busy ones, a
+long tail); created_at rises with id over three seasons, like real
+registrations.
+
+dataset() builds a database through the real migrations and triggers (so
+rollups, search and sync columns are populated) and caches the file by
+(rows, seed, schema version); 10M rows take a while the first time, and a
+cached file from an older schema is migrated forward rather than rebuilt.
+"""
+import argparse, bisect, datetime, itertools, os, random, shutil, sys, time, uuid
+
+GENERATOR_VERSION = 1
+DEFAULT_SEED = 2025
+BATCH = 50000
+CACHE_DIR = os.environ.get("BENCH_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "farmers-bench"))
+START = datetime.datetime(2023, 3, 1)
+SPAN_SECONDS = 3 * 365 * 86400
+
+ZONES = {
+    "NW": ("Jigawa", "Kaduna", "Kano", "Katsina", "Kebbi", "Sokoto", "Zamfara"),
+    "NE": ("Adamawa", "Bauchi", "Borno", "Gombe", "Taraba", "Yobe"),
+    "NC": ("Benue", "FCT", "Kogi", "Kwara", "Nasarawa", "Niger", "Plateau"),
+    "SW": ("Ekiti", "Lagos", "Ogun", "Ondo", "Osun", "Oyo"),
+    "SE": ("Abia", "Anambra", "Ebonyi", "Enugu", "Imo"),
+    "SS": ("Akwa Ibom", "Bayelsa", "Cross River", "Delta", "Edo", "Rivers"),
+}
+NORTH_FIRST = ["Abubakar", "Aisha", "Aminu", "Bello", "Fatima", "Garba", "Hadiza", "Ibrahim", "Musa",
+               "Hauwa", "Sani", "Usman", "Zainab", "Yakubu", "Halima", "Suleiman", "Maryam", "Nasiru"]
+NORTH_LAST = ["Abdullahi", "Adamu", "Aliyu", "Bello", "Dantata", "Garba", "Haruna", "Ibrahim", "Lawal",
+              "Mohammed", "Musa", "Sani", "Shehu", "Umar", "Usman", "Yusuf"]
+MIDDLE_FIRST = ["Terver", "Ene", "Sesugh", "Ojonugwa", "Grace", "Emmanuel", "Mercy", "Danjuma", "Ladi",
+                "Peter", "Ruth", "Joseph", "Esther", "Samuel"]
+MIDDLE_LAST = ["Tersoo", "Agbo", "Orngu", "Idoko", "Gyang", "Danladi", "Akaa", "Audu", "Pam", "Iorliam"]
+WEST_FIRST = ["Adebayo", "Adewale", "Bisi", "Folake", "Funmilayo", "Kehinde", "Oluwaseun", "Tunde",
+              "Yetunde", "Babatunde", "Bukola", "Segun", "Taiwo", "Omolara"]
+WEST_LAST = ["Adeyemi", "Afolabi", "Akinola", "Balogun", "Ogunleye", "Oladipo", "Olawale", "Oyelaran",
+             "Adebisi", "Ogundipe", "Salami", "Ojo"]
+EAST_FIRST = ["Chidi", "Chiamaka", "Emeka", "Ngozi", "Obinna", "Ifeoma", "Uchenna", "Adaeze", "Nnamdi",
+              "Chinonso", "Ebere", "Ikenna", "Amaka", "Tochukwu"]
+EAST_LAST = ["Okafor", "Eze", "Nwosu", "Obi", "Okeke", "Nwankwo", "Onyeka", "Chukwu", "Ibe", "Ugwu",
+             "Anyanwu", "Nwachukwu"]
+SOUTH_FIRST = ["Ekaette", "Ini", "Tamuno", "Ebiere", "Oghenekaro", "Efe", "Ima", "Preye", "Osagie",
+               "Itohan", "Edidiong", "Ovie"]
+SOUTH_LAST = ["Akpan", "Etim", "Bassey", "Okon", "George", "Briggs", "Omoregie", "Ogbeide", "Tonye",
+              "Eyo", "Ekpo", "Edet"]
+NAMES = {"NW": (NORTH_FIRST, NORTH_LAST), "NE": (NORTH_FIRST, NORTH_LAST), "NC": (MIDDLE_FIRST, MIDDLE_LAST),
+         "SW": (WEST_FIRST, WEST_LAST), "SE": (EAST_FIRST, EAST_LAST), "SS": (SOUTH_FIRST, SOUTH_LAST)}
+# (crop, weight) per zone
+CROPS = {
+    "NW": [("Sorghum", 5), ("Millet", 5), ("Maize", 4), ("Rice", 3), ("Groundnut", 3), ("Cowpea", 2)],
+    "NE": [("Sorghum", 5), ("Millet", 4), ("Maize", 3), ("Cowpea", 3), ("Groundnut", 2), ("Rice", 2)],
+    "NC": [("Yam", 5), ("Maize", 4), ("Rice", 3), ("Soybean", 3), ("Cassava", 3), ("Sorghum", 2)],
+    "SW": [("Cassava", 5), ("Maize", 4), ("Cocoa", 3), ("Yam", 2), ("Rice", 1)],
+    "SE": [("Cassava", 5), ("Yam", 4), ("Maize", 2), ("Oil Palm", 3), ("Rice", 2)],
+    "SS": [("Cassava", 5), ("Oil Palm", 4), ("Plantain", 3), ("Yam", 2), ("Rice", 2)],
+}
+# mean seasonal rainfall (mm/week) and share of farmers in flood-prone wards
+CLIMATE = {"NW": (35, .15), "NE": (30, .2), "NC": (60, .3), "SW": (75, .25), "SE": (85, .3), "SS": (95, .45)}
+PHONE_PREFIXES = ["0803", "0806", "0813", "0816", "0703", "0706", "0810", "0805", "0807", "0802",
+                  "0808", "0812", "0701", "0902", "0901", "0809", "0817", "0818", "0909", "0908"]
+COLUMNS = ("name", "state", "lga", "crop", "phone", "photo_path", "rainfall", "flood_risk",
+           "farm_size", "yield_amount", "created_at", "client_uuid")
+
+
+def _cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+
+def _zone_of():
+    return {state: zone for zone, states in ZONES.items() for state in states}
+
+
+def farmer_rows(count, seed=DEFAULT_SEED):
+    """Yield `count` rows in COLUMNS order; deterministic for a given seed."""
+    from locations import canonical_rows
+    rng = random.Random(seed)
+    pairs = canonical_rows()[0]
+    zone_of = _zone_of()
+    # Zipf-ish: LGA weights 1/rank in a seeded order
+    order = list(range(len(pairs)))
+    rng.shuffle(order)
+    weights = [0.0] * len(pairs)
+    for rank, i in enumerate(order, 1):
+        weights[i] = 1.0 / rank ** 0.6
+    lga_cum = _cumulative(weights)
+    crops = {z: ([c for c, _ in cw], _cumulative(w for _, w in cw)) for z, cw in CROPS.items()}
+    step = SPAN_SECONDS / max(count, 1)
+
+    for i in range(count):
+        # every LGA once up front, then the skewed draw
+        pick = order[i] if i < len(order) else bisect.bisect(lga_cum, rng.random() * lga_cum[-1])
+        state, lga = pairs[pick]
+        zone = zone_of.get(state, "NC")
+        first, last = NAMES[zone]
+        crop_names, crop_cum = crops[zone]
+        rain_mean, flood_share = CLIMATE[zone]
+        digits = f"{rng.randrange(10 ** 7):07d}"
+        prefix = rng.choice(PHONE_PREFIXES)
+        # field officers type numbers every which way; phone_norm has to cope
+        style = rng.random()
+        phone = (f"{prefix}{digits}" if style < .7 else
+                 f"+234{prefix[1:]}{digits}" if style < .85 else
+                 f"{prefix} {digits[:3]} {digits[3:]}")
+        size = round(rng.lognormvariate(0.3, 0.7), 2)
+        created = START + datetime.timedelta(seconds=int(i * step + rng.random() * step))
+        yield (f"{rng.choice(first)} {rng.choice(last)}", state, lga,
+               crop_names[bisect.bisect(crop_cum, rng.random() * crop_cum[-1])],
+               phone, "",
+               round(max(0.0, rng.gauss(rain_mean, rain_mean / 3)), 1),
+               "High" if rng.random() < flood_share else "Low",
+               size, round(size * rng.uniform(0.8, 3.5), 2),
+               created.strftime("%Y-%m-%d %H:%M:%S"),
+               str(uuid.UUID(int=rng.getrandbits(128), version=4)))
+
+
+def build(path, rows, seed=DEFAULT_SEED, progress=None):
+    """Create a fully migrated database at `path` holding `rows` synthetic farmers."""
+    from db import connect
+    from migrations import migrate
+    from locations import seed_locations
+
+    conn = connect(path)
+    conn.execute("PRAGMA synchronous=OFF")  # throwaway file, rebuilt on failure
+    migrate(conn)
+    seed_locations(conn)
+    sql = f"INSERT INTO farmers({', '.join(COLUMNS)}) VALUES({', '.join('?' * len(COLUMNS))})"
+    source = farmer_rows(rows, seed)
+    done = 0
+    while done < rows:
+        batch = list(itertools.islice(source, BATCH))
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(sql, batch)
+        conn.commit()
+        done += len(batch)
+        if progress:
+            progress(done, rows)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+
+def _migrate(path):
+    from db import connect
+    from migrations import migrate
+    conn = connect(path)
+    migrate(conn)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+
+def dataset(rows, seed=DEFAULT_SEED, cache_dir=CACHE_DIR, progress=None):
+    """Path to a cached build(rows, seed), building it on first use."""
+    from migrations import MIGRATIONS
+    schema = max(m[0] for m in MIGRATIONS)
+    os.makedirs(cache_dir, exist_ok=True)
+    name = f"farmers-{rows}-seed{seed}-schema{{}}-gen{GENERATOR_VERSION}.db"
+    path = os.path.join(cache_dir, name.format(schema))
+    older = [v for v in range(schema - 1, 0, -1) if os.path.exists(os.path.join(cache_dir, name.format(v)))]
+    if not os.path.exists(path) and older:
+        # new migrations are cheaper to apply than regenerating millions of rows
+        _migrate(os.path.join(cache_dir, name.format(older[0])))
+        os.replace(os.path.join(cache_dir, name.format(older[0])), path)
+    if not os.path.exists(path):
+        tmp = path + ".building"
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(tmp + suffix):
+                os.remove(tmp + suffix)
+        build(tmp, rows, seed, progress)
+        os.replace(tmp, path)
+    return path
+
+
+def _progress(done, total):
+    print(f"\r{done}/{total} farmers", end="\n" if done >= total else "", file=sys.stderr, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--out", help="write here instead of the cache (default: print the cached path)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.getcwd())
+    t0 = time.perf_counter()
+    path = dataset(args.rows, args.seed, progress=_progress)
+    if args.out:
+        shutil.copy(path, args.out)
+        path = args.out
+    print(f"{path} ({time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
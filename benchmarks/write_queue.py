@@ -0,0 +1,119 @@
+"""Sustained registrations/sec through the home() form with N gunicorn workers: direct INSERTs vs the write queue.
+
+    python -m benchmarks.write_queue --workers 8 --clients 32 --seconds 20
+
+Each mode gets a copy of the 10k synthetic dataset and its own gunicorn
+(WRITE_QUEUE=0 / 1). Clients post the registration form as fast as the
+server answers; afterwards the database is polled until every accepted
+registration is committed, so "inserts_per_sec" is rows in the table per
+second from the first request to the last commit.
+"""
+import argparse, http.client, json, multiprocessing, os, random, shutil, sqlite3, sys, tempfile, threading, time
+
+BOUNDARY = "----farmersbench"
+
+
+def form_body(i, rng, pairs):
+    state, lga = rng.choice(pairs)
+    fields = {"name": f"Drive {i}", "state": state, "lga": lga, "crop": "Maize", "phone": f"0803{i:07d}"}
+    parts = [f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n' for k, v in fields.items()]
+    parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="photo"; filename=""\r\n'
+                 "Content-Type: application/octet-stream\r\n\r\n\r\n")
+    parts.append(f"--{BOUNDARY}--\r\n")
+    return "".join(parts).encode("utf-8")
+
+
+def drive(port, clients, seconds, pairs):
+    latencies, failures, lock = [], [0], threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client(n):
+        rng = random.Random(n)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        mine, failed, i = [], 0, n
+        while time.perf_counter() < deadline:
+            body = form_body(i, rng, pairs)
+            t0 = time.perf_counter()
+            try:
+                conn.request("POST", "/", body, {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"})
+                resp = conn.getresponse()
+                resp.read()
+                ok = resp.status == 200
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                ok = False
+            if ok:
+                mine.append(time.perf_counter() - t0)
+            else:
+                failed += 1
+            i += clients
+        with lock:
+            latencies.extend(mine)
+            failures[0] += failed
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    return latencies, failures[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=20)
+    args = parser.parse_args()
+
+    root = os.getcwd()
+    sys.path.insert(0, root)
+    os.chdir(tempfile.mkdtemp())
+    from benchmarks.load import serve, _free_port, _wait_for
+    from benchmarks.synthetic import dataset
+    from locations import canonical_rows
+    pairs = canonical_rows()[0]
+    source = dataset(10000)
+    ctx = multiprocessing.get_context("spawn")
+
+    results = {}
+    for mode, flag in (("direct", "0"), ("queued", "1")):
+        database = os.path.abspath(f"{mode}.db")
+        shutil.copy(source, database)
+        before = sqlite3.connect(database).execute("SELECT COUNT(*) FROM farmers").fetchone()[0]
+        os.environ["WRITE_QUEUE"] = flag
+        port = _free_port()
+        proc = ctx.Process(target=serve, args=(root, "farmers", database, port, "gunicorn", args.workers, 1))
+        proc.start()
+        try:
+            _wait_for(port, proc)
+            start = time.perf_counter()
+            latencies, failed = drive(port, args.clients, args.seconds, pairs)
+            answered = time.perf_counter() - start
+            conn = sqlite3.connect(database)
+            while True:
+                committed = conn.execute("SELECT COUNT(*) FROM farmers").fetchone()[0] - before
+                if committed >= len(latencies) or time.perf_counter() - start > answered + 60:
+                    break
+                time.sleep(0.01)
+            elapsed = time.perf_counter() - start
+            conn.close()
+        finally:
+            proc.terminate()
+            proc.join(30)
+        results[mode] = {
+            "accepted": len(latencies), "failed": failed, "committed": committed,
+            "requests_per_sec": round(len(latencies) / answered, 1),
+            "inserts_per_sec": round(committed / elapsed, 1),
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+            "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 1) if latencies else None,
+            "max_ms": round(latencies[-1] * 1000, 1) if latencies else None,
+            "drain_seconds_after_last_response": round(elapsed - answered, 2),
+        }
+    print(json.dumps({"workers": args.workers, "clients": args.clients, "seconds": args.seconds, **results}))
+
+
+if __name__ == "__main__":
+    main()
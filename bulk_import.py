@@ -0,0 +1,140 @@
+"""Bulk farmer import from CSV or JSONL.
+
+Rows are validated against the in-memory state/LGA index and inserted with
+executemany() in chunked transactions; rejected rows are reported with their
+line number instead of aborting the import. Records that carry only lat/lon
+get their state and LGA from the nearest LGA centroid (see geo.py).
+
+    python bulk_import.py farmers.db officers_upload.csv
+    python bulk_import.py agrosmart.db records.jsonl
+"""
+import io, json, sys, csv
+from db import pooled
+from locations import get_locations
+from geo import geotag, get_geo_index
+
+CHUNK_SIZE = 5000
+MAX_REPORTED = 1000
+# headers written by /download map back onto the schema
+ALIASES = {"photo": "photo_path", "registered": "created_at", "uuid": "client_uuid"}
+# assigned by the database, never taken from a record
+SERVER_COLUMNS = ("id", "change_seq")
+
+
+def detect_format(filename="", mimetype=""):
+    name = (filename or "").lower()
+    if name.endswith((".jsonl", ".ndjson", ".json")) or "json" in (mimetype or ""):
+        return "jsonl"
+    return "csv"
+
+
+def read_records(stream, fmt):
+    """(line number, record dict) pairs; unparsable JSON lines yield the error instead."""
+    if fmt == "jsonl":
+        for lineno, line in enumerate(stream, 1):
+            if line.strip():
+                try:
+                    yield lineno, json.loads(line)
+                except ValueError as e:
+                    yield lineno, e
+    else:
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+
+
+def _importable(conn):
+    """Columns a record may set, with the value each gets when missing."""
+    columns, defaults = [], []
+    for _, name, _, _, default, _ in conn.execute("PRAGMA table_info(farmers)"):
+        if name in SERVER_COLUMNS:
+            continue
+        columns.append(name)
+        defaults.append(conn.execute(f"SELECT {default}").fetchone()[0] if default is not None else None)
+    return columns, defaults
+
+
+def _clean(record, columns, defaults, locations, required=("name",)):
+    if isinstance(record, Exception):
+        return None, f"invalid JSON: {record}"
+    if not isinstance(record, dict):
+        return None, "record is not an object"
+    values = {}
+    for key, value in record.items():
+        if key is None:
+            return None, "more fields than header columns"
+        key = key.strip().lower()
+        # SQLite takes only scalars; anything else would fail the whole chunk's executemany()
+        if isinstance(value, (dict, list)):
+            return None, f"{key} is not a single value"
+        if isinstance(value, int) and not -2 ** 63 <= value < 2 ** 63:
+            return None, f"{key} is out of range"
+        values[ALIASES.get(key, key)] = value.strip() if isinstance(value, str) else value
+    for column in required:
+        if not values.get(column):
+            return None, f"missing {column}"
+    state, lga = values.get("state"), values.get("lga")
+    if state not in locations:
+        return None, f"unknown state {state!r}"
+    if lga not in locations.lgas_for(state):
+        return None, f"unknown LGA {lga!r} for {state}"
+    return tuple(values[c] if values.get(c) not in (None, "") else d
+                 for c, d in zip(columns, defaults)), None
+
+
+def clean_record(conn, record, locations, required=("name",)):
+    """One record judged as an import would: ({column: value}, None) or (None, reason)."""
+    columns, defaults = _importable(conn)
+    row, reason = _clean(record, columns, defaults, locations, required)
+    if reason:
+        return None, reason
+    return {c: v for c, v in zip(columns, row) if v is not None}, None
+
+
+def import_records(conn, records, locations, chunk_size=CHUNK_SIZE, required=("name",)):
+    """Insert valid records in chunks. A record whose client_uuid is already
+    stored counts as a duplicate, so re-sending a batch is harmless."""
+    columns, defaults = _importable(conn)
+    sql = (f"INSERT INTO farmers({', '.join(columns)}) VALUES({', '.join('?' * len(columns))}) "
+           "ON CONFLICT DO NOTHING")
+    report = {"accepted": 0, "duplicates": 0, "rejected": 0, "errors": []}
+    batch = []
+
+    def flush():
+        with conn:
+            inserted = conn.executemany(sql, batch).rowcount
+        report["accepted"] += inserted
+        report["duplicates"] += len(batch) - inserted
+        batch.clear()
+
+    for lineno, record in records:
+        row, reason = _clean(record, columns, defaults, locations, required)
+        if reason:
+            report["rejected"] += 1
+            if len(report["errors"]) < MAX_REPORTED:
+                report["errors"].append({"line": lineno, "reason": reason})
+            continue
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            flush()
+    if batch:
+        flush()
+    return report
+
+
+def import_upload(conn, stream, fmt, locations, required=("name",), geo=None):
+    """Import a binary request/file stream (UTF-8, optional BOM); `geo` geo-tags lat/lon-only records."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    return import_records(conn, geotag(read_records(text, fmt), geo), locations, required=required)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python bulk_import.py <database> <file.csv|file.jsonl>")
+    database, path = sys.argv[1:]
+    locations = get_locations(database)
+    with pooled(database) as conn, open(path, "rb") as f:
+        report = import_upload(conn, f, detect_format(path), locations, geo=get_geo_index(database))
+    for error in report["errors"]:
+        print(f"line {error['line']}: {error['reason']}", file=sys.stderr)
+    print(f"imported {report['accepted']}, rejected {report['rejected']}")
@@ -0,0 +1,351 @@
+"""Parquet exports of the farmers table for the data office.
+
+    GET /download?format=parquet    the CSV's rows and filters, built while streaming
+    GET /download/snapshot          the whole table, prebuilt and kept current
+
+Rows are read ROW_GROUP_ROWS at a time and each batch becomes one
+zstd-compressed row group, so memory stays at one row group however big the
+table is. state, lga, crop and flood_risk are dictionary columns
+(categoricals in pandas/R) and created_at is a timestamp.
+
+The snapshot lives next to the database (<db>.snapshot/) as parts of
+PART_IDS ids each plus the assembled file. A part is rebuilt only when rows
+in its id range were added, changed or deleted after it was written (their
+change_seq and tombstones, see sync.py), so a new day's registrations cost
+one small part. A request that finds the snapshot behind starts a background
+rebuild (at most once per SNAPSHOT_MIN_INTERVAL) and gets the previous file.
+
+    python columnar.py snapshot [farmers.db]
+"""
+import fcntl, json, logging, os, sys, threading, time
+from flask import Response, abort, send_file, stream_with_context
+from db import backfill_pending, connect
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet exports need pyarrow; CSV keeps working without it
+    pa = None
+
+ROW_GROUP_ROWS = 65536
+PART_IDS = 262144
+SNAPSHOT_MIN_INTERVAL = float(os.environ.get("SNAPSHOT_MIN_INTERVAL", "60"))
+DICTIONARY_COLUMNS = ("state", "lga", "crop", "flood_risk")
+FLOAT_COLUMNS = ("rainfall", "farm_size", "yield_amount")
+INTEGER_COLUMNS = ("id", "change_seq")
+TIMESTAMP_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d")
+MIMETYPE = "application/vnd.apache.parquet"
+
+log = logging.getLogger("farmers.export")
+
+
+def _require():
+    if pa is None:
+        abort(501, "Parquet export needs pyarrow installed on the server")
+
+
+# === Encoding ===
+def arrow_schema(columns):
+    def field(name):
+        if name in DICTIONARY_COLUMNS:
+            return pa.field(name, pa.dictionary(pa.int32(), pa.string()))
+        if name in FLOAT_COLUMNS:
+            return pa.field(name, pa.float64())
+        if name in INTEGER_COLUMNS:
+            return pa.field(name, pa.int64())
+        if name == "created_at":
+            return pa.field(name, pa.timestamp("ms"))  # what Parquet stores; "s" would come back as ms
+        return pa.field(name, pa.string())
+    return pa.schema([field(c) for c in columns])
+
+
+def _column(values, field):
+    if pa.types.is_dictionary(field.type):
+        return pa.array(values, pa.string()).dictionary_encode()
+    if pa.types.is_timestamp(field.type):
+        text = pa.array(values, pa.string())
+        # registrations are "YYYY-MM-DD HH:MM:SS"; imports may carry ISO or bare dates
+        return pc.coalesce(*(pc.strptime(text, format=f, unit="ms", error_is_null=True) for f in TIMESTAMP_FORMATS))
+    if pa.types.is_string(field.type):
+        values = [v if v is None or isinstance(v, str) else str(v) for v in values]
+    elif pa.types.is_floating(field.type):
+        values = [_number(v) for v in values]
+    return pa.array(values, field.type)
+
+
+def _number(value):
+    # SQLite columns are loosely typed; text that is not a number becomes null
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def record_batch(rows, schema):
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    return pa.record_batch([_column(list(v), f) for v, f in zip(columns, schema)], schema=schema)
+
+
+def _writer(where, schema):
+    dictionary = [c for c in schema.names if c in DICTIONARY_COLUMNS]
+    return pq.ParquetWriter(where, schema, compression="zstd", use_dictionary=dictionary or False)
+
+
+def write_rows(writer, cursor, schema, row_group_rows=ROW_GROUP_ROWS):
+    """Write the cursor's remaining rows as row groups; returns the row count."""
+    n = 0
+    while True:
+        rows = cursor.fetchmany(row_group_rows)
+        if not rows:
+            return n
+        writer.write_batch(record_batch(rows, schema), row_group_size=row_group_rows)
+        n += len(rows)
+
+
+class _Sink:
+    """Write-only file object that hands pyarrow's output over in pieces."""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks, self.position = [], 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def iter_parquet(cursor, columns, row_group_rows=ROW_GROUP_ROWS):
+    schema = arrow_schema(columns)
+    sink = _Sink()
+    writer = _writer(sink, schema)
+    while True:
+        rows = cursor.fetchmany(row_group_rows)
+        if not rows:
+            break
+        writer.write_batch(record_batch(rows, schema), row_group_size=row_group_rows)
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+def parquet_response(conn, sql, params, columns, filename):
+    _require()
+    chunks = iter_parquet(conn.execute(sql, params), columns)
+    return Response(stream_with_context(chunks), mimetype=MIMETYPE,
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+
+# === Snapshot ===
+def snapshot_dir(database):
+    return database + ".snapshot"
+
+
+def snapshot_columns(conn):
+    """Every stored farmers column except the sync bookkeeping."""
+    return [r[1] for r in conn.execute("PRAGMA table_info(farmers)") if r[1] not in ("client_uuid", "change_seq")]
+
+
+def _manifest(directory):
+    try:
+        with open(os.path.join(directory, "manifest.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _stale_parts(conn, manifest, columns):
+    """Part numbers to (re)build: new id ranges, and ranges changed since their part was read."""
+    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM farmers").fetchone()[0]
+    wanted = set(range(max_id // PART_IDS + 1)) if max_id else set()
+    if not manifest or manifest["columns"] != columns:
+        return wanted
+    parts = {int(k): v for k, v in manifest["parts"].items()}
+    stale = set()
+    # everything up to built_seq is in the parts, so new id ranges show up as inserts after it and a
+    # range emptied by deletes is not rebuilt again; manifests from before built_seq use the oldest part
+    since = manifest.get("built_seq", min((p["seq"] for p in parts.values()), default=0))
+    changed = conn.execute(
+        "SELECT id / ?, MAX(change_seq) FROM farmers WHERE change_seq > ? GROUP BY 1 "
+        "UNION ALL SELECT farmer_id / ?, MAX(change_seq) FROM farmers_tombstones WHERE change_seq > ? GROUP BY 1",
+        (PART_IDS, since, PART_IDS, since)).fetchall()
+    for part, seq in changed:
+        if part not in parts or seq > parts[part]["seq"]:
+            stale.add(part)
+    return stale | (set(parts) - wanted)
+
+
+def _build_part(conn, directory, part, columns, schema):
+    """One read transaction: the part's rows and the sync seq they are current as of."""
+    conn.execute("BEGIN")
+    try:
+        seq = conn.execute("SELECT seq FROM sync_seq").fetchone()[0]
+        cursor = conn.execute(f"SELECT {', '.join(columns)} FROM farmers WHERE id >= ? AND id < ? ORDER BY id",
+                              (part * PART_IDS, (part + 1) * PART_IDS))
+        name = f"part-{part:05d}-{seq}.parquet"
+        tmp = os.path.join(directory, name + ".tmp")
+        with _writer(tmp, schema) as writer:
+            rows = write_rows(writer, cursor, schema)
+    finally:
+        conn.rollback()
+    os.replace(tmp, os.path.join(directory, name))
+    return {"file": name, "seq": seq, "rows": rows}
+
+
+def build_snapshot(database, columns, log=None):
+    """Bring <database>.snapshot up to date; returns its manifest.
+
+    Only one process builds at a time (an flock on the directory); others
+    return the current manifest and keep serving it.
+    """
+    directory = snapshot_dir(database)
+    os.makedirs(os.path.join(directory, "parts"), exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return _manifest(directory)
+        conn = connect(database)
+        try:
+            return _build(conn, directory, columns, log)
+        finally:
+            conn.close()
+
+
+def _build(conn, directory, columns, log):
+    t0 = time.perf_counter()
+    manifest = _manifest(directory)
+    if backfill_pending(conn, "sync"):
+        return manifest  # change_seq not set on every row yet; nothing to compare against
+    # read before looking for changes: whatever commits after it is left for the next build
+    built_seq = conn.execute("SELECT seq FROM sync_seq").fetchone()[0]
+    stale = _stale_parts(conn, manifest, columns)
+    if manifest and not stale and manifest["columns"] == columns:
+        if manifest.get("built_seq") != built_seq:
+            # e.g. changes already in parts built after them: nothing to copy, but move the watermark
+            manifest = dict(manifest, seq=built_seq, built_seq=built_seq)
+            _write_manifest(directory, manifest)
+        return manifest
+    schema = arrow_schema(columns)
+    parts = {} if not manifest or manifest["columns"] != columns else dict(manifest["parts"])
+    parts_dir = os.path.join(directory, "parts")
+    for part in sorted(stale):
+        parts.pop(str(part), None)
+        built = _build_part(conn, parts_dir, part, columns, schema)
+        if built["rows"]:
+            parts[str(part)] = built
+        else:
+            os.remove(os.path.join(parts_dir, built["file"]))
+    rows = sum(p["rows"] for p in parts.values())
+    name = f"farmers-{built_seq}.parquet"
+    tmp = os.path.join(directory, name + ".tmp")
+    # parts are stored with the same schema and row groups, so they are copied group by group
+    with _writer(tmp, schema) as writer:
+        for key in sorted(parts, key=int):
+            source = pq.ParquetFile(os.path.join(parts_dir, parts[key]["file"]))
+            for i in range(source.num_row_groups):
+                writer.write_table(source.read_row_group(i), row_group_size=ROW_GROUP_ROWS)
+    os.replace(tmp, os.path.join(directory, name))
+    manifest = {"columns": columns, "file": name, "seq": built_seq, "built_seq": built_seq, "rows": rows,
+                "parts": parts, "built_at": time.time()}
+    _write_manifest(directory, manifest)
+    _prune(directory, manifest)
+    if log:
+        log(f"snapshot: {len(stale)} part(s) rebuilt, {rows} rows in {time.perf_counter() - t0:.1f}s")
+    return manifest
+
+
+def _write_manifest(directory, manifest):
+    tmp = os.path.join(directory, "manifest.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, os.path.join(directory, "manifest.json"))
+
+
+def _prune(directory, manifest):
+    # the previous assembled file may still be being sent; keep it one more round
+    keep = {manifest["file"]} | {p["file"] for p in manifest["parts"].values()}
+    files = sorted((e for e in os.scandir(directory) if e.name.startswith("farmers-") and e.name not in keep),
+                   key=lambda e: e.stat().st_mtime)
+    for entry in files[:-1]:
+        os.remove(entry.path)
+    for entry in os.scandir(os.path.join(directory, "parts")):
+        if entry.name not in keep:
+            os.remove(entry.path)
+
+
+_started = {}
+_started_lock = threading.Lock()
+
+
+def _build_in_background(database, columns):
+    # at most one start per SNAPSHOT_MIN_INTERVAL per process, so a failing build is not retried per request
+    with _started_lock:
+        if time.time() - _started.get(database, 0) < SNAPSHOT_MIN_INTERVAL:
+            return
+        _started[database] = time.time()
+
+    def run():
+        try:
+            build_snapshot(database, columns)
+        except Exception:
+            log.exception("building the Parquet snapshot of %s failed", database)
+    threading.Thread(target=run, name="parquet-snapshot", daemon=True).start()
+
+
+def snapshot_response(conn, database, filename):
+    """The prebuilt snapshot; kicks off a rebuild when rows changed since it was made.
+
+    Small tables are built on the spot the first time; big ones answer 503
+    with Retry-After until the first build finishes.
+    """
+    _require()
+    if backfill_pending(conn, "sync"):
+        abort(503, "snapshot is waiting for the sync backfill, try again shortly")
+    directory = snapshot_dir(database)
+    columns = snapshot_columns(conn)
+    manifest = _manifest(directory)
+    if not manifest or manifest["columns"] != columns:
+        if conn.execute("SELECT COALESCE(MAX(id), 0) FROM farmers").fetchone()[0] <= PART_IDS:
+            manifest = build_snapshot(database, columns)
+        if not manifest or manifest["columns"] != columns:
+            _build_in_background(database, columns)
+            resp = Response("snapshot is being built, try again shortly\n", 503, mimetype="text/plain")
+            resp.headers["Retry-After"] = "30"
+            return resp
+    elif conn.execute("SELECT seq FROM sync_seq").fetchone()[0] > manifest["seq"]:
+        _build_in_background(database, columns)
+    # send_file() resolves a relative path against the app's root, not the working directory
+    path = os.path.abspath(os.path.join(directory, manifest["file"]))
+    resp = send_file(path, mimetype=MIMETYPE, as_attachment=True,
+                     download_name=filename, conditional=True, etag=f"{manifest['seq']}-{manifest['rows']}")
+    resp.headers["X-Snapshot-Rows"] = str(manifest["rows"])
+    resp.cache_control.no_cache = True
+    return resp
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "snapshot":
+        sys.exit(__doc__)
+    database = sys.argv[2] if len(sys.argv) > 2 else "farmers.db"
+    conn = connect(database)
+    columns = snapshot_columns(conn)
+    conn.close()
+    build_snapshot(database, columns, log=print)
@@ -0,0 +1,204 @@
+import os, queue, sqlite3, threading, time
+from contextlib import contextmanager
+from flask import g
+from metrics import TimedConnection
+
+# === Connection pool shared by every route ===
+# One pool per (worker process, database file). Connections stay open between
+# requests so pragmas are applied once and sqlite3's per-connection statement
+# cache keeps prepared statements warm.
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+STATEMENT_CACHE = 256
+BUSY_TIMEOUT_MS = 5000
+
+PRAGMAS = (
+    ("journal_mode", "WAL"),         # readers never block the writer
+    ("synchronous", "NORMAL"),       # safe with WAL, far fewer fsyncs
+    ("busy_timeout", BUSY_TIMEOUT_MS), # wait for the write lock instead of "database is locked"
+    ("mmap_size", 256 * 1024 * 1024),
+    ("cache_size", -16000),          # ~16 MB page cache per connection
+    ("temp_store", "MEMORY"),
+)
+
+
+def connect(path, uri=False):
+    # uri=True lets ATTACH take "file:...?mode=ro" names (see archive.py)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False, uri=uri,
+                           cached_statements=STATEMENT_CACHE, factory=TimedConnection)
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+class ConnectionPool:
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self.pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+
+    def acquire(self, timeout=POOL_TIMEOUT):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return connect(self.path)
+                except Exception:
+                    self._created -= 1
+                    raise
+        return self._idle.get(timeout=timeout)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path):
+    # gunicorn forks workers after import; never hand a parent's connection to a child
+    pool = _pools.get(path)
+    if pool is None or pool.pid != os.getpid():
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None or pool.pid != os.getpid():
+                pool = _pools[path] = ConnectionPool(path)
+    return pool
+
+
+@contextmanager
+def pooled(path):
+    """Borrow a connection outside of a request (startup, CLI, benchmarks)."""
+    pool = get_pool(path)
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+def get_db(path):
+    """The one accessor routes use: a pooled connection held for the rest of the request."""
+    conns = g.setdefault("_db_conns", {})
+    conn = conns.get(path)
+    if conn is None:
+        conn = conns[path] = get_pool(path).acquire()
+    return conn
+
+
+def close_db(exception=None):
+    conns = g.pop("_db_conns", None)
+    if conns:
+        for path, conn in conns.items():
+            get_pool(path).release(conn)
+
+
+
+def add_column(conn, table, column, decl):
+    """ALTER TABLE ... ADD COLUMN for databases created before the column existed."""
+    if column not in {r[1] for r in conn.execute(f"PRAGMA table_xinfo({table})")}:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+# === Filling derived data from a live table ===
+BACKFILL_BATCH = 5000
+BACKFILL_SQL = "CREATE TABLE IF NOT EXISTS backfill_progress(name TEXT PRIMARY KEY, pos INTEGER, last INTEGER)"
+
+
+def run_batches(conn, step, progress=None):
+    """Call step(conn) in one write transaction after another until it returns None.
+
+    step does one batch and returns (done, total), passed on to progress.
+    After each batch the caller pauses for as long as the batch held the
+    write lock, or the registrations waiting behind it would starve.
+    """
+    while True:
+        t0 = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            position = step(conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        if position is None:
+            return
+        time.sleep(time.perf_counter() - t0)
+        if progress:
+            progress(*position)
+
+
+def backfill_pending(conn, name):
+    conn.execute(BACKFILL_SQL)
+    return conn.execute("SELECT 1 FROM backfill_progress WHERE name = ?", (name,)).fetchone() is not None
+
+
+def backfill(conn, name, triggers, fill, setup=(), table="farmers", batch_size=BACKFILL_BATCH, guard=True):
+    """Install `triggers` on `table` and build what they maintain from the existing rows.
+
+    triggers: (trigger name, "AFTER INSERT ON farmers", "NEW" or "OLD", body) tuples.
+    fill: statements taking (low, high] id bounds, run one batch per transaction.
+
+    While the fill runs, a trigger only fires for rows the fill has already
+    passed (or that did not exist when it started); rows still ahead of it
+    are picked up later with whatever values they have then. So writers are
+    only held up for one batch at a time, and an interrupted backfill simply
+    resumes from backfill_progress. With guard=False the triggers fire for
+    every row from the start, for fills that skip rows a trigger already set.
+    """
+    def create(guarded):
+        for trigger, event, row, body in triggers:
+            when = (f" WHEN {row}.id <= (SELECT pos FROM backfill_progress WHERE name = '{name}') "
+                    f"OR {row}.id > (SELECT last FROM backfill_progress WHERE name = '{name}')") if guarded else ""
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            conn.execute(f"CREATE TRIGGER {trigger} {event}{when} BEGIN {body} END")
+
+    conn.execute(BACKFILL_SQL)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if not conn.execute("SELECT 1 FROM backfill_progress WHERE name = ?", (name,)).fetchone():
+            for sql in setup:
+                conn.execute(sql)
+            conn.execute("INSERT INTO backfill_progress(name, pos, last) "
+                         f"SELECT ?, 0, COALESCE(MAX(id), 0) FROM {table}", (name,))
+            create(guarded=guard)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    def fill_batch(conn):
+        row = conn.execute("SELECT pos, last FROM backfill_progress WHERE name = ?", (name,)).fetchone()
+        if row is None:  # finished by another process
+            return None
+        pos, last = row
+        if pos >= last:
+            create(guarded=False)
+            conn.execute("DELETE FROM backfill_progress WHERE name = ?", (name,))
+            return None
+        high = min(pos + batch_size, last)
+        for sql in fill:
+            conn.execute(sql, (pos, high))
+        conn.execute("UPDATE backfill_progress SET pos = ? WHERE name = ?", (high, name))
+        return high, last
+
+    run_batches(conn, fill_batch)
@@ -0,0 +1,254 @@
+"""Duplicate farmer detection: a blocking-key lookup on registration, batch clustering.
+
+Two blocking keys, both indexed, keep every comparison local:
+
+- phone: phone_norm (see search.py), in any LGA;
+- name: (state, lga, name_key), where name_key is the first three letters of
+  the first two words of the name, in alphabetical order, so "Musa Ibrahim",
+  "ibrahim musa" and "Musa Ibrahimm" all land on "ibr mus". Like phone_norm
+  it is a generated column, so every writer (queue, import, sync) keeps it.
+
+Only rows sharing a key are compared, by a difflib ratio over the name's
+words (accents dropped, sorted). The same phone needs PHONE_NAME_RATIO --
+families share one phone, so a different name on it is somebody else. The
+same LGA needs NAME_RATIO and phones that do not contradict each other
+(one missing, or a one-digit typo).
+
+    python dedup.py cluster farmers.db    # rebuild farmer_duplicates
+    python dedup.py show farmers.db [n]   # the n largest clusters
+
+cluster() walks each key's index in order and compares a block's members
+in a sliding window of WINDOW neighbours (sorted by name), so millions of
+rows cost a couple of index scans rather than an all-pairs comparison.
+"""
+import difflib, itertools, json, re, sys, time, unicodedata
+from db import connect
+from search import normalize_phone
+
+NAME_RATIO = 0.85
+PHONE_NAME_RATIO = 0.75
+MIN_PHONE_DIGITS = 7     # shorter is a placeholder, not a number
+BLOCK_LIMIT = 2000       # newest candidates per key looked at on registration
+WINDOW = 20
+SCAN_BATCH = 10000
+NAME_PUNCT = (".", ",", "-", "'")
+
+DEDUP_INDEXES = ("CREATE INDEX IF NOT EXISTS idx_farmers_dedup ON farmers(state, lga, name_key)",)
+DUPLICATES_SQL = (
+    """CREATE TABLE IF NOT EXISTS farmer_duplicates(
+    farmer_id INTEGER PRIMARY KEY,
+    cluster_id INTEGER NOT NULL
+)""",
+    "CREATE INDEX IF NOT EXISTS idx_farmer_duplicates_cluster ON farmer_duplicates(cluster_id)",
+)
+
+
+def _name_key_sql():
+    # SQL twin of name_key() for the generated column; lower() only folds ASCII
+    text = "name"
+    for ch in NAME_PUNCT:
+        text = f"replace({text}, '{ch.replace(chr(39), chr(39) * 2)}', ' ')"
+    text = f"trim(lower({text}))"
+    rest = f"ltrim(substr({text}, instr({text} || ' ', ' ')))"
+    first = f"substr(substr({text}, 1, instr({text} || ' ', ' ') - 1), 1, 3)"
+    second = f"substr(substr({rest}, 1, instr({rest} || ' ', ' ') - 1), 1, 3)"
+    return (f"CASE WHEN {second} = '' THEN {first} WHEN {first} <= {second} "
+            f"THEN {first} || ' ' || {second} ELSE {second} || ' ' || {first} END")
+
+
+NAME_KEY_SQL = _name_key_sql()
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+def name_key(name):
+    if name is None:
+        return None
+    for ch in NAME_PUNCT:
+        name = name.replace(ch, " ")
+    first, _, rest = name.translate(_ASCII_LOWER).strip(" ").partition(" ")
+    first, second = first[:3], rest.lstrip(" ").partition(" ")[0][:3]
+    return first if not second else " ".join(sorted((first, second)))
+
+
+def install_dedup(conn):
+    for sql in DUPLICATES_SQL:
+        conn.execute(sql)
+
+
+def normalize_name(name):
+    text = unicodedata.normalize("NFKD", name or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(sorted(re.findall(r"[a-z]+", text)))
+
+
+def name_similarity(a, b):
+    """0..1 between two normalize_name() results."""
+    if not a or not b:
+        return 0.0
+    return 1.0 if a == b else difflib.SequenceMatcher(None, a, b).ratio()
+
+
+def phones_agree(a, b):
+    if not a or not b:
+        return True
+    return len(a) == len(b) and sum(x != y for x, y in zip(a, b)) <= 1
+
+
+def _phone_key(phone_norm):
+    return phone_norm if phone_norm and len(phone_norm) >= MIN_PHONE_DIGITS else None
+
+
+def _match(a, b, same_phone):
+    """Score of two (id, normalized name, phone_norm) members, or None if they are not one farmer."""
+    if not same_phone and not phones_agree(a[2], b[2]):  # the cheap test first
+        return None
+    score = name_similarity(a[1], b[1])
+    return score if score >= (PHONE_NAME_RATIO if same_phone else NAME_RATIO) else None
+
+
+# === On registration ===
+def find_duplicates(conn, record, limit=5):
+    """Stored farmers that `record` (name, state, lga, phone) probably duplicates, best first."""
+    phone = _phone_key(normalize_phone(record.get("phone")))
+    key = name_key(record.get("name"))
+    me = (None, normalize_name(record.get("name")), phone)
+    found = {}
+    if phone:
+        rows = conn.execute("SELECT id, name, state, lga, phone, phone_norm FROM farmers "
+                            "WHERE phone_norm = ? ORDER BY id DESC LIMIT ?", (phone, BLOCK_LIMIT))
+        for row in rows:
+            score = _match(me, (row[0], normalize_name(row[1]), row[5]), True)
+            if score is not None:
+                found[row[0]] = (score, row)
+    if key and record.get("state") and record.get("lga"):
+        rows = conn.execute("SELECT id, name, state, lga, phone, phone_norm FROM farmers "
+                            "WHERE state = ? AND lga = ? AND name_key = ? ORDER BY id DESC LIMIT ?",
+                            (record["state"], record["lga"], key, BLOCK_LIMIT))
+        for row in rows:
+            if not phones_agree(phone, row[5]):
+                continue
+            score = _match(me, (row[0], normalize_name(row[1]), row[5]), False)
+            if score is not None and score > found.get(row[0], (-1,))[0]:
+                found[row[0]] = (score, row)
+    best = sorted(found.values(), key=lambda f: (-f[0], -f[1][0]))[:limit]
+    return [{"id": r[0], "name": r[1], "state": r[2], "lga": r[3], "phone": r[4], "score": round(s, 2)}
+            for s, r in best]
+
+
+# === Batch clustering ===
+class _Clusters:
+    """Union-find over the farmer ids that matched something; the smallest id is the root.
+
+    Clusters holding phones that contradict each other are never merged, so
+    a record without a phone joins one namesake instead of chaining every
+    namesake in its LGA into one farmer.
+    """
+
+    def __init__(self):
+        self.parent = {}
+        self.phones = {}
+
+    def find(self, x):
+        parent = self.parent
+        root = x
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while parent.get(x, x) != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    def union(self, a, b):
+        """Merge the clusters of members a and b, (id, name, phone_norm); False if their phones contradict."""
+        ra, rb = self.find(a[0]), self.find(b[0])
+        if ra == rb:
+            return True
+        pa = self.phones.get(ra, {a[2]} if a[2] else set())
+        pb = self.phones.get(rb, {b[2]} if b[2] else set())
+        if not all(phones_agree(x, y) for x in pa for y in pb):
+            return False
+        root, other = min(ra, rb), max(ra, rb)
+        self.parent[other] = root
+        self.parent.setdefault(root, root)
+        self.phones[root] = pa | pb
+        self.phones.pop(other, None)
+        return True
+
+    def members(self):
+        return {x: self.find(x) for x in self.parent}
+
+
+def _blocks(conn, sql):
+    """(key, [(id, normalized name, phone_norm), ...]) for each run of equal keys in `sql`'s order."""
+    cursor = conn.execute(sql)
+    rows = itertools.chain.from_iterable(iter(lambda: cursor.fetchmany(SCAN_BATCH), []))
+    for key, group in itertools.groupby(rows, key=lambda r: r[0]):
+        yield key, [(r[1], r[2], r[3]) for r in group]
+
+
+def _compare_block(members, same_phone, clusters):
+    if len(members) < 2:
+        return 0
+    members = [(i, normalize_name(name), phone) for i, name, phone in members]
+    members.sort(key=lambda m: m[1])
+    compared = 0
+    for n, a in enumerate(members):
+        for b in members[n + 1:n + 1 + WINDOW]:
+            compared += 1
+            if _match(a, b, same_phone) is not None:
+                clusters.union(a, b)
+    return compared
+
+
+def cluster(conn, progress=None):
+    """Rebuild farmer_duplicates from both blocking keys; returns a summary dict."""
+    t0 = time.perf_counter()
+    clusters, compared, blocks = _Clusters(), 0, 0
+    scans = (
+        ("SELECT state || '|' || lga || '|' || name_key, id, name, phone_norm FROM farmers "
+         "INDEXED BY idx_farmers_dedup WHERE state IS NOT NULL AND lga IS NOT NULL AND name_key != '' "
+         "ORDER BY state, lga, name_key", False),
+        ("SELECT phone_norm, id, name, phone_norm FROM farmers INDEXED BY idx_farmers_phone_norm "
+         "WHERE phone_norm > '' ORDER BY phone_norm", True),
+    )
+    for sql, same_phone in scans:
+        for key, members in _blocks(conn, sql):
+            if same_phone and not _phone_key(key):
+                continue
+            blocks += 1
+            compared += _compare_block(members, same_phone, clusters)
+            if progress and blocks % 100000 == 0:
+                progress(blocks, compared)
+    members = clusters.members()
+    with conn:
+        conn.execute("DELETE FROM farmer_duplicates")
+        conn.executemany("INSERT INTO farmer_duplicates(farmer_id, cluster_id) VALUES(?, ?)",
+                         sorted(members.items()))
+    roots = set(members.values())
+    return {"blocks": blocks, "comparisons": compared, "clusters": len(roots),
+            "farmers_in_clusters": len(members), "duplicates": len(members) - len(roots),
+            "seconds": round(time.perf_counter() - t0, 2)}
+
+
+def largest_clusters(conn, n=10):
+    rows = conn.execute("SELECT d.cluster_id, f.id, f.name, f.state, f.lga, f.phone FROM farmer_duplicates d "
+                        "JOIN farmers f ON f.id = d.farmer_id WHERE d.cluster_id IN "
+                        "(SELECT cluster_id FROM farmer_duplicates GROUP BY cluster_id "
+                        " ORDER BY COUNT(*) DESC, cluster_id LIMIT ?) ORDER BY d.cluster_id, f.id", (n,))
+    return [{"cluster_id": cluster_id, "farmers": [dict(zip(("id", "name", "state", "lga", "phone"), r[1:]))
+                                                   for r in group]}
+            for cluster_id, group in itertools.groupby(rows, key=lambda r: r[0])]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("cluster", "show"):
+        sys.exit(__doc__)
+    conn = connect(sys.argv[2])
+    if sys.argv[1] == "cluster":
+        summary = cluster(conn, lambda b, c: print(f"\r{b} blocks, {c} comparisons", end="",
+                                                   file=sys.stderr, flush=True))
+        print(file=sys.stderr)
+        print(json.dumps(summary))
+    else:
+        for found in largest_clusters(conn, int(sys.argv[3]) if len(sys.argv) > 3 else 10):
+            print(json.dumps(found))
+    conn.close()
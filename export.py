@@ -0,0 +1,115 @@
+import csv, io, zlib
+from flask import Response, abort, stream_with_context
+from db import pooled
+
+# === Streaming CSV export ===
+# Rows are pulled from the cursor in batches and written straight to the
+# response, so memory stays flat and no shared file is left on disk.
+BATCH_SIZE = 2000
+ORDER_BY_ID = " ORDER BY id"
+
+
+def export_query(table, columns, args, created=None):
+    """SELECT for the export, filtered by ?state, ?lga, ?from, ?to (YYYY-MM-DD) and ?since_id,
+    and to created_at in [created[0], created[1]) if given (a season, see archive.py).
+
+    Rows always come out in id order, so a sync job can pass the last id it saw
+    as since_id and pick up only farmers registered after it.
+    """
+    where, params = [], []
+    if created:
+        where.append("created_at >= ? AND created_at < ?"); params.extend(created)
+    if args.get("state"):
+        where.append("state = ?"); params.append(args["state"])
+    if args.get("lga"):
+        where.append("lga = ?"); params.append(args["lga"])
+    if args.get("from"):
+        where.append("created_at >= date(?)"); params.append(args["from"])
+    if args.get("to"):
+        where.append("created_at < date(?, '+1 day')"); params.append(args["to"])
+    if args.get("since_id"):
+        try:
+            params.append(int(args["since_id"]))
+        except ValueError:
+            abort(400, "since_id must be an integer")
+        where.append("id > ?")
+    sql = f"SELECT {', '.join(columns)} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql + " ORDER BY id", params
+
+
+class KeysetCursor:
+    """fetchmany() over an export query, one short read per batch.
+
+    Each batch borrows a pooled connection for a single `id > last` query,
+    so a client reading slowly holds neither a connection nor a read
+    transaction (which would keep the WAL from being checkpointed). Rows
+    committed while the export runs are included if their id is still ahead.
+    `borrow` is pooled() or another context manager taking the path.
+    """
+
+    def __init__(self, path, sql, params, borrow=pooled):
+        if not sql.endswith(ORDER_BY_ID):
+            raise ValueError("keyset export needs a query ordered by id")
+        self.path, self.params, self.last, self.done = path, list(params), 0, False
+        self.borrow = borrow
+        self.sql = f"SELECT * FROM ({sql[:-len(ORDER_BY_ID)]}) WHERE id > ?{ORDER_BY_ID} LIMIT ?"
+
+    def fetchmany(self, size):
+        if self.done:
+            return []
+        with self.borrow(self.path) as conn:
+            rows = conn.execute(self.sql, self.params + [self.last, size]).fetchall()
+        self.done = len(rows) < size
+        if rows:
+            self.last = rows[-1][0]  # export columns start with id
+        return rows
+
+
+class paged:
+    """Pass instead of a connection to csv_response()/parquet_response()."""
+
+    def __init__(self, path, borrow=pooled):
+        self.path = path
+        self.borrow = borrow
+
+    def execute(self, sql, params=()):
+        return KeysetCursor(self.path, sql, params, self.borrow)
+
+
+def iter_csv(cursor, header, batch_size=BATCH_SIZE):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if rows:
+            writer.writerows(rows)
+        chunk = buf.getvalue()
+        if chunk:
+            yield chunk.encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+        if not rows:
+            break
+
+
+def gzip_chunks(chunks, level=6):
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = z.compress(chunk)
+        if data:
+            yield data
+    yield z.flush()
+
+
+def csv_response(conn, sql, params, header, filename, gzip=False):
+    cursor = conn.execute(sql, params)
+    chunks = iter_csv(cursor, header)
+    if gzip:
+        chunks, mimetype, filename = gzip_chunks(chunks), "application/gzip", filename + ".gz"
+    else:
+        mimetype = "text/csv"
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
@@ -0,0 +1,190 @@
+"""Nearest LGA for a GPS fix, from the centroids in lga_coords.
+
+Centroids are bucketed into a GRID_DEGREES grid once per worker. The first
+lookup in a cell near the country works out the short list of centroids
+that can be nearest to any point inside it; after that a lookup is one dict
+probe and a scan of a handful of candidates. It picks the nearest centroid,
+not the polygon the point falls in: close to a boundary the answer can be
+the neighbouring LGA, which is fine for pre-filling a form the officer
+still checks.
+
+    GET /api/locate?lat=12.0&lon=8.5   {"state", "lga", "distance_km"}
+
+geotag() fills state/LGA in import records that carry only lat/lon,
+resolving a whole chunk of records per nearest_many() pass.
+"""
+import math, threading
+from flask import abort
+from db import pooled
+from locations import CENTROIDS_SQL, get_locations
+
+GRID_DEGREES = 0.25
+MAX_DISTANCE_KM = 150   # further than this from every centroid is outside the country
+EARTH_KM = 6371.0
+GEOTAG_CHUNK = 5000
+LAT_KEYS, LON_KEYS = ("lat", "latitude"), ("lon", "lng", "longitude")
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((p2 - p1) / 2) ** 2
+         + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_KM * math.asin(math.sqrt(a))
+
+
+class GridIndex:
+    __slots__ = ("size", "cells", "_buckets", "_bounds", "_shrink")
+
+    def __init__(self, rows, grid=GRID_DEGREES):
+        self.size = 0
+        self.cells = {}
+        buckets = self._buckets = {}
+        for state, lga, lat, lon in rows:
+            buckets.setdefault((math.floor(lat / grid), math.floor(lon / grid)), []).append((lat, lon, state, lga))
+            self.size += 1
+        self._bounds = self._shrink = None
+        if buckets:
+            margin = math.ceil(MAX_DISTANCE_KM / 111.0 / grid) + 1
+            lats = [i for i, _ in buckets]
+            lons = [j for _, j in buckets]
+            self._bounds = (min(lats) - margin, max(lats) + margin, min(lons) - margin, max(lons) + margin)
+            # longitude degrees shrink with latitude; this is the narrowest they get inside the bounds
+            edge = max(abs(self._bounds[0]), abs(self._bounds[1] + 1)) * grid
+            self._shrink = math.cos(math.radians(min(edge, 89.0)))
+
+    def __len__(self):
+        return self.size
+
+    def _ring(self, i, j, r):
+        for di in range(-r, r + 1):
+            for dj in range(-r, r + 1):
+                if max(abs(di), abs(dj)) == r:
+                    yield from self._buckets.get((i + di, j + dj), ())
+
+    def candidates(self, i, j):
+        """Every centroid that can be nearest to some point of cell (i, j); () off the map."""
+        found = self.cells.get((i, j))
+        if found is None:
+            low_i, high_i, low_j, high_j = self._bounds or (0, -1, 0, -1)
+            if not (low_i <= i <= high_i and low_j <= j <= high_j):
+                return ()
+            first = 0
+            while not any(True for _ in self._ring(i, j, first)):
+                first += 1
+            # a centroid in ring `first` is within (first + 1) cells diagonally of any point
+            # in the cell; nothing beyond ring `last` can beat it
+            last = math.ceil((first + 1) * math.sqrt(2) / self._shrink)
+            found = self.cells[i, j] = tuple(c for r in range(last + 1) for c in self._ring(i, j, r))
+        return found
+
+    def nearest(self, lat, lon):
+        """(state, lga, km) of the nearest centroid, or None outside the country."""
+        return self.nearest_many(((lat, lon),))[0]
+
+    def nearest_many(self, points):
+        """nearest() for a batch of (lat, lon), in one pass with the loop invariants hoisted."""
+        results = []
+        append, cells, candidates, floor, cos, radians = (
+            results.append, self.cells, self.candidates, math.floor, math.cos, math.radians)
+        for lat, lon in points:
+            cell = (floor(lat / GRID_DEGREES), floor(lon / GRID_DEGREES))
+            near = cells.get(cell) or candidates(*cell)
+            if not near:
+                append(None)
+                continue
+            scale = cos(radians(lat))
+            best, best_d = None, math.inf
+            for c in near:
+                dy, dx = c[0] - lat, (c[1] - lon) * scale
+                d = dy * dy + dx * dx
+                if d < best_d:
+                    best, best_d = c, d
+            km = distance_km(lat, lon, best[0], best[1])
+            append((best[2], best[3], km) if km <= MAX_DISTANCE_KM else None)
+        return results
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_geo_index(path):
+    """The grid for one database, rebuilt whenever its location index is (reseeds)."""
+    locations = get_locations(path)
+    cached = _indexes.get(path)
+    if cached is None or cached[0] is not locations:
+        with _lock:
+            cached = _indexes.get(path)
+            if cached is None or cached[0] is not locations:
+                with pooled(path) as conn:
+                    cached = _indexes[path] = (locations, GridIndex(conn.execute(CENTROIDS_SQL)))
+    return cached[1]
+
+
+def _coordinate(text, low, high):
+    value = float(text)
+    if not low <= value <= high:  # also rejects nan
+        raise ValueError(text)
+    return value
+
+
+def locate_response(geo, args):
+    try:
+        lat = _coordinate(args["lat"], -90, 90)
+        lon = _coordinate(args["lon"], -180, 180)
+    except (KeyError, ValueError):
+        abort(400, "lat and lon are required, in decimal degrees")
+    if not geo:
+        abort(404, "no LGA centroids loaded")
+    found = geo.nearest(lat, lon)
+    if found is None:
+        abort(404, f"no LGA within {MAX_DISTANCE_KM} km")
+    state, lga, km = found
+    return {"state": state, "lga": lga, "distance_km": round(km, 1)}
+
+
+# === Bulk geo-tagging of import records ===
+def _point(record):
+    values = {k.strip().lower(): v for k, v in record.items() if isinstance(k, str)}
+    if str(values.get("state") or "").strip() and str(values.get("lga") or "").strip():
+        return None
+    lat = next((values[k] for k in LAT_KEYS if values.get(k) not in (None, "")), None)
+    lon = next((values[k] for k in LON_KEYS if values.get(k) not in (None, "")), None)
+    try:
+        return _coordinate(lat, -90, 90), _coordinate(lon, -180, 180)
+    except (TypeError, ValueError):
+        return None
+
+
+def _tag(chunk, geo):
+    wanted = []
+    for _, record in chunk:
+        point = _point(record) if isinstance(record, dict) else None
+        if point:
+            wanted.append((record, point))
+    found = geo.nearest_many([p for _, p in wanted])
+    for (record, _), hit in zip(wanted, found):
+        if not hit:
+            continue
+        keys = {k.strip().lower(): k for k in record if isinstance(k, str)}
+        # a value the record did give is kept; validation then catches a mismatch
+        for column, value in (("state", hit[0]), ("lga", hit[1])):
+            key = keys.get(column, column)
+            if not str(record.get(key) or "").strip():
+                record[key] = value
+
+
+def geotag(records, geo, chunk_size=GEOTAG_CHUNK):
+    """Pass (line, record) pairs through, filling a missing state/LGA from lat/lon."""
+    if not geo:
+        yield from records
+        return
+    chunk = []
+    for item in records:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            _tag(chunk, geo)
+            yield from chunk
+            chunk.clear()
+    _tag(chunk, geo)
+    yield from chunk
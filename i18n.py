@@ -0,0 +1,102 @@
+"""UI strings from translation files, compiled once per app into frozen per-language tables.
+
+translations/<code>.json (TRANSLATIONS overrides the directory):
+
+    {"language": "Hausa", "fallback": ["en"], "strings": {"name": "Cikakken Suna", ...}}
+
+A language only lists the strings it translates; the rest come from its
+fallback chain (its "fallback" languages in order, each with their own
+chains, then DEFAULT_LANGUAGE). At startup every chain is flattened into
+one read-only dict per language, so a request does one dict lookup for its
+table and the templates one per string, however many languages there are.
+A bad file or an unknown fallback stops startup rather than showing blanks.
+
+    python i18n.py missing [translations/]   # strings each language still takes from a fallback
+"""
+import json, os, sys
+from types import MappingProxyType
+
+CATALOG_DIR = os.environ.get("TRANSLATIONS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "translations"))
+DEFAULT_LANGUAGE = "en"
+
+
+class Catalogs:
+    """Compiled tables by language code, plus each language's own name."""
+
+    def __init__(self, tables, names, own, default=DEFAULT_LANGUAGE):
+        self.tables = MappingProxyType(tables)
+        self.names = MappingProxyType(names)
+        self.own = MappingProxyType(own)
+        self.default = default
+        # the default first, then by code: the order of the language links
+        self.languages = tuple(sorted(tables, key=lambda code: (code != default, code)))
+
+    def __contains__(self, lang):
+        return lang in self.tables
+
+    def __len__(self):
+        return len(self.tables)
+
+    def resolve(self, lang, default=None):
+        """A language we have for `lang` ("ha", "ha-NG", "HA"), else `default`."""
+        if lang:
+            lang = lang.strip().lower().replace("_", "-")
+            if lang in self.tables:
+                return lang
+            base = lang.split("-", 1)[0]
+            if base in self.tables:
+                return base
+        return default if default in self.tables else self.default
+
+    def strings(self, lang):
+        return self.tables[self.resolve(lang)]
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not isinstance(data.get("strings"), dict):
+        raise ValueError(f"{path}: expected {{\"language\": ..., \"strings\": {{...}}}}")
+    fallback = data.get("fallback", [])
+    return data.get("language", ""), [fallback] if isinstance(fallback, str) else list(fallback), data["strings"]
+
+
+def _chain(code, files, default, seen=()):
+    """`code` then everything it falls back to, nearest first, each language once."""
+    if code in seen:
+        raise ValueError(f"translations: fallback loop {' -> '.join(seen + (code,))}")
+    if code not in files:
+        raise ValueError(f"translations: {seen[-1]} falls back to {code!r}, which has no file")
+    chain = [code]
+    for parent in files[code][1] + ([default] if code != default else []):
+        chain += [c for c in _chain(parent, files, default, seen + (code,)) if c not in chain]
+    return chain
+
+
+def load_catalogs(directory=CATALOG_DIR, default=DEFAULT_LANGUAGE):
+    files = {}
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if entry.name.endswith(".json"):
+            files[entry.name[:-len(".json")].lower()] = _read(entry.path)
+    if default not in files:
+        raise ValueError(f"translations: no {default}.json in {directory}")
+    tables, names, own = {}, {}, {}
+    for code in files:
+        table = {}
+        for parent in reversed(_chain(code, files, default)):
+            table.update(files[parent][2])
+        tables[code] = MappingProxyType(table)
+        names[code] = files[code][0] or code
+        own[code] = frozenset(files[code][2])
+    return Catalogs(tables, names, own, default)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3) or sys.argv[1] != "missing":
+        sys.exit(__doc__)
+    catalogs = load_catalogs(sys.argv[2] if len(sys.argv) == 3 else CATALOG_DIR)
+    every = catalogs.tables[catalogs.default]
+    for code in catalogs.languages:
+        missing = sorted(set(every) - catalogs.own[code])
+        print(f"{code} ({catalogs.names[code]}): {len(every) - len(missing)}/{len(every)} translated"
+              + (f"; from fallbacks: {', '.join(missing)}" if missing else ""))
@@ -0,0 +1,107 @@
+"""Weather / recommended-seed indicators per (state, LGA, day).
+
+An indicator is computed once per key by a provider and memoized in a small
+TTL + LRU cache, so a dashboard page costs one lookup per distinct LGA rather
+than one random draw per row, and reloads agree with each other.
+
+Set INDICATORS_FILE to a CSV with columns state,lga,condition,seed,risk to use
+local data offline; an empty lga column applies to the whole state.
+"""
+import csv, datetime, hashlib, os, threading, time
+from collections import OrderedDict
+
+WEATHER = (
+    {"condition": "Sunny", "seed": "Maize", "risk": "Low"},
+    {"condition": "Rainy", "seed": "Rice", "risk": "Medium"},
+    {"condition": "Heavy Rain", "seed": "Sugarcane", "risk": "High"},
+    {"condition": "Dry", "seed": "Millet", "risk": "Low"},
+    {"condition": "Cloudy", "seed": "Cassava", "risk": "Medium"},
+)
+
+
+class SimulatedProvider:
+    """Stand-in until a real feed exists: stable per (state, lga, day)."""
+
+    def get(self, state, lga, day):
+        digest = hashlib.blake2b(f"{state}|{lga}|{day}".encode("utf-8"), digest_size=4).digest()
+        return WEATHER[int.from_bytes(digest, "big") % len(WEATHER)]
+
+
+class FileProvider:
+    """Indicators from a local CSV, re-read when the file changes."""
+
+    def __init__(self, path, fallback=None):
+        self.path = path
+        self.fallback = fallback or SimulatedProvider()
+        self._mtime = None
+        self._table = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        mtime = os.path.getmtime(self.path)
+        if mtime == self._mtime:
+            return self._table
+        with self._lock:
+            if mtime != self._mtime:
+                table = {}
+                with open(self.path, newline="", encoding="utf-8") as f:
+                    for row in csv.DictReader(f):
+                        table[(row["state"], row.get("lga") or "")] = {
+                            "condition": row["condition"], "seed": row["seed"], "risk": row["risk"]}
+                self._table, self._mtime = table, mtime
+        return self._table
+
+    def get(self, state, lga, day):
+        table = self._load()
+        found = table.get((state, lga)) or table.get((state, ""))
+        return found or self.fallback.get(state, lga, day)
+
+
+class IndicatorEngine:
+    def __init__(self, provider, ttl=3600, maxsize=4096):
+        self.provider = provider
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def indicator(self, state, lga="", day=None):
+        key = (state or "", lga or "", day or datetime.date.today().isoformat())
+        now = time.monotonic()
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit and hit[0] > now:
+                self._cache.move_to_end(key)
+                return hit[1]
+        value = self.provider.get(*key)
+        with self._lock:
+            self._cache[key] = (now + self.ttl, value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return value
+
+    def bulk(self, pairs, day=None):
+        """{(state, lga): indicator} for every distinct pair, one lookup each."""
+        day = day or datetime.date.today().isoformat()
+        return {pair: self.indicator(pair[0], pair[1], day) for pair in set(pairs)}
+
+    def annotate(self, farmers, day=None):
+        """Add weather/recommended/risk to a page of farmer dicts in one pass."""
+        found = self.bulk(((f["state"], f["lga"]) for f in farmers), day)
+        for f in farmers:
+            ind = found[(f["state"], f["lga"])]
+            f["weather"], f["recommended"], f["risk"] = ind["condition"], ind["seed"], ind["risk"]
+        return farmers
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+def default_provider():
+    path = os.environ.get("INDICATORS_FILE")
+    return FileProvider(path) if path and os.path.exists(path) else SimulatedProvider()
+
+
+engine = IndicatorEngine(default_provider())
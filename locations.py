@@ -0,0 +1,176 @@
+import csv, hashlib, json, math, os, threading
+from functools import lru_cache
+from types import MappingProxyType
+from flask import Response, request
+from db import pooled, add_column
+from location_data import ALL_LOCATIONS
+
+# === State/LGA reference data ===
+# Loaded once per worker into an immutable index; the version is a hash of the
+# content so clients (and the ETag) only change when the data itself does.
+MAX_AGE = 24 * 3600
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# state,lga,lat,lon per LGA (WGS84 decimal degrees), seeded together with
+# ALL_LOCATIONS; every LGA must have exactly one row. The shipped file puts each
+# LGA at its headquarters town: `place` names the town and `source` says where
+# the point comes from -- geonames:<id> (GeoNames, CC BY 4.0),
+# countries-states-cities (ODbL), or approx for a town neither gazetteer lists.
+CENTROIDS_CSV = os.environ.get("LGA_CENTROIDS", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                             "lga_centroids.csv"))
+
+LOCATIONS_SCHEMA = """CREATE TABLE IF NOT EXISTS lga_coords(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    state TEXT NOT NULL,
+    lga TEXT NOT NULL,
+    lat REAL,
+    lon REAL,
+    UNIQUE(state, lga)
+)"""
+META_SCHEMA = "CREATE TABLE IF NOT EXISTS app_meta(key TEXT PRIMARY KEY, value TEXT)"
+LOCATIONS_SQL = "SELECT state, lga FROM lga_coords"
+CENTROIDS_SQL = "SELECT state, lga, lat, lon FROM lga_coords WHERE lat IS NOT NULL AND lon IS NOT NULL"
+
+
+class LocationIndex:
+    __slots__ = ("lgas", "states", "version", "json")
+
+    def __init__(self, pairs):
+        grouped = {}
+        for state, lga in pairs:
+            grouped.setdefault(state, set()).add(lga)
+        self.lgas = MappingProxyType({s: tuple(sorted(grouped[s])) for s in sorted(grouped)})
+        self.states = tuple(self.lgas)
+        payload = json.dumps({s: list(l) for s, l in self.lgas.items()},
+                             ensure_ascii=False, separators=(",", ":"))
+        self.version = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+        self.json = '{"version":"%s","lgas":%s}' % (self.version, payload)
+
+    def lgas_for(self, state):
+        return self.lgas.get(state, ())
+
+    def __contains__(self, state):
+        return state in self.lgas
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_locations(path, sql=LOCATIONS_SQL):
+    """The index for one database; `sql` must return (state, lga) rows."""
+    index = _indexes.get(path)
+    if index is None:
+        with _lock:
+            index = _indexes.get(path)
+            if index is None:
+                with pooled(path) as conn:
+                    index = _indexes[path] = LocationIndex(conn.execute(sql))
+    return index
+
+
+def invalidate_locations(path=None):
+    with _lock:
+        if path is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(path, None)
+
+
+@lru_cache(maxsize=None)
+def canonical_rows():
+    """(rows, content hash) for the canonical dataset, computed once per process."""
+    rows = sorted({(state, lga) for state, lgas in ALL_LOCATIONS.items() for lga in lgas})
+    digest = hashlib.sha1(json.dumps(rows, ensure_ascii=False).encode("utf-8")).hexdigest()
+    return rows, digest
+
+
+@lru_cache(maxsize=None)
+def canonical_centroids(path=CENTROIDS_CSV):
+    """({(state, lga): (lat, lon)}, content hash) from the centroid CSV.
+
+    Raises ValueError unless the file has one good row for every LGA in
+    ALL_LOCATIONS and nothing else, so a gap fails seeding instead of /api/locate.
+    """
+    known = set(canonical_rows()[0])
+    centroids, problems = {}, []
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        for record in reader:
+            key = ((record.get("state") or "").strip(), (record.get("lga") or "").strip())
+            try:
+                lat, lon = float(record["lat"]), float(record["lon"])
+            except (KeyError, TypeError, ValueError):
+                lat = lon = math.nan
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                problems.append(f"line {reader.line_num}: bad coordinates")
+            elif key not in known:
+                problems.append(f"line {reader.line_num}: unknown LGA {key[0]}/{key[1]}")
+            elif key in centroids:
+                problems.append(f"line {reader.line_num}: second row for {key[0]}/{key[1]}")
+            else:
+                centroids[key] = (lat, lon)
+    problems += [f"no centroid for {s}/{l}" for s, l in sorted(known - set(centroids))]
+    if problems:
+        more = f" (and {len(problems) - 10} more)" if len(problems) > 10 else ""
+        raise ValueError(f"{path}: {'; '.join(problems[:10])}{more}")
+    items = sorted((s, l, lat, lon) for (s, l), (lat, lon) in centroids.items())
+    return centroids, hashlib.sha1(json.dumps(items, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def seed_locations(conn):
+    """Make lga_coords match the canonical dataset in one transaction.
+
+    The dataset hash (names plus centroids) is stored in app_meta, so warm
+    starts cost one SELECT. Returns True when the table was (re)seeded.
+    """
+    rows, digest = canonical_rows()
+    centroids, centroids_digest = canonical_centroids()
+    digest = hashlib.sha1(f"{digest}:{centroids_digest}".encode()).hexdigest()
+    conn.execute(LOCATIONS_SCHEMA)
+    conn.execute(META_SCHEMA)
+    if _seeded_hash(conn) == digest and _has_coordinates(conn):
+        return False
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # lga_coords from before coordinates were kept
+        add_column(conn, "lga_coords", "lat", "REAL")
+        add_column(conn, "lga_coords", "lon", "REAL")
+        if _seeded_hash(conn) == digest:  # another worker got there first
+            conn.commit()
+            return False
+        conn.execute("DELETE FROM lga_coords")
+        # lga_coords tables from before the UNIQUE constraint get an equivalent index
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_lga_coords_state_lga ON lga_coords(state, lga)")
+        conn.executemany("INSERT OR IGNORE INTO lga_coords(state, lga, lat, lon) VALUES(?, ?, ?, ?)",
+                         [(s, l) + centroids[s, l] for s, l in rows])
+        conn.execute("INSERT INTO app_meta(key, value) VALUES('locations_hash', ?) "
+                     "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (digest,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    invalidate_locations()
+    return True
+
+
+def _seeded_hash(conn):
+    row = conn.execute("SELECT value FROM app_meta WHERE key = 'locations_hash'").fetchone()
+    return row[0] if row else None
+
+
+def _has_coordinates(conn):
+    return "lat" in {r[1] for r in conn.execute("PRAGMA table_info(lga_coords)")}
+
+
+def locations_response(index):
+    # /api/locations?v=<version> never changes, so phones can keep it for a year;
+    # without (or with a stale) v the client revalidates daily via If-None-Match.
+    resp = Response(index.json, mimetype="application/json")
+    resp.set_etag(index.version)
+    resp.cache_control.public = True
+    if request.args.get("v") == index.version:
+        resp.cache_control.max_age = IMMUTABLE_MAX_AGE
+        resp.cache_control.immutable = True
+    else:
+        resp.cache_control.max_age = MAX_AGE
+    return resp.make_conditional(request)
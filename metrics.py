@@ -0,0 +1,273 @@
+"""Request, SQL, template and photo timings, exposed for Prometheus at /metrics.
+
+    init_metrics(app)      before/after hooks, template signals, /metrics, ?profile=1
+
+Every connection from db.connect() is a TimedConnection, so each statement's
+execute time and row count lands in a histogram labelled by operation and
+table, and in the current request's Server-Timing header. Set
+SLOW_QUERY_MS to log statements slower than that (logger "farmers.sql").
+
+/metrics and ?profile=1 (on the dashboard or the CSV download, a cProfile
+report instead of the page) need ADMIN_TOKEN set and sent as X-Admin-Token
+or as a bearer token (Prometheus' `authorization` scrape setting); without
+it both answer 403. Metrics are per worker process.
+"""
+import cProfile, hmac, io, logging, os, pstats, re, sqlite3, threading, time
+from bisect import bisect_left
+from functools import lru_cache
+from flask import Response, abort, current_app, g, has_app_context, request
+from flask.signals import before_render_template, template_rendered
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "0"))
+PROFILED_ENDPOINTS = ("dashboard", "download_csv")
+PROFILE_LINES = 40
+STATEMENT_LABELS = 1024   # distinct SQL strings whose (op, table) labels are kept
+
+log = logging.getLogger("farmers.sql")
+
+REQUEST_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+FAST_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _labels(self, values, le=None):
+        pairs = ['%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+                 for k, v in zip(self.labelnames, values)]
+        if le is not None:
+            pairs.append(f'le="{le}"')
+        return "{%s}" % ",".join(pairs) if pairs else ""
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.extend(self._lines(labels, value))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _lines(self, labels, value):
+        return [f"{self.name}{self._labels(labels)} {value}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=REQUEST_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value, labels=()):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def _lines(self, labels, value):
+        counts, total = value
+        lines, running = [], 0
+        for bound, n in zip(self.buckets + ("+Inf",), counts):
+            running += n
+            le = bound if bound == "+Inf" else repr(float(bound))
+            lines.append(f"{self.name}_bucket{self._labels(labels, le)} {running}")
+        lines.append(f"{self.name}_sum{self._labels(labels)} {total}")
+        lines.append(f"{self.name}_count{self._labels(labels)} {running}")
+        return lines
+
+
+REGISTRY = []
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Time to handle a request.",
+                            ("endpoint", "method", "status"))
+SQL_SECONDS = Histogram("sqlite_statement_duration_seconds", "Time spent in cursor.execute/executemany.",
+                        ("op", "table"), FAST_BUCKETS)
+SQL_ROWS = Counter("sqlite_rows_total", "Rows changed by, or fetched from, statements.", ("op", "table"))
+TEMPLATE_SECONDS = Histogram("template_render_duration_seconds", "Time to render a Jinja template.",
+                             ("template",), FAST_BUCKETS)
+PHOTO_SECONDS = Histogram("photo_save_duration_seconds", "Time to hash and store an uploaded photo.",
+                          (), FAST_BUCKETS)
+
+
+# === SQL timing ===
+_TABLE_RE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE(?:\s+IF\s+NOT\s+EXISTS)?|ON)\s+[\"']?(\w+)", re.I)
+
+
+@lru_cache(maxsize=STATEMENT_LABELS)
+def _statement_labels(sql):
+    # (op, table) per SQL string; bounded, since some paths build SQL (IN lists, filters) on the fly
+    words = sql.split(None, 1)
+    table = _TABLE_RE.search(sql)
+    return (words[0].upper() if words else ""), table.group(1) if table else ""
+
+
+def _record(sql, elapsed, rows):
+    labels = _statement_labels(sql)
+    SQL_SECONDS.observe(elapsed, labels)
+    if rows > 0:
+        SQL_ROWS.inc(labels, rows)
+    _add_time("db", elapsed)
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        log.warning("slow query (%.1f ms, %d rows): %s", elapsed * 1000, max(rows, 0), " ".join(sql.split()))
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._sql = sql
+            _record(sql, time.perf_counter() - t0, self.rowcount)
+
+    def executemany(self, sql, seq_of_parameters):
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._sql = sql
+            _record(sql, time.perf_counter() - t0, self.rowcount)
+
+    def _fetched(self, rows, t0):
+        # SELECT work that happens after the first row: counted in rows and the request total
+        _add_time("db", time.perf_counter() - t0)
+        if rows:
+            SQL_ROWS.inc(_statement_labels(getattr(self, "_sql", "")), rows)
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(row is not None, t0)
+        return row
+
+    def fetchmany(self, size=None):
+        t0 = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(len(rows), t0)
+        return rows
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(len(rows), t0)
+        return rows
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection whose statements all go through TimedCursor."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def _add_time(key, elapsed):
+    # per-request totals for the Server-Timing header
+    if has_app_context():
+        timings = g.setdefault("_timings", {})
+        timings[key] = timings.get(key, 0.0) + elapsed
+
+
+class timed:
+    """`with timed(PHOTO_SECONDS, key="photo"):` -- observe the block's duration
+    (and add it to the request's Server-Timing under `key`)."""
+
+    def __init__(self, histogram, labels=(), key=None):
+        self.histogram, self.labels, self.key = histogram, labels, key
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.t0
+        self.histogram.observe(elapsed, self.labels)
+        if self.key:
+            _add_time(self.key, elapsed)
+
+
+# === Flask wiring ===
+def _before_render(app, template, context, **extra):
+    g.setdefault("_template_starts", []).append(time.perf_counter())
+
+
+def _rendered(app, template, context, **extra):
+    starts = g.get("_template_starts")
+    if starts:
+        elapsed = time.perf_counter() - starts.pop()
+        TEMPLATE_SECONDS.observe(elapsed, (template.name or "<string>",))
+        _add_time("tpl", elapsed)
+
+
+def is_admin(app):
+    token = app.config.get("ADMIN_TOKEN")
+    given = request.headers.get("X-Admin-Token", "")
+    if not given and request.authorization and request.authorization.type == "bearer":
+        given = request.authorization.token or ""
+    return bool(token) and hmac.compare_digest(given.encode(), token.encode())
+
+
+def init_metrics(app):
+    app.config.setdefault("ADMIN_TOKEN", os.environ.get("ADMIN_TOKEN"))
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+
+    @app.before_request
+    def start_timer():
+        g._request_start = time.perf_counter()
+        if request.args.get("profile") == "1" and (request.endpoint or "").rsplit(".", 1)[-1] in PROFILED_ENDPOINTS:
+            if not is_admin(app):
+                abort(403)
+            g._profiler = cProfile.Profile()
+            g._profiler.enable()
+
+    @app.after_request
+    def stop_timer(response):
+        profiler = g.pop("_profiler", None)
+        if profiler is not None:
+            # streamed bodies (the CSV) do their work while being read, so read it here
+            for _ in response.iter_encoded():
+                pass
+            profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_LINES)
+            response = Response(out.getvalue(), mimetype="text/plain")
+        start = g.get("_request_start")
+        if start is None:
+            return response
+        total = time.perf_counter() - start
+        REQUEST_SECONDS.observe(total, (request.endpoint or "", request.method, str(response.status_code)))
+        timings = dict(g.get("_timings", {}), total=total)
+        response.headers["Server-Timing"] = ", ".join(f"{name};dur={s * 1000:.1f}" for name, s in timings.items())
+        return response
+
+    app.add_url_rule("/metrics", "metrics", metrics_response)
+
+
+def metrics_response():
+    if not is_admin(current_app):
+        abort(403)
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.exposition())
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,430 @@
+"""Numbered schema migrations, recorded in the schema_version table.
+
+    python migrations.py status farmers.db
+    python migrations.py upgrade agrosmart.db [version]
+    python migrations.py import farmers.db path/to/database.db
+
+farmers.db, agrosmart.db and the database.db of the original farmers_data
+app all converge on one `farmers` shape, and `import` copies farmers from
+any of them into another database.
+
+Adding a column is a schema-only change in SQLite. Anything that has to
+touch every row (a new index on a big table) goes through rebuild_table():
+a shadow copy kept in sync by triggers is filled in short batches and then
+swapped in with one quick transaction, so writers wait at most one batch.
+Upgrade a large database with the CLI before deploying; app startup only
+applies whatever is still pending.
+"""
+import fcntl, re, sqlite3, sys, time
+from contextlib import contextmanager, nullcontext
+from db import pooled, add_column, run_batches
+from pagination import FARMER_INDEXES
+from search import PHONE_NORM_SQL, install_search
+from stats import install_rollups
+from locations import canonical_rows
+from sync import SYNC_COLUMNS, SYNC_INDEXES, install_sync
+from write_queue import install_write_queue
+from dedup import DEDUP_INDEXES, NAME_KEY_SQL, install_dedup
+
+BATCH_SIZE = 5000
+
+SCHEMA_VERSION_SQL = """CREATE TABLE IF NOT EXISTS schema_version(
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+)"""
+
+# older seasons moved out to read-only files (see archive.py)
+ARCHIVES_SQL = """CREATE TABLE IF NOT EXISTS archives(
+    file TEXT PRIMARY KEY,
+    season INTEGER NOT NULL,
+    rows INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'moving',
+    compressed INTEGER NOT NULL DEFAULT 0,
+    moved INTEGER NOT NULL DEFAULT 0,
+    archived_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+)"""
+
+
+def farmers_schema(table="farmers"):
+    return f"""CREATE TABLE IF NOT EXISTS {table}(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    state TEXT,
+    lga TEXT,
+    crop TEXT,
+    phone TEXT,
+    photo_path TEXT,
+    rainfall REAL DEFAULT 0,
+    flood_risk TEXT DEFAULT 'Low',
+    farm_size REAL,
+    yield_amount REAL,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    client_uuid TEXT,
+    change_seq INTEGER,
+    phone_norm TEXT GENERATED ALWAYS AS ({PHONE_NORM_SQL}) VIRTUAL,
+    name_key TEXT GENERATED ALWAYS AS ({NAME_KEY_SQL}) VIRTUAL
+)"""
+
+
+# columns either app (or the farmers_data app) may be missing
+FARMER_COLUMNS = (
+    ("phone", "TEXT"),
+    ("photo_path", "TEXT"),
+    ("rainfall", "REAL DEFAULT 0"),
+    ("flood_risk", "TEXT DEFAULT 'Low'"),
+    ("farm_size", "REAL"),
+    ("yield_amount", "REAL"),
+    ("created_at", "TEXT"),
+    ("phone_norm", f"TEXT GENERATED ALWAYS AS ({PHONE_NORM_SQL}) VIRTUAL"),
+)
+
+ALL_FARMER_INDEXES = FARMER_INDEXES + (
+    "CREATE INDEX IF NOT EXISTS idx_farmers_created_at ON farmers(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_farmers_phone_norm ON farmers(phone_norm)",
+)
+
+# (version, name, fn, atomic); atomic migrations run in one write transaction
+# together with their schema_version row, the others manage their own.
+MIGRATIONS = []
+
+
+def migration(version, name, atomic=True):
+    def register(fn):
+        MIGRATIONS.append((version, name, fn, atomic))
+        return fn
+    return register
+
+
+@migration(1, "farmers table")
+def _farmers_table(conn):
+    conn.execute(farmers_schema())
+
+
+@migration(2, "unified farmer columns")
+def _farmer_columns(conn):
+    for column, decl in FARMER_COLUMNS:
+        add_column(conn, "farmers", column, decl)
+
+
+@migration(3, "farmer indexes", atomic=False)
+def _farmer_indexes(conn):
+    ensure_indexes(conn, "farmers", ALL_FARMER_INDEXES, farmers_schema)
+
+
+@migration(4, "farmer count rollups", atomic=False)
+def _rollups(conn):
+    install_rollups(conn)
+
+
+@migration(5, "farmer search", atomic=False)
+def _search(conn):
+    install_search(conn)
+
+
+@migration(6, "sync columns")
+def _sync_columns(conn):
+    for column, decl in SYNC_COLUMNS:
+        add_column(conn, "farmers", column, decl)
+
+
+@migration(7, "sync indexes", atomic=False)
+def _sync_indexes(conn):
+    ensure_indexes(conn, "farmers", SYNC_INDEXES, farmers_schema)
+
+
+@migration(8, "sync change sequence", atomic=False)
+def _sync_sequence(conn):
+    install_sync(conn)
+
+
+@migration(9, "write queue offsets")
+def _write_queue(conn):
+    install_write_queue(conn)
+
+
+@migration(10, "duplicate name key")
+def _dedup_key(conn):
+    add_column(conn, "farmers", "name_key", f"TEXT GENERATED ALWAYS AS ({NAME_KEY_SQL}) VIRTUAL")
+    install_dedup(conn)
+
+
+@migration(11, "duplicate key index", atomic=False)
+def _dedup_index(conn):
+    ensure_indexes(conn, "farmers", DEDUP_INDEXES, farmers_schema)
+
+
+@migration(12, "season archives")
+def _archives(conn):
+    conn.execute(ARCHIVES_SQL)
+
+
+def current_version(conn):
+    conn.execute(SCHEMA_VERSION_SQL)
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def pending(conn, target=None):
+    version = current_version(conn)
+    return [m for m in sorted(MIGRATIONS, key=lambda m: m[0])
+            if m[0] > version and (target is None or m[0] <= target)]
+
+
+def migrate(conn, target=None, log=None):
+    """Apply pending migrations in order; returns the versions applied.
+
+    Safe to run from several workers at once: each version is re-checked
+    under the write lock before it is applied or recorded, and the
+    non-atomic ones (which commit as they go, see rebuild_table) run one
+    worker at a time behind an flock on <db>.migrate.lock.
+    """
+    applied = []
+    for version, name, fn, atomic in pending(conn, target):
+        if log:
+            log(f"applying {version}: {name}")
+        with nullcontext() if atomic else _migration_lock(conn):
+            if not atomic:
+                if current_version(conn) >= version:  # applied while we waited for the lock
+                    continue
+                fn(conn)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if current_version(conn) >= version:
+                    conn.rollback()
+                    continue
+                if atomic:
+                    fn(conn)
+                conn.execute("INSERT INTO schema_version(version, name) VALUES(?, ?)", (version, name))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        applied.append(version)
+    return applied
+
+
+@contextmanager
+def _migration_lock(conn):
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    if not path:  # in-memory database: nobody else can see it
+        yield
+        return
+    with open(path + ".migrate.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)  # released when the file is closed
+        yield
+
+
+# === Online table rebuilds ===
+def _index_name(sql):
+    return re.search(r"INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", sql, re.I).group(1)
+
+
+def _stored_columns(conn, table):
+    # table_xinfo hidden: 0 = normal, 2/3 = generated (computed, never copied)
+    return [r[1] for r in conn.execute(f"PRAGMA table_xinfo({table})") if r[6] == 0]
+
+
+def _exists(conn, type_, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = ? AND name = ?", (type_, name)).fetchone()
+
+
+def ensure_indexes(conn, table, indexes, schema, batch_size=BATCH_SIZE):
+    """Create the missing `indexes` on `table`; big tables are rebuilt online."""
+    existing = {r[1] for r in conn.execute(f"PRAGMA index_list({table})")}
+    missing = [sql for sql in indexes if _index_name(sql) not in existing]
+    if not missing:
+        return False
+    if conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0] <= batch_size:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sql in missing:
+                conn.execute(sql)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return True
+    return rebuild_table(conn, table, schema, indexes, batch_size)
+
+
+def rebuild_table(conn, table, schema, indexes=(), batch_size=BATCH_SIZE, progress=None):
+    """Rebuild `table` as schema(<shadow name>) plus `indexes`, without a long write lock.
+
+    1. The shadow table and triggers copying every insert/update/delete on
+       `table` into it are created in one short transaction.
+    2. Existing rows are copied by id range, batch_size ids per transaction,
+       pausing between batches; INSERT OR IGNORE keeps any newer version a
+       trigger already wrote.
+    3. One transaction drops `table`, renames the shadow and recreates the
+       other triggers that were on `table` (rollups, search).
+
+    Index names are kept, so an index the old table already has under one
+    of those names is dropped when the copy starts. An interrupted rebuild
+    resumes from step 1; the copy is idempotent.
+    """
+    shadow = f"{table}_rebuild"
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if not _exists(conn, "table", shadow):
+            conn.execute(schema(shadow))
+        columns = _stored_columns(conn, table)
+        lost = set(columns) - set(_stored_columns(conn, shadow))
+        if lost:
+            raise ValueError(f"rebuilding {table} would drop columns: {', '.join(sorted(lost))}")
+        # the table's other indexes move over too
+        wanted = {_index_name(sql) for sql in indexes}
+        indexes = list(indexes) + [sql for name, sql in conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (table,)) if name not in wanted]
+        for sql in indexes:
+            name = _index_name(sql)
+            owner = conn.execute("SELECT tbl_name FROM sqlite_master WHERE type = 'index' AND name = ?",
+                                 (name,)).fetchone()
+            if owner and owner[0] == shadow:
+                continue
+            if owner:
+                conn.execute(f"DROP INDEX {name}")
+            conn.execute(re.sub(rf"\bON\s+{table}\s*\(", f"ON {shadow}(", sql, flags=re.I))
+        cols = ", ".join(columns)
+        new = ", ".join("NEW." + c for c in columns)
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {shadow}_insert AFTER INSERT ON {table} BEGIN "
+                     f"INSERT OR REPLACE INTO {shadow}({cols}) VALUES ({new}); END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {shadow}_update AFTER UPDATE ON {table} BEGIN "
+                     f"DELETE FROM {shadow} WHERE id = OLD.id; "
+                     f"INSERT OR REPLACE INTO {shadow}({cols}) VALUES ({new}); END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {shadow}_delete AFTER DELETE ON {table} BEGIN "
+                     f"DELETE FROM {shadow} WHERE id = OLD.id; END")
+        last = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    # rows inserted after `last` reach the shadow through the insert trigger
+    copy = f"INSERT OR IGNORE INTO {shadow}({cols}) SELECT {cols} FROM {table} WHERE id > ? AND id <= ?"
+    starts = iter(range(0, last, batch_size))
+
+    def copy_batch(conn):
+        start = next(starts, None)
+        if start is None:
+            return None
+        conn.execute(copy, (start, start + batch_size))
+        return min(start + batch_size, last), last
+
+    run_batches(conn, copy_batch, progress)
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if not _exists(conn, "table", shadow):  # another process finished first
+            conn.rollback()
+            return False
+        triggers = [sql for name, sql in conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (table,))
+            if not name.startswith(shadow)]
+        seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {shadow} RENAME TO {table}")
+        for sql in triggers:
+            conn.execute(sql)
+        if seq:  # AUTOINCREMENT must never hand out an id the old table used
+            conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (seq[0], table))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return True
+
+
+# === Copying farmers between databases ===
+def _location_resolver():
+    rows, _ = canonical_rows()
+    states = {s.lower(): s for s, _ in rows}
+    lgas = {}
+    for state, lga in rows:
+        lgas.setdefault(lga.lower(), []).append((state, lga))
+
+    def resolve(text):
+        """'Dala, Kano' / 'Kano State' / 'Dala' -> (state, lga); unknown text stays in lga."""
+        parts = [p.strip() for p in (text or "").split(",") if p.strip()]
+        state = next((states[p.lower().removesuffix(" state")] for p in parts
+                      if p.lower().removesuffix(" state") in states), None)
+        for p in parts:
+            matches = [m for m in lgas.get(p.lower(), ()) if state in (None, m[0])]
+            if len(matches) == 1:
+                return matches[0]
+        rest = [p for p in parts if p.lower().removesuffix(" state") != (state or "").lower()]
+        return state, ", ".join(rest) or None
+    return resolve
+
+
+def _source_query(src, dest_columns):
+    """(select sql, column names, row mapper) for the farmers table of `src`."""
+    tables = {r[0] for r in src.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if "farmers" in tables:
+        columns = [c for c in _stored_columns(src, "farmers")
+                   if c not in ("id", "change_seq") and c in dest_columns]
+        return f"SELECT id, {', '.join(columns)} FROM farmers", columns, lambda row: row[1:]
+    if "farmers_data" in tables:
+        # the original farmers_data app: free-text location, crop_type, date_recorded
+        resolve = _location_resolver()
+        columns = ["name", "phone", "state", "lga", "crop", "farm_size", "yield_amount", "created_at"]
+        return ("SELECT id, name, phone, location, crop_type, farm_size, yield_amount, date_recorded "
+                "FROM farmers_data", columns,
+                lambda r: (r[1], r[2]) + resolve(r[3]) + (r[4], r[5], r[6], r[7]))
+    raise ValueError("no farmers or farmers_data table in the source database")
+
+
+def import_farmers(conn, source_path, batch_size=BATCH_SIZE, progress=None):
+    """Append every farmer in another database to this one (new ids); returns how many were added."""
+    src = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+    try:
+        select, columns, convert = _source_query(src, set(_stored_columns(conn, "farmers")))
+        # rows that came from this database before (same client_uuid) are skipped
+        insert = (f"INSERT INTO farmers({', '.join(columns)}) "
+                  f"VALUES ({', '.join('?' * len(columns))}) ON CONFLICT DO NOTHING")
+        copied, seen, last = 0, 0, 0
+        while True:
+            rows = src.execute(select + " WHERE id > ? ORDER BY id LIMIT ?", (last, batch_size)).fetchall()
+            if not rows:
+                return copied
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                copied += conn.executemany(insert, map(convert, rows)).rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            seen += len(rows)
+            last = rows[-1][0]
+            if progress:
+                progress(seen, None)
+    finally:
+        src.close()
+
+
+def _progress(done, total):
+    print(f"  {done}/{total} rows" if total else f"  {done} rows", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    usage = ("usage: python migrations.py status <database>\n"
+             "       python migrations.py upgrade <database> [version]\n"
+             "       python migrations.py import <database> <source database>")
+    if len(sys.argv) < 3 or sys.argv[1] not in ("status", "upgrade", "import"):
+        sys.exit(usage)
+    command, database = sys.argv[1:3]
+    with pooled(database) as conn:
+        if command == "status":
+            print(f"schema version {current_version(conn)}")
+            for version, name, _, _ in pending(conn):
+                print(f"pending {version}: {name}")
+        elif command == "upgrade":
+            t0 = time.perf_counter()
+            target = int(sys.argv[3]) if len(sys.argv) > 3 else None
+            migrate(conn, target, log=print)
+            print(f"schema version {current_version(conn)} ({time.perf_counter() - t0:.1f}s)")
+        else:
+            if len(sys.argv) != 4:
+                sys.exit(usage)
+            migrate(conn, log=print)
+            print(f"imported {import_farmers(conn, sys.argv[3], progress=_progress)} farmers")
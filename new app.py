@@ -1,176 +1,100 @@
-from flask import Flask, render_template_string, request, redirect, url_for, jsonify, send_file
-import sqlite3, csv, random, os
+from flask import Flask, Blueprint, current_app, request, redirect, url_for, jsonify
+import random, os
+from db import get_db, pooled, close_db
+from export import export_query, csv_response
+from columnar import parquet_response, snapshot_response
+from stats import read_rollup
+from indicators import engine as indicators
+from bulk_import import detect_format, import_upload
+from locations import get_locations, locations_response, seed_locations
+from geo import get_geo_index, locate_response
+from rendering import compile_templates, render, RenderCache
+from search import search_response
+from migrations import migrate
+from sync import push_records, pull_response
+from metrics import init_metrics
+from write_queue import init_write_queue, register, registration_response, registration_status
+from asgi import ASGIApp
+from i18n import CATALOG_DIR, load_catalogs
+from dedup import find_duplicates
+from archive import close_history, season_source, season_stats
 
-app = Flask(__name__)
 DB_FILE = "agrosmart.db"
+DEFAULT_LANG = "en"   # ?lang= picks another; strings in translations/ (see i18n.py)
+bp = Blueprint("agrosmart", __name__)
 
 # ==============================
 # WEATHER & FLOOD SIMULATION
 # ==============================
-def get_weather_indicator():
-    weather_data = [
-        {"condition": "Sunny", "seed": "Maize", "risk": "Low"},
-        {"condition": "Rainy", "seed": "Rice", "risk": "Medium"},
-        {"condition": "Heavy Rain", "seed": "Sugarcane", "risk": "High"},
-        {"condition": "Dry", "seed": "Millet", "risk": "Low"},
-        {"condition": "Cloudy", "seed": "Cassava", "risk": "Medium"}
-    ]
-    return random.choice(weather_data)
+def get_weather_indicator(state="", lga=""):
+    return indicators.indicator(state, lga)
 
 # ==============================
 # DATABASE INITIALIZATION
 # ==============================
-def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
+def init_db(path=DB_FILE):
+    with pooled(path) as conn:
+        # farmers table, indexes, rollups and search index (see migrations.py)
+        migrate(conn)
 
-    c.execute("""CREATE TABLE IF NOT EXISTS states(
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT UNIQUE NOT NULL
-    )""")
-
-    c.execute("""CREATE TABLE IF NOT EXISTS lgas(
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        state_id INTEGER NOT NULL,
-        FOREIGN KEY(state_id) REFERENCES states(id)
-    )""")
-
-    c.execute("""CREATE TABLE IF NOT EXISTS farmers(
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        state TEXT,
-        lga TEXT,
-        crop TEXT,
-        rainfall REAL DEFAULT 0,
-        flood_risk TEXT DEFAULT 'Low'
-    )""")
-
-    conn.commit()
-
-    # Example data: replace later with all 36 states + LGAs
-    c.execute("SELECT COUNT(*) FROM states")
-    if c.fetchone()[0] == 0:
-        states_lgas = [
-    {"state":"Abia","lgas":["Aba North","Aba South","Arochukwu","Bende","Ikwuano","Isiala Ngwa North","Isiala Ngwa South","Isuikwuato","Obi Ngwa","Ohafia","Osisioma","Umuahia North","Umuahia South","Umu Nneochi"]},
-    {"state":"Adamawa","lgas":["Demsa","Fufure","Ganye","Girei","Gombi","Guyuk","Hong","Jada","Lamurde","Madagali","Maiha","Mayo Belwa","Michika","Mubi North","Mubi South","Numan","Shelleng","Song","Toungo","Yola North","Yola South"]},
-    {"state":"Akwa Ibom","lgas":["Abak","Eastern Obolo","Eket","Esit Eket","Essien Udim","Etim Ekpo","Etinan","Ibeno","Ibesikpo Asutan","Ibiono Ibom","Ikono","Ikot Abasi","Ikot Ekpene","Ini","Itu","Mbo","Mkpat Enin","Nsit Atai","Nsit Ibom","Nsit Ubium","Obot Akara","Okobo","Onna","Oron","Oruk Anam","Udung Uko","Ukanafun","Uruan","Urue-Offong/Oruko","Uyo"]},
-    {"state":"Anambra","lgas":["Aguata","Anambra East","Anambra West","Anaocha","Awka North","Awka South","Ayamelum","Dunukofia","Ekwusigo","Idemili North","Idemili South","Ihiala","Njikoka","Nnewi North","Nnewi South","Ogbaru","Onitsha North","Onitsha South","Orumba North","Orumba South","Oyi"]},
-    {"state":"Bauchi","lgas":["Bauchi","Bogoro","Damban","Darazo","Dass","Gamawa","Ganjuwa","Giade","Itas/Gadau","Jama’are","Katagum","Kirfi","Misau","Ningi","Shira","Tafawa Balewa","Toro","Warji","Zaki"]},
-    {"state":"Bayelsa","lgas":["Brass","Ekeremor","Kolokuma/Opokuma","Nembe","Ogbia","Sagbama","Southern Ijaw","Yenagoa"]},
-    {"state":"Benue","lgas":["Ado","Agatu","Apa","Buruku","Gboko","Guma","Gwer East","Gwer West","Katsina-Ala","Konshisha","Kwande","Logo","Makurdi","Obi","Ogbadibo","Ohimini","Oju","Okpokwu","Otukpo","Tarka","Ukum","Vandeikya"]},
-    {"state":"Borno","lgas":["Abadam","Askira/Uba","Bama","Bayo","Biu","Chibok","Damboa","Dikwa","Gubio","Guzamala","Gwoza","Hawul","Jere","Kaga","Kala/Balge","Konduga","Kukawa","Kwaya Kusar","Mafa","Magumeri","Maiduguri","Marte","Mobbar","Monguno","Ngala","Nganzai","Shani"]},
-    {"state":"Cross River","lgas":["Akpabuyo","Odukpani","Akamkpa","Biase","Abi","Ikom","Obanliku","Obubra","Obudu","Ogoja","Yala","Bekwara","Bakassi","Calabar Municipal","Calabar South","Etung","Boki","Tarkwa Bay"]},
-    {"state":"Delta","lgas":["Oshimili North","Oshimili South","Aniocha North","Aniocha South","Ika North East","Ika South","Ndokwa East","Ndokwa West","Isoko North","Isoko South","Okpe","Oshimili South","Sapele","Udu","Ughelli North","Ughelli South","Uvwie","Warri North","Warri South","Warri South West"]},
-    {"state":"Ebonyi","lgas":["Abakaliki","Afikpo North","Afikpo South","Ebonyi","Ezza North","Ezza South","Ikwo","Ishielu","Ivo","Izzi","Ohaozara","Ohaukwu","Onicha"]},
-    {"state":"Edo","lgas":["Akoko-Edo","Egor","Esan Central","Esan North-East","Esan South-East","Esan West","Etsako Central","Etsako East","Etsako West","Igueben","Ikpoba-Okha","Oredo","Orhionmwon","Ovia North-East","Ovia South-West","Owan East","Owan West","Uhunmwonde"]},
-    {"state":"Ekiti","lgas":["Ado","Efon","Ekiti East","Ekiti South-West","Ekiti West","Emure","Gbonyin","Ido-Osi","Ijero","Ikere","Ikole","Ilejemeje","Irepodun/Ifelodun","Ise/Orun","Moba","Oye"]},
-    {"state":"Enugu","lgas":["Enugu East","Enugu North","Enugu South","Ezeagu","Igbo Etiti","Igbo Eze North","Igbo Eze South","Isi Uzo","Nkanu East","Nkanu West","Nsukka","Oji River","Udenu","Udi","Uzo Uwani"]},
-    {"state":"Gombe","lgas":["Akko","Balanga","Billiri","Dukku","Funakaye","Gombe","Kaltungo","Kwami","Nafada/Bajoga","Shongom","Yamaltu/Deba"]},
-    {"state":"Imo","lgas":["Aboh Mbaise","Ahiazu Mbaise","Ehime Mbano","Ezinihitte","Ideato North","Ideato South","Ihitte/Uboma","Ikeduru","Isiala Mbano","Isu","Mbaitoli","Ngor Okpala","Njaba","Nkwerre","Nwangele","Obowo","Oguta","Ohaji/Egbema","Okigwe","Orlu","Orsu","Oru East","Oru West","Owerri Municipal","Owerri North","Owerri West"]},
-    {"state":"Jigawa","lgas":["Auyo","Babura","Biriniwa","Birnin Kudu","Buji","Dutse","Gagarawa","Garki","Gumel","Guri","Gwaram","Gwiwa","Hadejia","Jahun","Kafin Hausa","Kaugama","Kazaure","Kiri Kasama","Kiyawa","Maigatari","Malam Madori","Miga","Ringim","Roni","Sule Tankarkar","Taura","Yankwashi"]},
-    {"state":"Kaduna","lgas":["Birnin Gwari","Chikun","Giwa","Igabi","Ikara","Jaba","Jema’a","Kachia","Kaduna North","Kaduna South","Kagarko","Kajuru","Kaura","Kauru","Kubau","Kudan","Lere","Makarfi","Sabon Gari","Sanga","Soba","Zangon Kataf","Zaria"]},
-    {"state":"Kano","lgas":["Ajingi","Albasu","Bagwai","Bebeji","Bichi","Bunkure","Dala","Dambatta","Dawakin Kudu","Dawakin Tofa","Doguwa","Fagge","Gabasawa","Garko","Garun Mallam","Gaya","Gezawa","Gwale","Gwarzo","Kabo","Kano Municipal","Karaye","Kibiya","Kiru","Kumbotso","Kunchi","Kura","Madobi","Makoda","Minjibir","Nasarawa","Rano","Rimin Gado","Rogo","Shanono","Sumaila","Takai","Tarauni","Tofa","Tsanyawa","Tudun Wada","Ungogo","Warawa","Wudil"]},
-    {"state":"Katsina","lgas":["Bakori","Batagarawa","Batsari","Baure","Bindawa","Charanchi","Dandume","Danja","Dan Musa","Daura","Dutsi","Dutsin Ma","Faskari","Funtua","Ingawa","Jibia","Kafur","Kaita","Kankara","Kankia","Katsina","Kurfi","Kusada","Mai’Adua","Malumfashi","Mani","Mashi","Matazu","Musawa","Rimi","Sabuwa","Safana","Sandamu","Zango"]},
-    {"state":"Kebbi","lgas":["Aleiro","Arewa Dandi","Argungu","Augie","Bagudo","Birnin Kebbi","Bunza","Dandi","Fakai","Gwandu","Jega","Kalgo","Koko/Besse","Maiyama","Ngaski","Sakaba","Shanga","Suru","Wasagu/Danko","Yauri","Zuru"]},
-    {"state":"Kogi","lgas":["Adavi","Ajaokuta","Ankpa","Bassa","Dekina","Ibaji","Idah","Ijumu","Kabba/Bunu","Kogi","Lokoja","Mopa-Muro","Ofu","Ogori/Magongo","Okehi","Okene","Olamaboro","Omala","Yagba East","Yagba West"]},
-    {"state":"Kwara","lgas":["Asa","Baruten","Edu","Ekiti","Ifelodun","Ilorin East","Ilorin South","Ilorin West","Irepodun","Isin","Kaiama","Moro","Offa","Oke Ero","Oyun","Pategi"]},
-    {"state":"Lagos","lgas":["Agege","Ajeromi-Ifelodun","Alimosho","Amuwo-Odofin","Apapa","Badagry","Epe","Eti-Osa","Ibeju-Lekki","Ifako-Ijaiye","Ikeja","Ikorodu","Kosofe","Lagos Island","Lagos Mainland","Mushin","Ojo","Oshodi-Isolo","Shomolu","Surulere"]},
-    {"state":"Nasarawa","lgas":["Akwanga","Awe","Doma","Karu","Keana","Keffi","Kokona","Lafia","Nasarawa","Nasarawa Egon","Obi","Toto","Wamba"]},
-    {"state":"Niger","lgas":["Agaie","Agwara","Bida","Borgu","Bosso","Chanchaga","Edati","Gbako","Gurara","Katcha","Kontagora","Lapai","Lavun","Magama","Mariga","Mashegu","Mokwa","Muya","Paikoro","Rafi","Rijau","Shiroro","Suleja","Tafa","Wushishi"]},
-    {"state":"Ogun","lgas":["Abeokuta North","Abeokuta South","Ado-Odo/Ota","Egbado North","Egbado South","Ewekoro","Ifo","Ijebu East","Ijebu North","Ijebu North East","Ijebu Ode","Ikenne","Imeko Afon","Ipokia","Obafemi-Owode","Odogbolu","Ogun Waterside","Remo North","Shagamu"]},
-    {"state":"Ondo","lgas":["Akoko North-East","Akoko North-West","Akoko South-East","Akoko South-West","Akure North","Akure South","Ese Odo","Idanre","Ifedore","Ilaje","Ile Oluji/Okeigbo","Irele","Odigbo","Okitipupa","Ondo East","Ondo West","Ose","Owo"]},
-    {"state":"Osun","lgas":["Aiyedaade","Aiyedire","Atakumosa East","Atakumosa West","Boluwaduro","Boripe","Ede North","Ede South","Egbedore","Ejigbo","Ife Central","Ife East","Ife North","Ife South","Ifedayo","Ifelodun","Ila","Ilesa East","Ilesa West","Irepodun","Irewole","Isokan","Iwo","Obokun","Odo Otin","Ola Oluwa","Olorunda","Oriade","Orolu","Osogbo"]},
-    {"state":"Oyo","lgas":["Afijio","Akinyele","Atiba","Atisbo","Egbeda","Ibadan North","Ibadan North-East","Ibadan North-West","Ibadan South-East","Ibadan South-West","Ibarapa Central","Ibarapa East","Ibarapa North","Ido","Irepo","Iseyin","Itesiwaju","Iwajowa","Kajola","Lagelu","Ogbomosho North","Ogbomosho South","Ogo Oluwa","Olorunsogo","Oluyole","Ona Ara","Orelope","Ori Ire","Oyo","Oyo East","Saki East","Saki West","Surulere"]},
-    {"state":"Plateau","lgas":["Barkin Ladi","Bassa","Bokkos","Jos East","Jos North","Jos South","Kanam","Kanke","Langtang North","Langtang South","Mangu","Mikang","Pankshin","Qua’an Pan","Riyom","Shendam","Wase"]},
-    {"state":"Rivers","lgas":["Abua/Odual","Ahoada East","Ahoada West","Akuku-Toru","Andoni","Asari-Toru","Bonny","Degema","Eleme","Emohua","Etche","Gokana","Ikwerre","Khana","Obio/Akpor","Ogba/Egbema/Ndoni","Ogu/Bolo","Okrika","Omuma","Opobo/Nkoro","Oyigbo","Port Harcourt","Tai"]},
-    {"state":"Sokoto","lgas":["Binji","Bodinga","Dange Shuni","Gada","Goronyo","Gudu","Gwadabawa","Illela","Isa","Kebbe","Kware","Rabah","Sabon Birni","Shagari","Silame","Sokoto North","Sokoto South","Tambuwal","Tangaza","Tureta","Wamako","Wurno","Yabo"]},
-    {"state":"Taraba","lgas":["Ardo Kola","Bali","Donga","Gashaka","Gassol","Ibi","Jalingo","Karim Lamido","Kumi","Lau","Sardauna","Takum","Ussa","Wukari","Yorro","Zing"]},
-    {"state":"Yobe","lgas":["Bade","Bursari","Damaturu","Fika","Fune","Geidam","Gujba","Gulani","Jakusko","Karasuwa","Machina","Nangere","Nguru","Potiskum","Tarmuwa","Yunusari","Yusufari"]},
-    {"state":"Zamfara","lgas":["Anka","Bakura","Birnin Magaji/Kiyaw","Bukkuyum","Bungudu","Gummi","Gusau","Kaura Namoda","Maradun","Maru","Shinkafi","Talata Mafara","Chafe","Zurmi"]}
-]
-            c.execute("INSERT OR IGNORE INTO states(name) VALUES (?)", (s,))
-            c.execute("SELECT id FROM states WHERE name=?", (s,))
-            sid = c.fetchone()[0]
-            for l in lgas:
-                c.execute("INSERT INTO lgas(name,state_id) VALUES(?,?)", (l, sid))
-        conn.commit()
-    conn.close()
-
-init_db()
+        # all 36 states + FCT, shared with app.py (lga_coords); no-op on warm starts
+        seed_locations(conn)
 
 # ==============================
-# ROUTES
+# TEMPLATES
 # ==============================
-@app.route('/')
-def home():
-    indicator = get_weather_indicator()
-    return render_template_string("""
+home_template = """
     <body style="background:linear-gradient(to bottom right,#a8e063,#56ab2f);font-family:sans-serif;color:#fff;text-align:center;padding:50px;">
-        <h1>🌾 Welcome to AgroSmart</h1>
-        <p>Your intelligent farming assistant.</p>
-        <h3>🌦 Weather: {{indicator.condition}} | 🌱 Recommended Seed: {{indicator.seed}} | 🌊 Flood Risk: {{indicator.risk}}</h3>
+        <h1>🌾 {{strings['agrosmart_welcome']}}</h1>
+        <p>{{strings['agrosmart_tagline']}}</p>
+        <h3>🌦 {{strings['weather_now']}}: {{indicator.condition}} | 🌱 {{strings['recommended_seed']}}: {{indicator.seed}} | 🌊 {{strings['flood_risk']}}: {{indicator.risk}}</h3>
         <div style="margin-top:30px;">
-            <a href="{{url_for('form')}}" style="background:white;color:#2d6a4f;padding:10px 20px;border-radius:10px;text-decoration:none;">Register Farmer</a>
-            <a href="{{url_for('dashboard')}}" style="background:white;color:#2d6a4f;padding:10px 20px;margin-left:10px;border-radius:10px;text-decoration:none;">Dashboard</a>
+            <a href="{{url_for('.form', lang=lang)}}" style="background:white;color:#2d6a4f;padding:10px 20px;border-radius:10px;text-decoration:none;">{{strings['register_farmer']}}</a>
+            <a href="{{url_for('.dashboard', lang=lang)}}" style="background:white;color:#2d6a4f;padding:10px 20px;margin-left:10px;border-radius:10px;text-decoration:none;">{{strings['dashboard']}}</a>
         </div>
+        <p style="margin-top:30px;">{% for code in languages %}{% if not loop.first %} | {% endif %}<a href="{{url_for('.home', lang=code)}}" style="color:#fff;">{{language_names[code]}}</a>{% endfor %}</p>
     </body>
-    """, indicator=indicator)
+    """
 
-# ==============================
-# REGISTER FARMER
-# ==============================
-@app.route('/form', methods=['GET','POST'])
-def form():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT name FROM states ORDER BY name")
-    states = [r[0] for r in c.fetchall()]
-
-    if request.method == "POST":
-        name = request.form['name']
-        state = request.form['state']
-        lga = request.form['lga']
-        crop = request.form['crop']
-        weather = get_weather_indicator()
-        rainfall = random.uniform(10, 100)
-        flood_risk = weather['risk']
-        c.execute("INSERT INTO farmers(name,state,lga,crop,rainfall,flood_risk) VALUES(?,?,?,?,?,?)",
-                  (name, state, lga, crop, rainfall, flood_risk))
-        conn.commit()
-        conn.close()
-        return redirect(url_for('dashboard'))
-    conn.close()
-
-    return render_template_string("""
+form_template = """
     <body style="background:#d4edda;font-family:sans-serif;text-align:center;padding:40px;">
-        <h2>🧑‍🌾 Register Farmer</h2>
+        <h2>🧑‍🌾 {{strings['register_farmer']}}</h2>
         <form method="POST" style="background:white;padding:20px;border-radius:10px;display:inline-block;">
-            <input name="name" placeholder="Full Name" required><br><br>
+            <input name="name" placeholder="{{strings['name']}}" required><br><br>
             <select name="state" id="state" required onchange="fetchLGAs()">
-                <option value="">Select State</option>
+                <option value="">{{strings['select_state']}}</option>
                 {% for s in states %}
                     <option value="{{s}}">{{s}}</option>
                 {% endfor %}
             </select><br><br>
             <select name="lga" id="lga" required>
-                <option value="">Select LGA</option>
+                <option value="">{{strings['select_lga']}}</option>
             </select><br><br>
-            <input name="crop" placeholder="Crop Type" required><br><br>
-            <button type="submit" style="background:#2d6a4f;color:white;padding:10px 20px;border:none;border-radius:8px;">Submit</button>
+            <input name="crop" placeholder="{{strings['crop']}}" required><br><br>
+            <button type="submit" style="background:#2d6a4f;color:white;padding:10px 20px;border:none;border-radius:8px;">{{strings['submit']}}</button>
         </form>
+        {% if duplicates %}
+        <div style="background:#fff3cd;color:#664d03;padding:15px;border-radius:10px;display:inline-block;margin-top:20px;">
+            <p>⚠ {{strings['duplicate']}}</p>
+            {% for d in duplicates %}<p>{{d.name}}, {{d.lga}} ({{d.state}})</p>{% endfor %}
+            <form method="POST">
+                {% for k in ['name', 'state', 'lga', 'crop'] %}<input type="hidden" name="{{k}}" value="{{values[k]}}">{% endfor %}
+                <input type="hidden" name="allow_duplicate" value="1">
+                <button type="submit" style="background:#2d6a4f;color:white;padding:10px 20px;border:none;border-radius:8px;">{{strings['register_anyway']}}</button>
+            </form>
+        </div>
+        {% endif %}
         <br><br>
-        <a href="{{url_for('home')}}">🏠 Back Home</a>
+        <a href="{{url_for('.home', lang=lang)}}">🏠 {{strings['back_home']}}</a>
 
         <script>
+        const locations=fetch('{{url_for('.api_locations', v=version)}}').then(res=>res.json());
         function fetchLGAs(){
             const state=document.getElementById("state").value;
-            fetch('/api/lgas?state='+state)
-            .then(res=>res.json())
-            .then(data=>{
+            return locations.then(data=>{
                 const lgaSelect=document.getElementById("lga");
                 lgaSelect.innerHTML="";
-                data.lgas.forEach(l=>{
+                (data.lgas[state]||[]).forEach(l=>{
                     const opt=document.createElement('option');
                     opt.value=l;
                     opt.text=l;
@@ -178,83 +102,235 @@ def form():
                 });
             })
         }
+        {% if can_locate %}// pre-fill state/LGA from the device's GPS fix
+        if(navigator.geolocation){
+            navigator.geolocation.getCurrentPosition(pos=>{
+                fetch('{{url_for('.api_locate')}}?lat='+pos.coords.latitude+'&lon='+pos.coords.longitude)
+                    .then(res=>res.ok?res.json():null)
+                    .then(found=>{
+                        const stateSelect=document.getElementById("state");
+                        if(!found||stateSelect.value) return;
+                        stateSelect.value=found.state;
+                        fetchLGAs().then(()=>{document.getElementById("lga").value=found.lga;});
+                    });
+            },()=>{},{maximumAge:600000,timeout:10000});
+        }{% endif %}
+        </script>
+    </body>
+    """
+
+dashboard_template = """
+    <body style="background:#d4edda;font-family:sans-serif;text-align:center;padding:30px;">
+        <h2>📊 {{strings['farmers_dashboard']}}</h2>
+        {% if queued %}<p style="color:#2d6a4f;">{{strings['data_queued']}} <a href="{{url_for('.api_registration', registration_id=queued)}}">{{queued}}</a></p>
+        {% elif saved %}<p style="color:#2d6a4f;">{{strings['data_saved']}}</p>{% endif %}
+        <canvas id="chart" width="600" height="300"></canvas>
+        <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+        <script>
+        const ctx=document.getElementById('chart');
+        new Chart(ctx,{type:'bar',data:{labels:{{labels|tojson}},datasets:[{label:{{strings['farmers_per_state']|tojson}},data:{{counts|tojson}},backgroundColor:'rgba(75,192,192,0.6)'}]},options:{scales:{y:{beginAtZero:true}}}});
         </script>
+
+        <h3>{{strings['recent_farmers']}}</h3>
+        <table border="1" cellpadding="6" style="margin:auto;background:white;">
+            <tr><th>{{strings['name']}}</th><th>{{strings['state']}}</th><th>{{strings['lga']}}</th><th>{{strings['crop']}}</th><th>{{strings['flood_risk']}}</th></tr>
+            {% for f in farmers %}
+            <tr><td>{{f[0]}}</td><td>{{f[1]}}</td><td>{{f[2]}}</td><td>{{f[3]}}</td><td>{{f[4]}}</td></tr>
+            {% endfor %}
+        </table>
+
+        <br>
+        <a href="{{url_for('.download_csv')}}" style="color:#2d6a4f;">⬇ {{strings['download_csv']}}</a> |
+        <a href="{{url_for('.home', lang=lang)}}" style="color:#2d6a4f;">🏠 {{strings['back_home']}}</a>
     </body>
-    """, states=states)
+    """
+
+# ==============================
+# APPLICATION FACTORY
+# ==============================
+def create_app(config=None):
+    app = Flask(__name__)
+    app.config.update(DATABASE=DB_FILE, TRANSLATIONS=CATALOG_DIR)
+    app.config.update(config or {})
+    app.teardown_appcontext(close_db)
+    app.teardown_appcontext(close_history)
+    init_metrics(app)
+    init_db(app.config['DATABASE'])
+    init_write_queue(app)
+    catalogs = load_catalogs(app.config['TRANSLATIONS'])
+    # compiled once per app; pages that only depend on language and reference data are cached,
+    # with room for every language's pages
+    app.extensions["agrosmart"] = {
+        "templates": compile_templates(app, home=home_template, form=form_template, dashboard=dashboard_template),
+        "catalogs": catalogs,
+        "page_cache": RenderCache(maxsize=256 + 4 * len(catalogs)),
+    }
+    app.register_blueprint(bp)
+    return app
+
+def db():
+    return get_db(current_app.config['DATABASE'])
+
+def locations():
+    return get_locations(current_app.config['DATABASE'])
+
+def geo():
+    return get_geo_index(current_app.config['DATABASE'])
+
+def templates():
+    return current_app.extensions["agrosmart"]["templates"]
+
+def page_cache():
+    return current_app.extensions["agrosmart"]["page_cache"]
+
+def catalogs():
+    return current_app.extensions["agrosmart"]["catalogs"]
+
+def language():
+    lang = catalogs().resolve(request.args.get('lang'), DEFAULT_LANG)
+    return lang, catalogs().tables[lang]
 
-@app.route('/api/lgas')
+# ==============================
+# ROUTES
+# ==============================
+@bp.route('/')
+def home():
+    indicator = get_weather_indicator()
+    lang, strings = language()
+    key = ("home", lang) + tuple(indicator.values())
+    return page_cache().get(key, lambda: render(templates()["home"], indicator=indicator, lang=lang, strings=strings,
+                                                languages=catalogs().languages, language_names=catalogs().names))
+
+# ==============================
+# REGISTER FARMER
+# ==============================
+@bp.route('/form', methods=['GET','POST'])
+def form():
+    index = locations()
+    lang, strings = language()
+    # no centroids loaded, no point asking for the device's location
+    can_locate = bool(geo())
+
+    if request.method == "POST":
+        name = request.form['name']
+        state = request.form['state']
+        lga = request.form['lga']
+        crop = request.form['crop']
+        # a close name in the same LGA is probably the same farmer (see dedup.py)
+        duplicates = [] if request.form.get('allow_duplicate') else find_duplicates(db(), request.form)
+        if duplicates:
+            return render(templates()["form"], states=index.states, version=index.version, lang=lang, strings=strings,
+                          can_locate=can_locate, duplicates=duplicates, values=request.form)
+        weather = get_weather_indicator(state, lga)
+        rainfall = random.uniform(10, 100)
+        flood_risk = weather['risk']
+        # queued for the single writer (see write_queue.py)
+        registration_id, farmer_id = register(
+            current_app.config['DATABASE'],
+            {"name": name, "state": state, "lga": lga, "crop": crop, "rainfall": rainfall, "flood_risk": flood_risk},
+            current_app.config['WRITE_QUEUE'])
+        # the dashboard says "saved" only for an inline insert; a queued one gets its status link
+        if farmer_id is None:
+            return redirect(url_for('.dashboard', lang=lang, queued=registration_id))
+        return redirect(url_for('.dashboard', lang=lang, saved=1))
+
+    return page_cache().get(("form", lang, index.version, can_locate),
+                            lambda: render(templates()["form"], states=index.states, version=index.version,
+                                           lang=lang, strings=strings, can_locate=can_locate))
+
+@bp.route('/api/lgas')
 def api_lgas():
     state = request.args.get('state')
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT id FROM states WHERE name=?",(state,))
-    row = c.fetchone()
-    if not row:
-        return jsonify({"lgas":[]})
-    sid = row[0]
-    c.execute("SELECT name FROM lgas WHERE state_id=?",(sid,))
-    lgas = [r[0] for r in c.fetchall()]
-    conn.close()
-    return jsonify({"lgas":lgas})
+    lgas = locations().lgas_for(state)
+    return jsonify({"lgas":list(lgas)})
+
+@bp.route('/api/locations')
+def api_locations():
+    return locations_response(locations())
+
+# device GPS fix -> nearest state/LGA, used to pre-fill the form (see geo.py)
+@bp.route('/api/locate')
+def api_locate():
+    return jsonify(locate_response(geo(), request.args))
 
 # ==============================
 # DASHBOARD
 # ==============================
-@app.route('/dashboard')
+@bp.route('/dashboard')
 def dashboard():
-    conn = sqlite3.connect(DB_FILE)
+    conn = db()
     c = conn.cursor()
-    c.execute("SELECT state, COUNT(*) FROM farmers GROUP BY state")
-    data = c.fetchall()
+    data = read_rollup(conn, "state")
     c.execute("SELECT name,state,lga,crop,flood_risk FROM farmers ORDER BY id DESC LIMIT 20")
     farmers = c.fetchall()
-    conn.close()
 
     labels = [d[0] for d in data]
     counts = [d[1] for d in data]
 
-    return render_template_string("""
-    <body style="background:#d4edda;font-family:sans-serif;text-align:center;padding:30px;">
-        <h2>📊 Farmers Dashboard</h2>
-        <canvas id="chart" width="600" height="300"></canvas>
-        <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-        <script>
-        const ctx=document.getElementById('chart');
-        new Chart(ctx,{type:'bar',data:{labels:{{labels|tojson}},datasets:[{label:'Farmers per State',data:{{counts|tojson}},backgroundColor:'rgba(75,192,192,0.6)'}]},options:{scales:{y:{beginAtZero:true}}}});
-        </script>
+    lang, strings = language()
+    return render(templates()["dashboard"], labels=labels, counts=counts, farmers=farmers, lang=lang, strings=strings,
+                  queued=request.args.get('queued'), saved=request.args.get('saved'))
 
-        <h3>Recent Farmers</h3>
-        <table border="1" cellpadding="6" style="margin:auto;background:white;">
-            <tr><th>Name</th><th>State</th><th>LGA</th><th>Crop</th><th>Flood Risk</th></tr>
-            {% for f in farmers %}
-            <tr><td>{{f[0]}}</td><td>{{f[1]}}</td><td>{{f[2]}}</td><td>{{f[3]}}</td><td>{{f[4]}}</td></tr>
-            {% endfor %}
-        </table>
+@bp.route('/api/search')
+def api_search():
+    return jsonify(search_response(db(), request.args, ["name", "state", "lga", "crop", "flood_risk"]))
 
-        <br>
-        <a href="{{url_for('download_csv')}}" style="color:#2d6a4f;">⬇ Download CSV</a> |
-        <a href="{{url_for('home')}}" style="color:#2d6a4f;">🏠 Back Home</a>
-    </body>
-    """, labels=labels, counts=counts, farmers=farmers)
+@bp.route('/api/import', methods=['POST'])
+def api_import():
+    # multipart "file" field, or the raw CSV/JSONL body
+    upload = request.files.get('file')
+    if upload:
+        stream, fmt = upload.stream, detect_format(upload.filename, upload.mimetype)
+    else:
+        stream, fmt = request.stream, detect_format(mimetype=request.mimetype)
+    report = import_upload(db(), stream, request.args.get('format', fmt), locations(), geo=geo())
+    return jsonify(report)
+
+# offline tablets: one gzip'd JSONL batch up, compact deltas down (see sync.py)
+@bp.route('/api/sync/push', methods=['POST'])
+def api_sync_push():
+    return jsonify(push_records(db(), locations()))
+
+@bp.route('/api/sync/pull')
+def api_sync_pull():
+    return pull_response(db(), ["name", "state", "lga", "crop", "rainfall", "flood_risk", "created_at"])
+
+@bp.route('/api/registrations', methods=['POST'])
+def api_register():
+    return registration_response(db(), current_app.config['DATABASE'], locations(), current_app.config['WRITE_QUEUE'])
+
+@bp.route('/api/registrations/<registration_id>')
+def api_registration(registration_id):
+    return jsonify(registration_status(db(), current_app.config['DATABASE'], registration_id))
+
+# ?season=2024 or all adds archived seasons (see archive.py); without it only the hot table is read
+@bp.route('/api/stats')
+def api_stats():
+    return jsonify(season_stats(db(), current_app.config['DATABASE'], request.args))
 
 # ==============================
 # CSV DOWNLOAD
 # ==============================
-@app.route('/download')
+@bp.route('/download')
 def download_csv():
-    filename = "farmers_export.csv"
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT * FROM farmers")
-    rows = c.fetchall()
-    headers = [desc[0] for desc in c.description]
-    conn.close()
-
-    with open(filename,'w',newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(headers)
-        writer.writerows(rows)
-    return send_file(filename, as_attachment=True)
+    columns = ["id", "name", "state", "lga", "crop", "rainfall", "flood_risk", "created_at"]
+    # ?season= reads that season, archives included (see archive.py); otherwise the hot table.
+    # Rows come in short keyset pages, so a slow download never pins a connection (see export.py)
+    table, rows, created = season_source(current_app.config['DATABASE'], request.args)
+    sql, params = export_query(table, columns, request.args, created)
+    if request.args.get('format') == 'parquet':
+        return parquet_response(rows, sql, params, columns, "farmers_export.parquet")
+    return csv_response(rows, sql, params, columns, "farmers_export.csv",
+                        gzip=request.args.get('gzip') == '1')
+
+# whole table for the data office, rebuilt part by part as rows change (see columnar.py)
+@bp.route('/download/snapshot')
+def download_snapshot():
+    return snapshot_response(db(), current_app.config['DATABASE'], "farmers.parquet")
+
+app = create_app()
+# async mode for slow clients: uvicorn "new app:asgi_app" (see asgi.py)
+asgi_app = ASGIApp(app)
 
 # ==============================
 if __name__ == '__main__':
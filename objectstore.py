@@ -0,0 +1,217 @@
+"""A small S3-compatible object store on local disk, standing in for MinIO in development and benchmarks.
+
+    S3_ACCESS_KEY=dev S3_SECRET_KEY=devsecret python objectstore.py 9000 objects/
+
+then run the app with PHOTO_STORAGE=s3://photos S3_ENDPOINT=http://127.0.0.1:9000
+and the same keys. Each object is a file at <dir>/<bucket>/<key>. It speaks
+just what storage.S3Storage uses -- PUT, GET, HEAD, DELETE, ListObjectsV2
+-- with path-style URLs, and checks every request's Signature V4 (header
+or presigned URL) and a PUT body's x-amz-content-sha256, so a signing or
+streaming mistake fails here the way it would against a real store.
+"""
+import calendar, hashlib, hmac, mimetypes, os, shutil, sys, tempfile, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+from xml.sax.saxutils import escape
+from storage import CHUNK_SIZE, UNSIGNED, signature
+
+ACCESS_KEY = os.environ.get("S3_ACCESS_KEY", "dev")
+SECRET_KEY = os.environ.get("S3_SECRET_KEY", "devsecret")
+LIST_LIMIT = 1000
+CLOCK_SKEW = 15 * 60
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like a real store
+
+    def log_message(self, *args):
+        pass
+
+    # --- helpers ---
+    def _error(self, status, code, message=""):
+        body = (f"<?xml version=\"1.0\" encoding=\"UTF-8\"?><Error><Code>{code}</Code>"
+                f"<Message>{escape(message)}</Message></Error>").encode("utf-8")
+        self._drain()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _drain(self):
+        # an unread request body would be taken for the next request on this connection
+        left = int(self.headers.get("Content-Length") or 0) - getattr(self, "_read", 0)
+        while left > 0:
+            chunk = self.rfile.read(min(left, CHUNK_SIZE))
+            if not chunk:
+                break
+            left -= len(chunk)
+
+    def _target(self):
+        """(bucket, key, query pairs, raw path) of the request; key is None for the bucket itself."""
+        parts = urlsplit(self.path)
+        bucket, _, key = parts.path.lstrip("/").partition("/")
+        return unquote(bucket), unquote(key) if key else None, parse_qsl(parts.query, keep_blank_values=True), parts.path
+
+    def _authorized(self, path, query):
+        store = self.server
+        params = dict(query)
+        if "X-Amz-Signature" in params:  # presigned URL
+            amz_date, given = params["X-Amz-Date"], params["X-Amz-Signature"]
+            expires = calendar.timegm(time.strptime(amz_date, "%Y%m%dT%H%M%SZ")) + int(params["X-Amz-Expires"])
+            if time.time() > expires:
+                return False
+            credential, signed = params["X-Amz-Credential"], params["X-Amz-SignedHeaders"].split(";")
+            query = [(k, v) for k, v in query if k != "X-Amz-Signature"]
+            payload = UNSIGNED
+        else:
+            auth = self.headers.get("Authorization", "")
+            if not auth.startswith("AWS4-HMAC-SHA256 "):
+                return False
+            fields = dict(f.strip().split("=", 1) for f in auth[len("AWS4-HMAC-SHA256 "):].split(","))
+            credential, signed, given = fields["Credential"], fields["SignedHeaders"].split(";"), fields["Signature"]
+            amz_date = self.headers.get("x-amz-date", "")
+            skew = abs(time.time() - calendar.timegm(time.strptime(amz_date, "%Y%m%dT%H%M%SZ")))
+            if skew > CLOCK_SKEW:
+                return False
+            payload = self.headers.get("x-amz-content-sha256", "")
+        access_key, _, scope = credential.partition("/")
+        region = scope.split("/")[1] if scope.count("/") == 3 else ""
+        headers = {h: self.headers.get(h, "") for h in signed}
+        expected, _, _ = signature(store.secret_key, region, self.command, path, query, headers, payload, amz_date, signed)
+        return access_key == store.access_key and hmac.compare_digest(expected, given)
+
+    def _file(self, bucket, key):
+        path = os.path.normpath(os.path.join(self.server.root, bucket, key))
+        if not path.startswith(os.path.join(self.server.root, bucket) + os.sep) or not bucket:
+            return None
+        return path
+
+    def _begin(self):
+        self._read = 0
+        bucket, key, query, raw = self._target()
+        try:
+            ok = self._authorized(raw, query)
+        except (KeyError, ValueError):
+            ok = False
+        if not ok:
+            self._error(403, "SignatureDoesNotMatch", "bad or expired signature")
+            return None
+        return bucket, key, query
+
+    # --- methods ---
+    def do_PUT(self):
+        target = self._begin()
+        if target is None:
+            return
+        bucket, key, _ = target
+        path = self._file(bucket, key) if key else None
+        if path is None:
+            return self._error(400, "InvalidArgument", "bad key")
+        size = int(self.headers.get("Content-Length") or 0)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        with os.fdopen(fd, "wb") as out:
+            while self._read < size:
+                chunk = self.rfile.read(min(CHUNK_SIZE, size - self._read))
+                if not chunk:
+                    break
+                self._read += len(chunk)
+                digest.update(chunk)
+                out.write(chunk)
+        claimed = self.headers.get("x-amz-content-sha256")
+        if self._read < size or (claimed != UNSIGNED and claimed != digest.hexdigest()):
+            os.remove(tmp)
+            return self._error(400, "BadDigest", "body does not match x-amz-content-sha256")
+        os.replace(tmp, path)
+        self.send_response(200)
+        self.send_header("ETag", f'"{digest.hexdigest()[:32]}"')
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self, head=False):
+        target = self._begin()
+        if target is None:
+            return
+        bucket, key, query = target
+        if key is None:
+            return self._list(bucket, dict(query))
+        path = self._file(bucket, key)
+        if path is None or not os.path.isfile(path):
+            return self._error(404, "NoSuchKey", key)
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self.send_response(200)
+            self.send_header("Content-Length", str(size))
+            self.send_header("Content-Type", mimetypes.guess_type(key)[0] or "application/octet-stream")
+            self.end_headers()
+            if not head:
+                shutil.copyfileobj(f, self.wfile, CHUNK_SIZE)
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_DELETE(self):
+        target = self._begin()
+        if target is None:
+            return
+        bucket, key, _ = target
+        path = self._file(bucket, key) if key else None
+        if path is not None and os.path.isfile(path):
+            os.remove(path)
+        self.send_response(204)
+        self.end_headers()
+
+    def _list(self, bucket, params):
+        root = os.path.join(self.server.root, bucket)
+        prefix, after = params.get("prefix", ""), params.get("continuation-token", "")
+        keys = []
+        for directory, _, files in os.walk(root):
+            for name in files:
+                key = os.path.relpath(os.path.join(directory, name), root).replace(os.sep, "/")
+                if key.startswith(prefix) and key > after and not name.endswith(".part"):
+                    keys.append(key)
+        keys.sort()
+        page, truncated = keys[:LIST_LIMIT], len(keys) > LIST_LIMIT
+        body = ("<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+                "<ListBucketResult xmlns=\"http://s3.amazonaws.com/doc/2006-03-01/\">"
+                f"<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix><KeyCount>{len(page)}</KeyCount>"
+                f"<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>"
+                + (f"<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>" if truncated else "")
+                + "".join(f"<Contents><Key>{escape(k)}</Key></Contents>" for k in page)
+                + "</ListBucketResult>").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ObjectStore(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, root, port=9000, host="127.0.0.1", access_key=ACCESS_KEY, secret_key=SECRET_KEY):
+        super().__init__((host, port), _Handler)
+        self.root = os.path.abspath(root)
+        self.access_key, self.secret_key = access_key, secret_key
+
+    @property
+    def endpoint(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+
+def serve(root, port=0, host="127.0.0.1", access_key=ACCESS_KEY, secret_key=SECRET_KEY):
+    """Start a store on a background thread (port 0 picks a free one); returns it, .shutdown() stops it."""
+    store = ObjectStore(root, port, host, access_key, secret_key)
+    threading.Thread(target=store.serve_forever, daemon=True, name="objectstore").start()
+    return store
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    store = ObjectStore(sys.argv[2], int(sys.argv[1]), os.environ.get("S3_HOST", "127.0.0.1"))
+    print(f"objectstore on {store.endpoint}, objects in {store.root}", file=sys.stderr)
+    store.serve_forever()
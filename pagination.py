@@ -0,0 +1,48 @@
+# === Keyset pagination ===
+# Pages are addressed by the last id seen (?before=<id>) rather than OFFSET, so
+# every page is an index range scan of `limit` rows however large the table is.
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# (state, lga, id) serves the state+LGA filter, (state, id) the state-only one;
+# both return rows already in id order so SQLite never sorts.
+FARMER_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_farmers_state_lga_id ON farmers(state, lga, id)",
+    "CREATE INDEX IF NOT EXISTS idx_farmers_state_id ON farmers(state, id)",
+    "CREATE INDEX IF NOT EXISTS idx_farmers_crop ON farmers(crop)",
+)
+
+
+def page_args(args):
+    """(before, limit) from the query string; bad values fall back to the first page."""
+    try:
+        before = int(args.get("before") or 0) or None
+    except ValueError:
+        before = None
+    try:
+        limit = int(args.get("limit") or PAGE_SIZE)
+    except ValueError:
+        limit = PAGE_SIZE
+    return before, max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def keyset_page(conn, table, columns, filters, before=None, limit=PAGE_SIZE):
+    """Newest-first page of `columns` (id is always the first column returned).
+
+    `filters` maps column -> value; empty values are ignored. Returns
+    (rows, next_before) where next_before is None on the last page.
+    """
+    where, params = [], []
+    for column, value in filters.items():
+        if value:
+            where.append(f"{column} = ?"); params.append(value)
+    if before:
+        where.append("id < ?"); params.append(before)
+    sql = f"SELECT id, {', '.join(columns)} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY id DESC LIMIT ?"
+    rows = conn.execute(sql, params + [limit + 1]).fetchall()
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1][0]
+    return rows, None
@@ -0,0 +1,180 @@
+"""Content-addressed farmer photos with background thumbnails.
+
+An image upload is hashed and counted while the form parser receives it
+(PhotoRequest), and a request carrying one bigger than MAX_PHOTO_BYTES is
+refused with 413 before the rest of it is read. The photo is then streamed
+to the photo storage (storage.py: a local directory or an S3-compatible
+store) as <aa>/<sha256><ext>, so identical photos are kept once and names
+never collide. Thumbnails (thumbs/<aa>/<sha256>.jpg) are made off the
+request by a small thread pool; until one exists the original is served
+with a short cache lifetime.
+
+    python photos.py thumbnails    # (re)build any missing thumbnails in PHOTO_STORAGE
+"""
+import hashlib, io, logging, mimetypes, os, re, sys, tempfile, threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import Request, abort
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+from storage import CHUNK_SIZE, SPOOL_MEMORY, StorageError, open_storage
+
+try:
+    from PIL import Image
+except ImportError:  # no thumbnails without Pillow; originals are served instead
+    Image = None
+
+THUMB_SIZE = (320, 320)
+THUMB_MAX_AGE = 365 * 24 * 3600
+THUMB_WORKERS = int(os.environ.get("THUMB_WORKERS", "2"))
+MAX_PHOTO_BYTES = int(os.environ.get("MAX_PHOTO_BYTES", str(10 * 1024 * 1024)))
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic"}
+NAME_RE = re.compile(r"^[0-9a-f]{64}\.[a-z]{3,4}$")
+
+log = logging.getLogger("farmers.photos")
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    # threads do not survive gunicorn's fork, so each worker starts its own
+    global _executor, _executor_pid
+    if _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(THUMB_WORKERS, thread_name_prefix="thumbs")
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def original_key(name):
+    return f"{name[:2]}/{name}"
+
+
+def thumb_key(name):
+    return f"thumbs/{name[:2]}/{os.path.splitext(name)[0]}.jpg"
+
+
+class PhotoSpool:
+    """An uploaded photo on its way to storage: hashed and counted chunk by chunk,
+    held in memory up to SPOOL_MEMORY and in a temp file past that."""
+
+    def __init__(self, limit=MAX_PHOTO_BYTES):
+        self.file = tempfile.SpooledTemporaryFile(SPOOL_MEMORY)
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.limit = limit
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.limit:
+            raise RequestEntityTooLarge(f"a photo can be at most {self.limit // (1024 * 1024)} MB")
+        self.digest.update(data)
+        return self.file.write(data)
+
+    def __getattr__(self, name):  # read, seek, close, ... for werkzeug's FileStorage
+        return getattr(self.file, name)
+
+    @classmethod
+    def copy(cls, stream, limit=MAX_PHOTO_BYTES):
+        spool = cls(limit)
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            spool.write(chunk)
+        return spool
+
+
+class PhotoRequest(Request):
+    """Flask's request, with image fields parsed straight into a PhotoSpool
+    (other uploads, like CSV imports, keep werkzeug's temp files)."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        ext = os.path.splitext(filename or "")[1].lower()
+        if (content_type or "").startswith("image/") or ext in IMAGE_EXTS:
+            return PhotoSpool()
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+
+def save_photo(upload, storage):
+    """Store a FileStorage; returns its location for farmers.photo_path. Thumbnailing is queued."""
+    ext = os.path.splitext(secure_filename(upload.filename or ""))[1].lower()
+    if ext not in IMAGE_EXTS:
+        ext = ".jpg"
+    spool = upload.stream if isinstance(upload.stream, PhotoSpool) else PhotoSpool.copy(upload.stream)
+    sha256 = spool.digest.hexdigest()
+    name = sha256 + ext
+    key = original_key(name)
+    try:
+        stored = not storage.exists(key)  # else the same photo was uploaded before
+        if stored:
+            spool.seek(0)
+            storage.put(key, spool.file, spool.size, sha256, mimetypes.guess_type(name)[0])
+    except StorageError:
+        abort(503, "photo storage is unavailable, please try again")
+    if stored and Image is not None:
+        _pool().submit(make_thumbnail, name, storage).add_done_callback(
+            lambda future: _thumbnail_done(future, name))
+    return storage.location(key)
+
+
+def saved_photo(name, storage):
+    """The location of a photo save_photo already stored, from the content-addressed
+    name a form sent back (the duplicate warning's "register anyway")."""
+    if not NAME_RE.match(name or ""):
+        abort(400, "photo is required")
+    key = original_key(name)
+    try:
+        if not storage.exists(key):
+            abort(400, "photo is required")
+    except StorageError:
+        abort(503, "photo storage is unavailable, please try again")
+    return storage.location(key)
+
+
+def _thumbnail_done(future, name):
+    # the thumb route keeps serving the original; `python photos.py thumbnails` retries
+    error = future.exception()
+    if error is not None:
+        log.error("thumbnail for %s failed", name, exc_info=error)
+
+
+def make_thumbnail(name, storage):
+    with storage.open(original_key(name)) as original, Image.open(original) as img:
+        img.thumbnail(THUMB_SIZE)
+        out = io.BytesIO()
+        img.convert("RGB").save(out, "JPEG", quality=80, optimize=True)
+    data = out.getvalue()
+    storage.put(thumb_key(name), io.BytesIO(data), len(data), hashlib.sha256(data).hexdigest(), "image/jpeg")
+    return thumb_key(name)
+
+
+def photo_name(photo_path):
+    """The content-addressed name for a stored path, or None for legacy uploads."""
+    name = os.path.basename(photo_path or "")
+    return name if NAME_RE.match(name) else None
+
+
+def thumb_response(name, storage):
+    if not NAME_RE.match(name):
+        abort(404)
+    try:
+        if storage.exists(thumb_key(name)):
+            # content-addressed, so a finished thumbnail can be cached forever
+            return storage.response(thumb_key(name), THUMB_MAX_AGE, immutable=True)
+        return storage.response(original_key(name), 60)
+    except StorageError:
+        abort(503, "photo storage is unavailable")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["thumbnails"] or Image is None:
+        sys.exit("usage: python photos.py thumbnails   (requires Pillow)")
+    storage = open_storage()
+    have = set(storage.keys("thumbs/"))
+    made = 0
+    for key in storage.keys():
+        name = key.rsplit("/", 1)[-1]
+        if not key.startswith("thumbs/") and NAME_RE.match(name) and thumb_key(name) not in have:
+            make_thumbnail(name, storage)
+            made += 1
+    print(f"made {made} thumbnails")
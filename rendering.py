@@ -0,0 +1,51 @@
+import threading
+from collections import OrderedDict
+from flask import current_app
+from flask.signals import before_render_template, template_rendered
+
+# === Compiled templates and rendered-page cache ===
+# render_template_string() compiles its source on every call; these templates
+# are compiled once at startup and rendered the way Flask's render_template does.
+
+
+def compile_templates(app, **sources):
+    templates = {}
+    for name, source in sources.items():
+        templates[name] = app.jinja_env.from_string(source)
+        templates[name].name = name  # from_string templates are otherwise anonymous (metrics label)
+    return templates
+
+
+def render(template, **context):
+    app = current_app._get_current_object()
+    app.update_template_context(context)
+    before_render_template.send(app, template=template, context=context)
+    rv = template.render(context)
+    template_rendered.send(app, template=template, context=context)
+    return rv
+
+
+class RenderCache:
+    """Small LRU of rendered HTML. Keys should include whatever the page depends
+    on (language, location data version, ...) so stale entries simply age out."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, render_fn):
+        with self._lock:
+            if key in self._pages:
+                self._pages.move_to_end(key)
+                return self._pages[key]
+        html = render_fn()
+        with self._lock:
+            self._pages[key] = html
+            while len(self._pages) > self.maxsize:
+                self._pages.popitem(last=False)
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
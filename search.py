@@ -0,0 +1,114 @@
+"""Farmer lookup by name/crop (FTS5) and by phone number (normalized index).
+
+farmers_fts is an external-content FTS5 index over farmers(name, crop), kept
+in sync by triggers. Phone numbers are matched on a generated phone_norm
+column (digits only, +234... folded to 0...) with its own B-tree index, which
+serves both exact and prefix lookups.
+"""
+import re
+from db import add_column, backfill, backfill_pending
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# bm25 is only computed for the newest matches, so common words stay cheap
+RANK_CANDIDATES = 5000
+
+
+def _phone_norm_sql():
+    # SQL twin of normalize_phone() for the generated column
+    digits = "phone"
+    for ch in (" ", "-", "+", "(", ")", "."):
+        digits = f"replace({digits}, '{ch}', '')"
+    return (f"CASE WHEN length({digits}) = 13 AND substr({digits}, 1, 3) = '234' "
+            f"THEN '0' || substr({digits}, 4) ELSE {digits} END")
+
+
+PHONE_NORM_SQL = _phone_norm_sql()
+PHONE_QUERY_RE = re.compile(r"^[\d\s()+.-]{3,}$")
+
+
+def normalize_phone(phone):
+    digits = re.sub(r"\D", "", phone or "")
+    return "0" + digits[3:] if len(digits) == 13 and digits.startswith("234") else digits
+
+
+def phone_prefix(q):
+    """normalize_phone() for a partly typed number: "+2348031" is the start of
+    a 13-digit +234 number, so it is folded to "08031" like the stored ones."""
+    digits = re.sub(r"\D", "", q or "")
+    return "0" + digits[3:] if 3 < len(digits) <= 13 and digits.startswith("234") else digits
+
+
+def install_search(conn):
+    columns = {r[1] for r in conn.execute("PRAGMA table_info(farmers)")}
+    if "phone" in columns:
+        add_column(conn, "farmers", "phone_norm", f"TEXT GENERATED ALWAYS AS ({PHONE_NORM_SQL}) VIRTUAL")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_farmers_phone_norm ON farmers(phone_norm)")
+    if (conn.execute("SELECT 1 FROM sqlite_master WHERE name='farmers_fts'").fetchone()
+            and not backfill_pending(conn, "search")):
+        return
+    # the index is filled in id batches (db.backfill), so a big farmers table stays writable
+    setup = ["CREATE VIRTUAL TABLE IF NOT EXISTS farmers_fts USING fts5("
+             "name, crop, content='farmers', content_rowid='id', "
+             "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"]
+    triggers = [
+        ("farmers_fts_insert", "AFTER INSERT ON farmers", "NEW",
+         "INSERT INTO farmers_fts(rowid, name, crop) VALUES (NEW.id, NEW.name, NEW.crop);"),
+        ("farmers_fts_delete", "AFTER DELETE ON farmers", "OLD",
+         "INSERT INTO farmers_fts(farmers_fts, rowid, name, crop) VALUES ('delete', OLD.id, OLD.name, OLD.crop);"),
+        ("farmers_fts_update", "AFTER UPDATE OF name, crop ON farmers", "NEW",
+         "INSERT INTO farmers_fts(farmers_fts, rowid, name, crop) VALUES ('delete', OLD.id, OLD.name, OLD.crop); "
+         "INSERT INTO farmers_fts(rowid, name, crop) VALUES (NEW.id, NEW.name, NEW.crop);"),
+    ]
+    fill = ["INSERT INTO farmers_fts(rowid, name, crop) SELECT id, name, crop FROM farmers WHERE id > ? AND id <= ?"]
+    backfill(conn, "search", triggers, fill, setup)
+
+
+def fts_query(text):
+    """Every word must match, each as a prefix: 'amin kan' -> "amin"* "kan"*."""
+    words = re.findall(r"\w+", text)
+    return " ".join('"%s"*' % w.replace('"', '""') for w in words)
+
+
+def search_args(args):
+    try:
+        page = max(1, int(args.get("page") or 1))
+    except ValueError:
+        page = 1
+    try:
+        limit = max(1, min(int(args.get("limit") or PAGE_SIZE), MAX_PAGE_SIZE))
+    except ValueError:
+        limit = PAGE_SIZE
+    return args.get("q", "").strip(), page, limit
+
+
+def search_farmers(conn, q, columns, page=1, limit=PAGE_SIZE):
+    """(rows, has_more). Phone-looking queries walk the phone index from the
+    typed prefix (an exact hit sorts first); anything else is ranked by FTS5
+    bm25 among the newest RANK_CANDIDATES matches."""
+    cols = ", ".join("f." + c for c in columns)
+    offset = (page - 1) * limit
+    if PHONE_QUERY_RE.match(q) and "phone" in columns:
+        phone = phone_prefix(q)
+        if not phone:
+            return [], False
+        upper = phone[:-1] + chr(ord(phone[-1]) + 1)
+        rows = conn.execute(f"SELECT f.id, {cols} FROM farmers f WHERE f.phone_norm >= ? AND f.phone_norm < ? "
+                            "ORDER BY f.phone_norm LIMIT ? OFFSET ?",
+                            (phone, upper, limit + 1, offset)).fetchall()
+    else:
+        match = fts_query(q)
+        if not match:
+            return [], False
+        rows = conn.execute(f"SELECT f.id, {cols} FROM (SELECT rowid, bm25(farmers_fts) AS score "
+                            "FROM farmers_fts WHERE farmers_fts MATCH ? ORDER BY rowid DESC LIMIT ?) m "
+                            "JOIN farmers f ON f.id = m.rowid ORDER BY m.score, m.rowid DESC LIMIT ? OFFSET ?",
+                            (match, RANK_CANDIDATES, limit + 1, offset)).fetchall()
+    return rows[:limit], len(rows) > limit
+
+
+def search_response(conn, args, columns):
+    q, page, limit = search_args(args)
+    rows, more = search_farmers(conn, q, columns, page, limit) if q else ([], False)
+    return {"q": q, "page": page, "next_page": page + 1 if more else None,
+            "results": [dict(zip(["id"] + list(columns), r)) for r in rows]}
@@ -0,0 +1,122 @@
+"""Rollup tables with farmer counts, kept exact by triggers on `farmers`.
+
+Charts and /api/stats read these small tables instead of running GROUP BY
+over every farmer. To repair drift (e.g. rows edited with triggers dropped):
+
+    python stats.py rebuild farmers.db
+"""
+import sys
+from db import pooled, backfill, backfill_pending
+
+# rollup name -> farmers columns it groups by
+ROLLUPS = {
+    "state": ("state",),
+    "lga": ("state", "lga"),
+    "crop": ("crop",),
+    "flood_risk": ("flood_risk",),
+}
+
+
+def _table(name):
+    return f"farmer_counts_{name}"
+
+
+def rollups_for(conn):
+    """The rollups this database can support (app.py's farmers has no flood_risk)."""
+    columns = {r[1] for r in conn.execute("PRAGMA table_info(farmers)")}
+    return {name: keys for name, keys in ROLLUPS.items() if set(keys) <= columns}
+
+
+def _bump(name, keys, row, delta):
+    # NULL never conflicts in a primary key, so unknown values are counted under ''
+    values = ", ".join(f"COALESCE({row}.{k}, '')" for k in keys)
+    if delta > 0:
+        return (f"INSERT INTO {_table(name)}({', '.join(keys)}, n) VALUES ({values}, 1) "
+                f"ON CONFLICT({', '.join(keys)}) DO UPDATE SET n = n + 1;")
+    match = " AND ".join(f"{k} = COALESCE({row}.{k}, '')" for k in keys)
+    return f"UPDATE {_table(name)} SET n = n - 1 WHERE {match};"
+
+
+def install_rollups(conn):
+    """Create rollup tables and triggers; the first install also fills them,
+    in batches (see db.backfill) so a big farmers table stays writable.
+
+    A rollup whose columns were added to farmers later (e.g. flood_risk by a
+    migration) gets its table, and the triggers are recreated to include it.
+    """
+    rollups = rollups_for(conn)
+    names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")}
+    if ("farmers_rollup_insert" in names and all(_table(n) in names for n in rollups)
+            and not backfill_pending(conn, "rollups")):
+        return
+    setup = [f"CREATE TABLE IF NOT EXISTS {_table(name)}("
+             f"{', '.join(k + ' TEXT NOT NULL' for k in keys)}, n INTEGER NOT NULL DEFAULT 0, "
+             f"PRIMARY KEY({', '.join(keys)})) WITHOUT ROWID" for name, keys in rollups.items()]
+    setup += [f"DELETE FROM {_table(name)}" for name in rollups]
+    columns = sorted({k for keys in rollups.values() for k in keys})
+    triggers = [
+        ("farmers_rollup_insert", "AFTER INSERT ON farmers", "NEW",
+         " ".join(_bump(n, k, "NEW", 1) for n, k in rollups.items())),
+        ("farmers_rollup_delete", "AFTER DELETE ON farmers", "OLD",
+         " ".join(_bump(n, k, "OLD", -1) for n, k in rollups.items())),
+        ("farmers_rollup_update", f"AFTER UPDATE OF {', '.join(columns)} ON farmers", "NEW",
+         " ".join(_bump(n, k, "OLD", -1) + " " + _bump(n, k, "NEW", 1) for n, k in rollups.items())),
+    ]
+    fill = []
+    for name, keys in rollups.items():
+        exprs = ", ".join(f"COALESCE({k}, '')" for k in keys)
+        fill.append(f"INSERT INTO {_table(name)}({', '.join(keys)}, n) "
+                    f"SELECT {exprs}, COUNT(*) FROM farmers WHERE id > ? AND id <= ? GROUP BY {exprs} "
+                    f"ON CONFLICT({', '.join(keys)}) DO UPDATE SET n = n + excluded.n")
+    backfill(conn, "rollups", triggers, fill, setup)
+
+
+def _refill(conn, rollups):
+    for name, keys in rollups.items():
+        exprs = ", ".join(f"COALESCE({k}, '')" for k in keys)
+        conn.execute(f"DELETE FROM {_table(name)}")
+        conn.execute(f"INSERT INTO {_table(name)}({', '.join(keys)}, n) "
+                     f"SELECT {exprs}, COUNT(*) FROM farmers GROUP BY {exprs}")
+
+
+def rebuild_rollups(conn):
+    """Recount every rollup from farmers in one write transaction."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _refill(conn, rollups_for(conn))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def read_rollup(conn, name, schema="main"):
+    """(key..., n) rows of one rollup; schema names an attached database's (an archive's) copy."""
+    keys = ROLLUPS[name]
+    return conn.execute(f"SELECT {', '.join(keys)}, n FROM {schema}.{_table(name)} WHERE n > 0 "
+                        f"ORDER BY {', '.join(keys)}").fetchall()
+
+
+def count_rollup(conn, name, where, params=(), table="farmers"):
+    """read_rollup()'s rows counted with GROUP BY over the rows matching `where`,
+    for a slice of farmers (one season) that no rollup table covers."""
+    keys = ROLLUPS[name]
+    exprs = ", ".join(f"COALESCE({k}, '')" for k in keys)
+    return conn.execute(f"SELECT {exprs}, COUNT(*) FROM {table} WHERE {where} "
+                        f"GROUP BY {exprs} ORDER BY {exprs}", params).fetchall()
+
+
+def all_stats(conn):
+    """Every rollup as JSON-ready lists, e.g. {"state": [{"state": "Kano", "count": 12}, ...]}."""
+    return {name: [dict(zip(keys + ("count",), row)) for row in read_rollup(conn, name)]
+            for name, keys in rollups_for(conn).items()}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "rebuild":
+        sys.exit("usage: python stats.py rebuild <database>")
+    with pooled(sys.argv[2]) as conn:
+        install_rollups(conn)
+        rebuild_rollups(conn)
+        for name in rollups_for(conn):
+            print(name, sum(r[-1] for r in read_rollup(conn, name)))
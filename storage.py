@@ -0,0 +1,268 @@
+"""Where photos live: a directory on this node, or an S3-compatible object store.
+
+    PHOTO_STORAGE=static/photos              (default) a local directory
+    PHOTO_STORAGE=s3://farmer-photos/prod    bucket and key prefix, with
+        S3_ENDPOINT=http://minio:9000 S3_REGION=us-east-1 S3_ACCESS_KEY=... S3_SECRET_KEY=...
+        S3_PUBLIC_ENDPOINT=https://photos.example.org   (what browsers reach, if not S3_ENDPOINT)
+
+Both backends store bytes under keys like "ab/<sha256>.jpg" and stream in
+CHUNK_SIZE pieces both ways; neither ever holds a whole photo in memory.
+
+With the local directory every web node needs the same disk and the photos
+go out through the web workers. With S3 any node can store or read any
+photo, and browsers fetch them straight from the store with presigned GET
+URLs (AWS Signature V4, no SDK needed). A URL is signed for the current
+URL_WINDOW and stays valid for the next one too, so everyone gets the same
+URL for an hour and browsers and proxies can cache the image.
+
+objectstore.py is an S3 stand-in for development and benchmarks.
+"""
+import hashlib, hmac, http.client, os, shutil, tempfile, threading, time
+import xml.etree.ElementTree as ET
+from urllib.parse import quote, urlsplit
+from flask import abort, redirect, send_file
+
+STORAGE = os.environ.get("PHOTO_STORAGE", os.path.join("static", "photos"))
+CHUNK_SIZE = 64 * 1024
+SPOOL_MEMORY = 256 * 1024    # past this a photo in transit waits in a temp file, not in memory
+URL_WINDOW = 3600
+S3_TIMEOUT = float(os.environ.get("S3_TIMEOUT", "30"))
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+UNSIGNED = "UNSIGNED-PAYLOAD"
+S3_NS = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+
+
+class StorageError(Exception):
+    pass
+
+
+def open_storage(spec=STORAGE):
+    """The backend for a PHOTO_STORAGE value."""
+    if spec.startswith("s3://"):
+        return S3Storage.from_url(spec)
+    return LocalStorage(spec)
+
+
+# === Local directory ===
+class LocalStorage:
+    def __init__(self, root):
+        self.root = root
+
+    def location(self, key):
+        """What the farmers table records for a stored photo."""
+        return os.path.join(self.root, key)
+
+    def exists(self, key):
+        return os.path.exists(self.location(key))
+
+    def put(self, key, f, size, sha256, content_type=None):
+        path = self.location(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                shutil.copyfileobj(f, out, CHUNK_SIZE)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def open(self, key):
+        return open(self.location(key), "rb")
+
+    def url(self, key):
+        return None  # nothing but the app serves this directory
+
+    def response(self, key, max_age, immutable=False):
+        if not self.exists(key):
+            abort(404)
+        resp = send_file(os.path.abspath(self.location(key)), max_age=max_age)
+        resp.cache_control.immutable = immutable
+        return resp
+
+    def keys(self, prefix=""):
+        for directory, _, files in os.walk(os.path.join(self.root, prefix)):
+            for name in files:
+                if not name.endswith(".part"):
+                    yield os.path.relpath(os.path.join(directory, name), self.root).replace(os.sep, "/")
+
+
+# === S3-compatible object store ===
+def _hmac(key, msg):
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+def _quote(text, safe="-_.~"):
+    return quote(text, safe=safe)
+
+
+def canonical_query(params):
+    return "&".join(f"{_quote(k)}={_quote(v)}" for k, v in sorted(params))
+
+
+def signature(secret_key, region, method, path, params, headers, payload_hash, amz_date, signed=None):
+    """AWS Signature V4 of one request: (hex signature, signed header names, credential scope).
+
+    path is already URI-encoded; headers is {lowercase name: value} and
+    `signed` the names to sign (all of them by default).
+    """
+    signed = sorted(signed or headers)
+    scope = f"{amz_date[:8]}/{region}/s3/aws4_request"
+    canonical = "\n".join([method, path, canonical_query(params),
+                           "".join(f"{h}:{' '.join(str(headers[h]).split())}\n" for h in signed),
+                           ";".join(signed), payload_hash])
+    to_sign = "\n".join(["AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical.encode("utf-8")).hexdigest()])
+    key = _hmac(("AWS4" + secret_key).encode("utf-8"), amz_date[:8])
+    for part in (region, "s3", "aws4_request"):
+        key = _hmac(key, part)
+    return hmac.new(key, to_sign.encode("utf-8"), hashlib.sha256).hexdigest(), ";".join(signed), scope
+
+
+def _amz_date(t):
+    return time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(t))
+
+
+class S3Storage:
+    """Path-style requests (endpoint/bucket/key), which AWS, MinIO and the rest all accept."""
+
+    def __init__(self, bucket, prefix="", endpoint=None, region="us-east-1", access_key=None, secret_key=None,
+                 public_endpoint=None, timeout=S3_TIMEOUT):
+        if not access_key or not secret_key:
+            raise ValueError("S3 photo storage needs S3_ACCESS_KEY and S3_SECRET_KEY")
+        self.bucket, self.prefix = bucket, prefix.strip("/")
+        self.region, self.access_key, self.secret_key = region, access_key, secret_key
+        self.endpoint = urlsplit(endpoint or f"https://s3.{region}.amazonaws.com")
+        self.public = urlsplit(public_endpoint) if public_endpoint else self.endpoint
+        self.timeout = timeout
+        self._local = threading.local()
+        self._urls = {}
+
+    @classmethod
+    def from_url(cls, spec):
+        parts = urlsplit(spec)
+        env = os.environ.get
+        return cls(parts.netloc, parts.path, env("S3_ENDPOINT"), env("S3_REGION", "us-east-1"),
+                   env("S3_ACCESS_KEY", env("AWS_ACCESS_KEY_ID")), env("S3_SECRET_KEY", env("AWS_SECRET_ACCESS_KEY")),
+                   env("S3_PUBLIC_ENDPOINT"))
+
+    def _key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _path(self, endpoint, key=None):
+        base = endpoint.path.rstrip("/") + "/" + self.bucket
+        return base + "/" + _quote(self._key(key), safe="-_.~/") if key is not None else base
+
+    def location(self, key):
+        return f"s3://{self.bucket}/{self._key(key)}"
+
+    def _connection(self):
+        # one keep-alive connection per thread; a forked worker opens its own
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid() or local.conn is None:
+            cls = http.client.HTTPSConnection if self.endpoint.scheme == "https" else http.client.HTTPConnection
+            local.conn = cls(self.endpoint.netloc, timeout=self.timeout, blocksize=CHUNK_SIZE)
+            local.pid = os.getpid()
+        return local.conn
+
+    def _request(self, method, key=None, params=(), body=None, headers=None, payload_hash=EMPTY_SHA256, out=None):
+        """(status, response headers, body bytes); with `out`, a 200 body is copied there instead."""
+        path = self._path(self.endpoint, key)
+        query = canonical_query(params)
+        for attempt in (1, 2):
+            now = _amz_date(time.time())
+            h = {"host": self.endpoint.netloc, "x-amz-date": now, "x-amz-content-sha256": payload_hash}
+            h.update(headers or {})
+            sig, signed, scope = signature(self.secret_key, self.region, method, path, params, h, payload_hash, now)
+            h["authorization"] = (f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+                                  f"SignedHeaders={signed}, Signature={sig}")
+            conn = self._connection()
+            try:
+                conn.request(method, path + ("?" + query if query else ""), body=body, headers=h)
+                resp = conn.getresponse()
+                if out is not None and resp.status == 200:
+                    shutil.copyfileobj(resp, out, CHUNK_SIZE)
+                    data = b""
+                else:
+                    data = resp.read()
+                return resp.status, resp.headers, data
+            except (http.client.RemoteDisconnected, ConnectionError) as e:
+                # the store closed an idle keep-alive connection: retry once on a new one
+                conn.close()
+                self._local.conn = None
+                if attempt == 2 or (body is not None and not hasattr(body, "seek")):
+                    raise StorageError(f"S3 {method} {key}: {e}") from e
+                if body is not None:
+                    body.seek(0)
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                self._local.conn = None
+                raise StorageError(f"S3 {method} {key}: {e}") from e
+
+    def _check(self, method, key, status, data, ok=(200,)):
+        if status not in ok:
+            raise StorageError(f"S3 {method} {key}: HTTP {status} {data[:200].decode('utf-8', 'replace')}")
+        return status
+
+    def exists(self, key):
+        status, _, data = self._request("HEAD", key)
+        return self._check("HEAD", key, status, data, (200, 404)) == 200
+
+    def put(self, key, f, size, sha256, content_type=None):
+        headers = {"content-length": str(size)}
+        if content_type:
+            headers["content-type"] = content_type
+        status, _, data = self._request("PUT", key, body=f, headers=headers, payload_hash=sha256)
+        self._check("PUT", key, status, data)
+
+    def open(self, key):
+        """The object, read into a spooled temp file."""
+        out = tempfile.SpooledTemporaryFile(SPOOL_MEMORY)
+        try:
+            status, _, data = self._request("GET", key, out=out)
+            self._check("GET", key, status, data)
+        except BaseException:
+            out.close()
+            raise
+        out.seek(0)
+        return out
+
+    def url(self, key, now=None):
+        """A presigned GET URL, the same for everyone during one URL_WINDOW."""
+        start = int((now or time.time()) // URL_WINDOW * URL_WINDOW)
+        cached = self._urls.get(key)
+        if cached and cached[0] == start:
+            return cached[1]
+        amz_date = _amz_date(start)
+        path = self._path(self.public, key)
+        scope = f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+        params = [("X-Amz-Algorithm", "AWS4-HMAC-SHA256"), ("X-Amz-Credential", f"{self.access_key}/{scope}"),
+                  ("X-Amz-Date", amz_date), ("X-Amz-Expires", str(2 * URL_WINDOW)), ("X-Amz-SignedHeaders", "host")]
+        sig, _, _ = signature(self.secret_key, self.region, "GET", path, params, {"host": self.public.netloc},
+                              UNSIGNED, amz_date)
+        url = f"{self.public.scheme}://{self.public.netloc}{path}?{canonical_query(params)}&X-Amz-Signature={sig}"
+        if len(self._urls) > 100000:  # one window's worth of photos is plenty
+            self._urls.clear()
+        self._urls[key] = (start, url)
+        return url
+
+    def response(self, key, max_age, immutable=False):
+        # the photo goes from the store to the browser, not through this worker; the
+        # redirect can only be cached while its URL is valid, however long the photo is
+        resp = redirect(self.url(key))
+        resp.cache_control.max_age = min(max_age, URL_WINDOW)
+        resp.cache_control.private = True
+        return resp
+
+    def keys(self, prefix=""):
+        params = {"list-type": "2", "prefix": self._key(prefix)}
+        while True:
+            status, _, data = self._request("GET", params=list(params.items()))
+            self._check("LIST", prefix, status, data)
+            root = ET.fromstring(data)
+            for item in root.iter(S3_NS + "Contents"):
+                key = item.find(S3_NS + "Key").text
+                yield key[len(self.prefix) + 1:] if self.prefix else key
+            token = root.find(S3_NS + "NextContinuationToken")
+            if root.findtext(S3_NS + "IsTruncated") != "true" or token is None:
+                return
+            params["continuation-token"] = token.text
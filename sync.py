@@ -0,0 +1,120 @@
+"""Offline-first sync for field tablets.
+
+Every farmers row carries a client_uuid (generated on the tablet, unique) and
+a change_seq that triggers bump from one database-wide counter on each insert
+or update; deletes leave a tombstone with their own seq. So:
+
+    POST /api/sync/push            JSON Lines, optionally Content-Encoding: gzip;
+                                   records already pushed (same uuid) are skipped
+    GET  /api/sync/pull?since=<seq>&limit=<n>
+                                   rows and deletions with change_seq > since,
+                                   as column arrays; pass back `next` until
+                                   `more` is false
+"""
+import gzip, json
+from flask import Response, abort, request
+from db import backfill, backfill_pending
+from bulk_import import import_upload
+
+PULL_LIMIT = 1000
+MAX_PULL_LIMIT = 5000
+GZIP_MIN_BYTES = 1024
+
+SYNC_COLUMNS = (("client_uuid", "TEXT"), ("change_seq", "INTEGER"))
+SYNC_INDEXES = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_farmers_client_uuid ON farmers(client_uuid)",
+    "CREATE INDEX IF NOT EXISTS idx_farmers_change_seq ON farmers(change_seq)",
+)
+TOMBSTONES_SQL = """CREATE TABLE IF NOT EXISTS farmers_tombstones(
+    change_seq INTEGER PRIMARY KEY,
+    farmer_id INTEGER NOT NULL,
+    client_uuid TEXT
+)"""
+_BUMP = "UPDATE sync_seq SET seq = seq + 1;"
+_SEQ = "(SELECT seq FROM sync_seq)"
+
+
+def install_sync(conn):
+    """Sequence triggers; existing rows get change_seq = id in batches, and the
+    counter starts above them so every later change sorts after."""
+    if (conn.execute("SELECT 1 FROM sqlite_master WHERE name='farmers_sync_insert'").fetchone()
+            and not backfill_pending(conn, "sync")):
+        return
+    data = [r[1] for r in conn.execute("PRAGMA table_info(farmers)") if r[1] not in ("id", "change_seq")]
+    setup = [TOMBSTONES_SQL,
+             "CREATE TABLE IF NOT EXISTS sync_seq(id INTEGER PRIMARY KEY CHECK (id = 1), seq INTEGER NOT NULL)",
+             "INSERT OR IGNORE INTO sync_seq(id, seq) SELECT 1, COALESCE(MAX(id), 0) FROM farmers"]
+    triggers = [
+        ("farmers_sync_insert", "AFTER INSERT ON farmers", "NEW",
+         f"{_BUMP} UPDATE farmers SET change_seq = {_SEQ} WHERE id = NEW.id;"),
+        ("farmers_sync_update", f"AFTER UPDATE OF {', '.join(data)} ON farmers", "NEW",
+         f"{_BUMP} UPDATE farmers SET change_seq = {_SEQ} WHERE id = NEW.id;"),
+        ("farmers_sync_delete", "AFTER DELETE ON farmers", "OLD",
+         f"{_BUMP} INSERT INTO farmers_tombstones(change_seq, farmer_id, client_uuid) "
+         f"VALUES ({_SEQ}, OLD.id, OLD.client_uuid);"),
+    ]
+    fill = ["UPDATE farmers SET change_seq = id WHERE id > ? AND id <= ? AND change_seq IS NULL"]
+    backfill(conn, "sync", triggers, fill, setup, guard=False)
+
+
+def _ready(conn):
+    # until every old row has its change_seq a pull could skip some of them
+    if backfill_pending(conn, "sync"):
+        abort(503, "sync is being set up, try again shortly")
+
+
+def push_records(conn, locations):
+    """Import a pushed batch; the report says how many were new, already known or invalid."""
+    _ready(conn)
+    encoding = request.content_encoding or "identity"
+    if encoding == "gzip":
+        stream = gzip.GzipFile(fileobj=request.stream)
+    elif encoding == "identity":
+        stream = request.stream
+    else:
+        abort(415, f"unsupported Content-Encoding {encoding!r}")
+    try:
+        report = import_upload(conn, stream, "jsonl", locations, required=("client_uuid", "name"))
+    except (OSError, EOFError, UnicodeDecodeError) as e:
+        abort(400, f"unreadable batch: {e}")
+    report["seq"] = conn.execute("SELECT seq FROM sync_seq").fetchone()[0]
+    return report
+
+
+def pull_args(args):
+    try:
+        since = int(args.get("since") or 0)
+        limit = max(1, min(int(args.get("limit") or PULL_LIMIT), MAX_PULL_LIMIT))
+    except ValueError:
+        abort(400, "since and limit must be integers")
+    return since, limit
+
+
+def pull(conn, columns, since, limit):
+    """Changes after `since`: {"columns", "rows", "deleted", "next", "more"}."""
+    _ready(conn)
+    cols = ["id", "client_uuid", "change_seq"] + [c for c in columns if c not in ("id", "client_uuid")]
+    conn.execute("BEGIN")  # one snapshot for rows and tombstones
+    try:
+        rows = conn.execute(f"SELECT {', '.join(cols)} FROM farmers WHERE change_seq > ? "
+                            "ORDER BY change_seq LIMIT ?", (since, limit + 1)).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        upto = rows[-1][2] if more else conn.execute("SELECT seq FROM sync_seq").fetchone()[0]
+        deleted = conn.execute("SELECT farmer_id, client_uuid FROM farmers_tombstones "
+                               "WHERE change_seq > ? AND change_seq <= ? ORDER BY change_seq",
+                               (since, upto)).fetchall()
+    finally:
+        conn.rollback()
+    return {"columns": cols, "rows": rows, "deleted": deleted, "next": max(upto, since), "more": more}
+
+
+def pull_response(conn, columns):
+    since, limit = pull_args(request.args)
+    body = json.dumps(pull(conn, columns, since, limit), separators=(",", ":")).encode("utf-8")
+    resp = Response(body, mimetype="application/json")
+    resp.vary.add("Accept-Encoding")
+    if len(body) >= GZIP_MIN_BYTES and "gzip" in request.accept_encodings:
+        resp.set_data(gzip.compress(body, 6))
+        resp.content_encoding = "gzip"
+    return resp
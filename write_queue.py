@@ -0,0 +1,329 @@
+"""Queued farmer registrations: request handlers append, one writer commits.
+
+Under gunicorn every worker that INSERTs competes for SQLite's one write
+lock, and during registration drives requests pile up on busy_timeout until
+some fail with "database is locked". With WRITE_QUEUE on (the default) a
+handler instead appends the row as one JSON line to its own process's log
+(<db>.queue/<pid>-<n>.log) and answers at once with a registration id.
+
+A single writer -- whichever process holds the flock on <db>.queue/writer.lock;
+another takes over within ELECTION_INTERVAL if it dies -- reads each log from
+its committed offset and inserts everything that has arrived in one
+transaction, together with the new offsets (group commit). The registration
+id is the row's client_uuid, so a log replayed after a crash inserts
+nothing twice.
+
+    POST /api/registrations              202 {"registration_id", "status": "queued", "status_url"}
+                                         409 {"duplicates"} (see dedup.py) unless ?allow_duplicate=1
+    GET  /api/registrations/<id>         queued | committed (with farmer_id) | failed
+
+Logs are appended without fsync, the durability synchronous=NORMAL already
+gives (a crashed worker loses nothing, a power cut may); QUEUE_FSYNC=1
+syncs every append.
+
+    python write_queue.py drain farmers.db    # commit what is queued while the app is stopped
+"""
+import fcntl, json, logging, os, sqlite3, sys, threading, time, uuid
+from flask import abort, jsonify, request, url_for
+from db import connect, get_db
+from bulk_import import clean_record
+from dedup import find_duplicates
+
+QUEUE_POLL = float(os.environ.get("QUEUE_POLL", "0.005"))
+QUEUE_FSYNC = os.environ.get("QUEUE_FSYNC") == "1"
+READ_BYTES = 1024 * 1024         # per log per group commit
+ROTATE_BYTES = 4 * 1024 * 1024
+ELECTION_INTERVAL = 1.0
+
+QUEUE_SQL = (
+    "CREATE TABLE IF NOT EXISTS write_queue_offsets(log TEXT PRIMARY KEY, pos INTEGER NOT NULL)",
+    """CREATE TABLE IF NOT EXISTS write_queue_failed(
+    registration_id TEXT PRIMARY KEY,
+    error TEXT NOT NULL,
+    failed_at TEXT DEFAULT CURRENT_TIMESTAMP
+)""",
+)
+
+log = logging.getLogger("farmers.queue")
+
+
+def install_write_queue(conn):
+    for sql in QUEUE_SQL:
+        conn.execute(sql)
+
+
+def queue_dir(database):
+    return database + ".queue"
+
+
+def _now():
+    # what datetime('now') would have stored
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+
+
+# === Appending (every worker) ===
+class WriteQueue:
+    """This process's log for one database; starting it also enters the writer election."""
+
+    def __init__(self, database):
+        self.database = database
+        self.directory = queue_dir(database)
+        os.makedirs(self.directory, exist_ok=True)
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._fd, self._size = None, 0
+        threading.Thread(target=run_writer, args=(database,), name="write-queue", daemon=True).start()
+
+    def _rotate(self):
+        if self._fd is not None:
+            os.close(self._fd)
+        path = os.path.join(self.directory, f"{self.pid}-{time.time_ns()}.log")
+        self._fd, self._size = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_EXCL, 0o644), 0
+
+    def append(self, row):
+        line = (json.dumps(row, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            if self._fd is None or self._size >= ROTATE_BYTES:
+                self._rotate()
+            os.write(self._fd, line)  # one write per line, so the writer never sees half a record
+            self._size += len(line)
+            if QUEUE_FSYNC:
+                os.fsync(self._fd)
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def queue_for(database):
+    # like db.get_pool: a forked gunicorn worker gets its own log and writer thread
+    q = _queues.get(database)
+    if q is None or q.pid != os.getpid():
+        with _queues_lock:
+            q = _queues.get(database)
+            if q is None or q.pid != os.getpid():
+                q = _queues[database] = WriteQueue(database)
+    return q
+
+
+def _insert_sql(columns):
+    return (f"INSERT INTO farmers({', '.join(columns)}) VALUES({', '.join('?' * len(columns))}) "
+            "ON CONFLICT DO NOTHING")
+
+
+def register(database, row, queued=True):
+    """Store one farmers row; returns (registration id, farmer id or None while queued)."""
+    row = dict(row)
+    row.setdefault("created_at", _now())
+    registration_id = row.setdefault("client_uuid", str(uuid.uuid4()))
+    if queued:
+        queue_for(database).append(row)
+        return registration_id, None
+    conn = get_db(database)
+    conn.execute(_insert_sql(list(row)), list(row.values()))
+    conn.commit()
+    found = conn.execute("SELECT id FROM farmers WHERE client_uuid = ?", (registration_id,)).fetchone()
+    return registration_id, found[0]
+
+
+def init_write_queue(app):
+    app.config.setdefault("WRITE_QUEUE", os.environ.get("WRITE_QUEUE", "1") == "1")
+    database = app.config["DATABASE"]
+    if app.config["WRITE_QUEUE"] and os.path.isdir(queue_dir(database)):
+        queue_for(database)  # rows left by a previous run get a writer without waiting for a request
+
+
+# === The writer (one process at a time) ===
+def run_writer(database, stop=None):
+    directory = queue_dir(database)
+    with open(os.path.join(directory, "writer.lock"), "w") as lock:
+        while True:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if stop is not None and stop.is_set():
+                    return
+                time.sleep(ELECTION_INTERVAL)
+        conn = connect(database)
+        try:
+            while stop is None or not stop.is_set():
+                try:
+                    if not drain(conn, directory):
+                        time.sleep(QUEUE_POLL)
+                except Exception:
+                    log.exception("write queue: group commit failed, retrying")
+                    time.sleep(ELECTION_INTERVAL)
+        finally:
+            conn.close()
+
+
+def _logs(directory):
+    return sorted(e.name for e in os.scandir(directory) if e.name.endswith(".log"))
+
+
+def drain(conn, directory):
+    """One group commit of everything appended since the last; returns the rows read."""
+    logs = _logs(directory)
+    if not logs:
+        return 0
+    offsets = dict(conn.execute("SELECT log, pos FROM write_queue_offsets"))
+    records, moved = [], {}
+    for name in logs:
+        pos = offsets.get(name, 0)
+        with open(os.path.join(directory, name), "rb") as f:
+            f.seek(pos)
+            data = f.read(READ_BYTES)
+        end = data.rfind(b"\n") + 1
+        if end:
+            records.extend(data[:end].splitlines())
+            moved[name] = offsets[name] = pos + end
+    if records:
+        _commit(conn, records, moved)
+    _cleanup(conn, directory, logs, offsets)
+    return len(records)
+
+
+def _commit(conn, lines, moved):
+    columns = {r[1] for r in conn.execute("PRAGMA table_info(farmers)")}
+    groups, failed = {}, []
+    for line in lines:
+        row = None
+        try:
+            row = json.loads(line)
+            keys = tuple(row)
+            if not set(keys) <= columns:
+                raise ValueError(f"unknown columns {sorted(set(keys) - columns)}")
+        except ValueError as e:
+            log.warning("write queue: skipping bad record %r: %s", line[:200], e)
+            if isinstance(row, dict) and row.get("client_uuid"):
+                failed.append((row["client_uuid"], str(e)))
+            continue
+        groups.setdefault(keys, []).append(tuple(row.values()))
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        try:
+            for keys, rows in groups.items():
+                conn.executemany(_insert_sql(keys), rows)
+        except (sqlite3.IntegrityError, sqlite3.InterfaceError, sqlite3.DataError):
+            # a row the schema refuses: redo this batch row by row and set the bad ones aside
+            conn.rollback()
+            conn.execute("BEGIN IMMEDIATE")
+            for keys, rows in groups.items():
+                for values in rows:
+                    try:
+                        conn.execute(_insert_sql(keys), values)
+                    except (sqlite3.IntegrityError, sqlite3.InterfaceError, sqlite3.DataError) as e:
+                        failed.append((dict(zip(keys, values)).get("client_uuid"), str(e)))
+        conn.executemany("INSERT OR REPLACE INTO write_queue_failed(registration_id, error) VALUES(?, ?)",
+                         [f for f in failed if f[0]])
+        conn.executemany("INSERT INTO write_queue_offsets(log, pos) VALUES(?, ?) "
+                         "ON CONFLICT(log) DO UPDATE SET pos = excluded.pos", moved.items())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _cleanup(conn, directory, logs, offsets):
+    """Delete logs that are fully committed and will not be appended to again."""
+    newest = {}
+    for name in logs:
+        pid = int(name.split("-", 1)[0])
+        newest[pid] = max(newest.get(pid, name), name)
+    done = []
+    for name in logs:
+        pid = int(name.split("-", 1)[0])
+        path = os.path.join(directory, name)
+        if name == newest[pid] and _alive(pid):
+            continue
+        pos, size = offsets.get(name, 0), os.path.getsize(path)
+        if pos < size:
+            with open(path, "rb") as f:
+                f.seek(pos)
+                if b"\n" in f.read():
+                    continue  # next group commit takes it
+            log.warning("write queue: %s ended in a partial record (%d bytes), dropped", name, size - pos)
+        os.remove(path)
+        done.append((name,))
+    if done:
+        with conn:
+            conn.executemany("DELETE FROM write_queue_offsets WHERE log = ?", done)
+
+
+# === Status and the JSON API ===
+def _queued(conn, directory, registration_id):
+    # offsets are read before the logs, so a row that is in neither is already in farmers
+    offsets = dict(conn.execute("SELECT log, pos FROM write_queue_offsets"))
+    needle = f'"client_uuid":{json.dumps(registration_id)}'.encode("utf-8")
+    for name in _logs(directory) if os.path.isdir(directory) else ():
+        try:
+            with open(os.path.join(directory, name), "rb") as f:
+                f.seek(offsets.get(name, 0))
+                if needle in f.read():
+                    return True
+        except FileNotFoundError:
+            pass
+    return False
+
+
+def registration_status(conn, database, registration_id):
+    if _queued(conn, queue_dir(database), registration_id):
+        return {"registration_id": registration_id, "status": "queued"}
+    row = conn.execute("SELECT id FROM farmers WHERE client_uuid = ?", (registration_id,)).fetchone()
+    if row:
+        return {"registration_id": registration_id, "status": "committed", "farmer_id": row[0]}
+    failed = conn.execute("SELECT error FROM write_queue_failed WHERE registration_id = ?",
+                          (registration_id,)).fetchone()
+    if failed:
+        return {"registration_id": registration_id, "status": "failed", "error": failed[0]}
+    abort(404, "no such registration")
+
+
+def registration_response(conn, database, locations, queued):
+    """POST /api/registrations: validate like an import, check for duplicates, then queue (202) or insert (201)."""
+    record = request.get_json(silent=True) if request.is_json else request.form.to_dict()
+    row, reason = clean_record(conn, record, locations, required=("name", "state", "lga"))
+    if reason:
+        abort(400, reason)
+    duplicates = [] if request.args.get("allow_duplicate") == "1" else find_duplicates(conn, row)
+    if duplicates:
+        return jsonify({"error": "possible duplicate; resend with ?allow_duplicate=1 to register anyway",
+                        "duplicates": duplicates}), 409
+    registration_id, farmer_id = register(database, row, queued)
+    body = {"registration_id": registration_id, "status": "queued" if farmer_id is None else "committed",
+            "status_url": url_for(".api_registration", registration_id=registration_id)}
+    if farmer_id is not None:
+        body["farmer_id"] = farmer_id
+    return jsonify(body), 202 if farmer_id is None else 201
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "drain":
+        sys.exit(__doc__)
+    database = sys.argv[2]
+    directory = queue_dir(database)
+    with open(os.path.join(directory, "writer.lock"), "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            sys.exit("a writer is running (the app is up); it is already draining the queue")
+        conn = connect(database)
+        total = 0
+        while True:
+            n = drain(conn, directory)
+            if not n:
+                break
+            total += n
+        conn.close()
+    print(f"committed {total} queued rows")